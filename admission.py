@@ -0,0 +1,153 @@
+"""
+Per-worker admission control for SeanceAI's upstream-bound routes.
+Each route class (figure chat, salon, suggestions) has its own in-flight limit
+and a short bounded wait queue, and all classes share one worker-wide limit.
+A request that finds no free slot waits in its class's queue for at most
+queue_timeout seconds; if the queue is full or the wait runs out it is rejected
+at once, so the route can answer 503 with Retry-After instead of making every
+request in the worker slower together.
+
+Low-priority classes (suggestions) are shed first: they never queue, and are
+only admitted while the worker is below shed_at of its limit and no
+higher-priority request is waiting. Slots are held until the response, including
+a streamed one, has been written, and are released through the returned ticket.
+"""
+
+import threading
+import time
+
+
+class RouteClass:
+    """Admission policy for one class of routes."""
+
+    def __init__(self, name: str, limit: int, queue: int = 0, low_priority: bool = False):
+        self.name = name
+        self.limit = limit
+        self.queue = 0 if low_priority else queue
+        self.low_priority = low_priority
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {}
+
+
+class Rejected(Exception):
+    """No slot was free; reason is 'limit', 'queue_full', 'queue_timeout' or 'shed'."""
+
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f"{route_class} admission rejected ({reason})")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A held slot; release() is idempotent so every exit path may call it."""
+
+    def __init__(self, controller, route_class: RouteClass):
+        self._controller = controller
+        self._route_class = route_class
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._route_class)
+
+
+class AdmissionController:
+    """
+    In-flight limits for one worker. classes maps a class name to a RouteClass;
+    worker_limit caps them together (0 disables admission control entirely).
+    """
+
+    def __init__(self, classes: list, worker_limit: int, queue_timeout: float = 0.5,
+                 shed_at: float = 0.75, retry_after: int = 2):
+        self.classes = {route_class.name: route_class for route_class in classes}
+        self.worker_limit = worker_limit
+        self.queue_timeout = queue_timeout
+        self.shed_at = shed_at
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.worker_limit > 0
+
+    def _priority_waiting(self) -> bool:
+        return any(c.waiting for c in self.classes.values() if not c.low_priority)
+
+    def _admissible(self, route_class: RouteClass) -> bool:
+        if route_class.in_flight >= route_class.limit:
+            return False
+        if route_class.low_priority:
+            return self.in_flight < self.worker_limit * self.shed_at and not self._priority_waiting()
+        return self.in_flight < self.worker_limit
+
+    def _take(self, route_class: RouteClass) -> Ticket:
+        route_class.in_flight += 1
+        route_class.admitted += 1
+        self.in_flight += 1
+        return Ticket(self, route_class)
+
+    def _reject(self, route_class: RouteClass, reason: str):
+        route_class.rejected[reason] = route_class.rejected.get(reason, 0) + 1
+        raise Rejected(route_class.name, reason, self.retry_after)
+
+    def acquire(self, name: str) -> Ticket:
+        """Take a slot for class name, waiting briefly in its queue; raises Rejected if none frees up."""
+        route_class = self.classes[name]
+        with self._condition:
+            if self._admissible(route_class):
+                return self._take(route_class)
+            if route_class.low_priority:
+                self._reject(route_class, 'shed')
+            if route_class.waiting >= route_class.queue:
+                self._reject(route_class, 'queue_full' if route_class.queue else 'limit')
+            route_class.waiting += 1
+            route_class.queued += 1
+            wait_until = time.monotonic() + self.queue_timeout
+            try:
+                while not self._admissible(route_class):
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(route_class, 'queue_timeout')
+                    self._condition.wait(remaining)
+            finally:
+                route_class.waiting -= 1
+            return self._take(route_class)
+
+    def _release(self, route_class: RouteClass):
+        with self._condition:
+            route_class.in_flight -= 1
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        return {
+            "worker_limit": self.worker_limit,
+            "in_flight": self.in_flight,
+            "classes": {
+                name: {
+                    "limit": c.limit,
+                    "queue": c.queue,
+                    "in_flight": c.in_flight,
+                    "waiting": c.waiting,
+                    "admitted": c.admitted,
+                    "queued": c.queued,
+                    "rejected": dict(c.rejected),
+                }
+                for name, c in self.classes.items()
+            },
+        }
+
+
+def parse_class_settings(text: str) -> dict:
+    """Parse "chat=120,salon=60" into {"chat": 120, "salon": 60}."""
+    settings = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, value = part.partition('=')
+        settings[name.strip()] = int(value)
+    return settings
@@ -12,12 +12,40 @@ except ImportError:
 
 import os
 import json
+import random
+import sqlite3
 import time
 import requests
 from typing import Tuple
-from flask import Flask, render_template, jsonify, request, Response
+from flask import Flask, render_template, jsonify, request, Response, g, has_request_context
 from dotenv import load_dotenv
-from figures import get_all_figures, get_figure, get_system_prompt, get_dinner_party_prompt, CURATED_COMBOS
+from figures import (
+    get_all_figures, get_figure, get_system_prompt, get_dinner_party_prompt, get_salon_guest_turn,
+    prompt_cache_stats, CURATED_COMBOS
+)
+from upstream import UpstreamClient
+from catalog import PrecomputedJSON
+from response_cache import ResponseCache, history_hash, make_cache_key
+from openings import OpeningStore
+from salon_parser import parse_guest_stream, parse_salon_response
+from salon_modes import fan_out_events, turn_taking_events
+from sse import FramingMetrics, UpstreamStreamParser, UPSTREAM_READ_SIZE, coalesce_frames
+from token_budget import build_trimmed_messages, estimate_message_tokens
+from summaries import SUMMARY_PROMPT, ConversationSummarizer, with_summary
+from sessions import open_session_store, valid_session_id
+from deadline import Deadline
+from model_health import ModelHealth, parse_retry_after
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakers
+from router import ModelRouter
+from hedging import HedgeMetrics, TTFTStats, hedged_events
+from metrics import MetricsRegistry, TOKEN_RATE_BUCKETS
+from tracing import mark_stage, start_trace, stop_trace
+from admission import AdmissionController, Rejected, RouteClass, parse_class_settings
+from suggestions import (
+    FIGURE_FALLBACK_SUGGESTIONS, PARTY_FALLBACK_SUGGESTIONS, SpeculativeSuggestions,
+    figure_suggestion_messages, parse_figure_suggestions, parse_party_suggestions,
+    party_suggestion_messages, suggestion_basis
+)
 
 # Load environment variables
 load_dotenv()
@@ -27,14 +55,202 @@ app.json.sort_keys = False
 
 # Configuration
 OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY')
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = os.environ.get('OPENROUTER_URL', "https://openrouter.ai/api/v1/chat/completions")  # e.g. a local mock_openrouter.py
 DEFAULT_MODEL = "openai/gpt-4o-mini"
-MAX_HISTORY = 20  # Maximum number of messages to keep in history
+MAX_RESPONSE_TOKENS = 800  # Completion budget for a normal turn
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 12000))  # Estimated prompt tokens per request, at most
+DEFAULT_CONTEXT_TOKENS = 32768  # Assumed context window for models missing from AVAILABLE_MODELS
+
+# Shared keep-alive connection pool to OpenRouter (one per worker process)
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 64))
+UPSTREAM_POOL_TIMEOUT = float(os.environ.get('UPSTREAM_POOL_TIMEOUT', 10))
+upstream = UpstreamClient(pool_size=UPSTREAM_POOL_SIZE, pool_timeout=UPSTREAM_POOL_TIMEOUT)
+
+# Response cache for repeatable turns (curated salon openings, starter questions).
+# Routes are switched individually; RESPONSE_CACHE_DB adds a SQLite tier shared by workers.
+RESPONSE_CACHE_ROUTES = {
+    route.strip()
+    for route in os.environ.get('RESPONSE_CACHE_ROUTES', 'chat,chat-stream,dinner-party,dinner-party-stream').split(',')
+    if route.strip()
+}
+RESPONSE_CACHE_MAX_HISTORY = int(os.environ.get('RESPONSE_CACHE_MAX_HISTORY', 0))  # 0 = first turns only
+REPLAY_CHUNK_CHARS = 160  # Size of content frames when replaying a cached reply
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 86400)),
+    db_path=os.environ.get('RESPONSE_CACHE_DB')
+)
+
+# Salon turn strategies: "single" writes every guest in one completion; "parallel"
+# streams one request per guest concurrently and "sequential" one after another,
+# so each guest hears the replies before theirs. Per-guest requests use their own budget.
+SALON_MODES = {'single', 'parallel', 'sequential'}
+SALON_MODE = os.environ.get('SALON_MODE', 'single')
+if SALON_MODE not in SALON_MODES:
+    raise ValueError(f"SALON_MODE must be one of {sorted(SALON_MODES)}, got '{SALON_MODE}'")
+SALON_GUEST_MAX_TOKENS = int(os.environ.get('SALON_GUEST_MAX_TOKENS', 400))
+
+# Opening turns pre-generated offline by pregenerate.py
+OPENINGS_DIR = os.environ.get('OPENINGS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'openings'))
+opening_store = OpeningStore(OPENINGS_DIR)
+opening_store.load()
+
+# Rolling summaries of older figure-chat turns, generated after each reply and shared
+# across workers when SUMMARY_CACHE_DB is set
+CONVERSATION_SUMMARIES = os.environ.get('CONVERSATION_SUMMARIES', 'on').lower() != 'off'
+SUMMARY_KEEP_RECENT = int(os.environ.get('SUMMARY_KEEP_RECENT', 6))  # Messages always sent verbatim
+SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL', DEFAULT_MODEL)
+SUMMARY_MAX_TOKENS = 300
+summary_cache = ResponseCache(
+    max_entries=int(os.environ.get('SUMMARY_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('SUMMARY_CACHE_TTL', 7 * 86400)),
+    db_path=os.environ.get('SUMMARY_CACHE_DB')
+)
+
+# Optional server-side conversation sessions: "memory", "sqlite:///path" or unset (off)
+session_store = open_session_store(
+    os.environ.get('SESSION_STORE', ''),
+    ttl=float(os.environ.get('SESSION_TTL', 7 * 86400))
+)
+
+# SSE coalescing: text deltas are held for up to STREAM_COALESCE_MS (0 disables) or
+# STREAM_COALESCE_MAX_CHARS characters and written as one frame
+STREAM_COALESCE_MS = float(os.environ.get('STREAM_COALESCE_MS', 40))
+STREAM_COALESCE_MAX_CHARS = int(os.environ.get('STREAM_COALESCE_MAX_CHARS', 1024))
+sse_metrics = FramingMetrics()
+
+# Follow-up suggestions: generated with a fast model alongside a streamed reply once its
+# first paragraph is complete and sent as a suggestions event before done. The
+# suggestion endpoints share the cache, keyed on that opening paragraph.
+SPECULATIVE_SUGGESTIONS = os.environ.get('SPECULATIVE_SUGGESTIONS', 'on').lower() != 'off'
+SUGGESTION_MODEL = os.environ.get('SUGGESTION_MODEL', 'meta-llama/llama-3.3-70b-instruct:free')
+SUGGESTION_WAIT_MS = float(os.environ.get('SUGGESTION_WAIT_MS', 1500))  # How long done may wait for them
+suggestion_cache = ResponseCache(
+    max_entries=int(os.environ.get('SUGGESTION_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('SUGGESTION_CACHE_TTL', 86400))
+)
 
 # Rate limit handling configuration
 MAX_RETRIES = 3
 RETRY_DELAYS = [2, 5, 10]  # Exponential backoff delays in seconds
 
+# Shared model health: a 429 starts a cooldown for that model (the provider's Retry-After,
+# else MODEL_COOLDOWN_SECONDS doubling per consecutive 429) during which requests try healthy
+# models first. MODEL_HEALTH_DB (set by gunicorn_config.py) shares it between workers;
+# success rates and latencies reach it every MODEL_HEALTH_FLUSH_SECONDS.
+model_health = ModelHealth(
+    os.environ.get('MODEL_HEALTH_DB'),
+    default_cooldown=float(os.environ.get('MODEL_COOLDOWN_SECONDS', 10)),
+    max_cooldown=float(os.environ.get('MODEL_COOLDOWN_MAX_SECONDS', 120)),
+    flush_interval=float(os.environ.get('MODEL_HEALTH_FLUSH_SECONDS', 5))
+)
+
+# Per-model circuit breakers (per worker). A model is skipped for CIRCUIT_OPEN_SECONDS once
+# CIRCUIT_ERROR_RATE of its last CIRCUIT_WINDOW calls failed (errors and timeouts, not 429s)
+# or CIRCUIT_SLOW_RATE were slow: a first token after CIRCUIT_SLOW_TTFT_SECONDS on streams,
+# a reply after CIRCUIT_SLOW_RESPONSE_SECONDS otherwise. CIRCUIT_PROBES successful requests
+# then close it again. CIRCUIT_BREAKERS=off disables them.
+CIRCUIT_SLOW_TTFT_SECONDS = float(os.environ.get('CIRCUIT_SLOW_TTFT_SECONDS', 10))
+CIRCUIT_SLOW_RESPONSE_SECONDS = float(os.environ.get('CIRCUIT_SLOW_RESPONSE_SECONDS', 25))
+circuit_breakers = CircuitBreakers(
+    enabled=os.environ.get('CIRCUIT_BREAKERS', 'on').lower() != 'off',
+    on_transition=lambda *transition: _circuit_transition(*transition),
+    window=int(os.environ.get('CIRCUIT_WINDOW', 20)),
+    min_calls=int(os.environ.get('CIRCUIT_MIN_CALLS', 5)),
+    error_rate=float(os.environ.get('CIRCUIT_ERROR_RATE', 0.5)),
+    slow_rate=float(os.environ.get('CIRCUIT_SLOW_RATE', 0.5)),
+    open_seconds=float(os.environ.get('CIRCUIT_OPEN_SECONDS', 30)),
+    probes=int(os.environ.get('CIRCUIT_PROBES', 2))
+)
+
+# Per-request time budgets (seconds) shared by every attempt, backoff sleep and model
+# fallback. Stream budgets cover the wait for a stream to start; all stay under
+# gunicorn's 120s worker timeout.
+CHAT_DEADLINE_SECONDS = float(os.environ.get('CHAT_DEADLINE_SECONDS', 60))
+STREAM_DEADLINE_SECONDS = float(os.environ.get('STREAM_DEADLINE_SECONDS', 45))
+SUGGESTION_DEADLINE_SECONDS = float(os.environ.get('SUGGESTION_DEADLINE_SECONDS', 4))
+STREAM_READ_TIMEOUT_SECONDS = 60  # Longest pause between reads once a stream has started
+
+# Opt-in hedged streams: if the primary model has no first token after the
+# HEDGE_PERCENTILE of its recent times to first token (HEDGE_DEFAULT_MS until enough
+# samples), the request also goes to the first fallback model and whichever streams first wins
+STREAM_HEDGING = os.environ.get('STREAM_HEDGING', 'off').lower() == 'on'
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', 95))
+HEDGE_DEFAULT_MS = float(os.environ.get('HEDGE_DEFAULT_MS', 3000))
+HEDGE_MIN_MS = 250  # Never hedge sooner than this
+ttft_stats = TTFTStats()
+hedge_metrics = HedgeMetrics()
+
+# Prometheus metrics served at /metrics. Under gunicorn, METRICS_DIR (set by
+# gunicorn_config.py) holds each worker's values so a scrape covers every worker.
+metrics_registry = MetricsRegistry(
+    os.environ.get('METRICS_DIR'),
+    flush_interval=float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+)
+stream_ttft_seconds = metrics_registry.histogram(
+    'seance_stream_ttft_seconds', 'Time to first token of live upstream streams.', ('route', 'model'))
+stream_duration_seconds = metrics_registry.histogram(
+    'seance_stream_duration_seconds', 'Total duration of live upstream streams.', ('route', 'model'))
+stream_tokens_per_second = metrics_registry.histogram(
+    'seance_stream_tokens_per_second', 'Completion tokens per second after the first token.',
+    ('route', 'model'), TOKEN_RATE_BUCKETS)
+upstream_retries_total = metrics_registry.counter(
+    'seance_upstream_retries_total', 'Upstream attempts repeated on the same model.', ('call', 'model'))
+upstream_rate_limited_total = metrics_registry.counter(
+    'seance_upstream_rate_limited_total', 'Upstream responses with HTTP 429.', ('call', 'model'))
+upstream_fallbacks_total = metrics_registry.counter(
+    'seance_upstream_fallbacks_total', 'Moves from one model to the next fallback model.',
+    ('call', 'from_model', 'to_model'))
+cache_lookups_total = metrics_registry.counter(
+    'seance_cache_lookups_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+sse_open_streams = metrics_registry.gauge(
+    'seance_sse_open_streams', 'SSE responses currently streaming.', ('route',))
+circuit_transitions_total = metrics_registry.counter(
+    'seance_circuit_transitions_total', 'Circuit breaker state changes.', ('model', 'from_state', 'to_state'))
+circuit_breaker_state = metrics_registry.gauge(
+    'seance_circuit_breaker_state', 'Workers whose circuit breaker for the model is in each state.', ('model', 'state'))
+circuit_short_circuited_total = metrics_registry.counter(
+    'seance_circuit_short_circuited_total', 'Calls skipped because the model\'s circuit was open.', ('model',))
+router_decisions_total = metrics_registry.counter(
+    'seance_router_decisions_total', 'Tier and "auto" requests by the model they were routed to.', ('requested', 'model'))
+admission_in_flight = metrics_registry.gauge(
+    'seance_admission_in_flight', 'Requests holding an admission slot.', ('route_class',))
+admission_queue_depth = metrics_registry.gauge(
+    'seance_admission_queue_depth', 'Requests waiting for an admission slot.', ('route_class',))
+admission_rejected_total = metrics_registry.counter(
+    'seance_admission_rejected_total', 'Requests answered 503 by admission control.', ('route_class', 'reason'))
+
+# Stage tracing for chat requests: a Server-Timing header, a timing event before done
+# on streams, and a structured log record for TRACE_LOG_SAMPLE_RATE of requests
+TRACED_ENDPOINTS = {'api_chat', 'api_chat_stream', 'api_dinner_party_chat', 'api_dinner_party_chat_stream'}
+TRACE_LOG_SAMPLE_RATE = float(os.environ.get('TRACE_LOG_SAMPLE_RATE', 0.05))
+
+# Per-worker admission control for routes that call the model provider. Each route class
+# has an in-flight limit (ADMISSION_LIMITS) and a short wait queue (ADMISSION_QUEUE, waited
+# on for at most ADMISSION_QUEUE_MS); past them the request gets 503 with Retry-After.
+# Suggestions never queue and are shed once the worker holds ADMISSION_SHED_AT of
+# ADMISSION_WORKER_LIMIT slots. ADMISSION_WORKER_LIMIT=0 turns admission control off.
+ADMISSION_ROUTE_CLASSES = {
+    'api_chat': 'chat',
+    'api_chat_stream': 'chat',
+    'api_dinner_party_chat': 'salon',
+    'api_dinner_party_chat_stream': 'salon',
+    'api_suggestions': 'suggestions',
+    'api_dinner_party_suggestions': 'suggestions',
+}
+ADMISSION_LIMITS = {'chat': 120, 'salon': 60, 'suggestions': 40,
+                    **parse_class_settings(os.environ.get('ADMISSION_LIMITS', ''))}
+ADMISSION_QUEUE = {'chat': 20, 'salon': 10, 'suggestions': 0,
+                   **parse_class_settings(os.environ.get('ADMISSION_QUEUE', ''))}
+admission = AdmissionController(
+    [RouteClass(name, ADMISSION_LIMITS[name], ADMISSION_QUEUE[name], low_priority=name == 'suggestions')
+     for name in ('chat', 'salon', 'suggestions')],
+    worker_limit=int(os.environ.get('ADMISSION_WORKER_LIMIT', 160)),
+    queue_timeout=float(os.environ.get('ADMISSION_QUEUE_MS', 500)) / 1000,
+    shed_at=float(os.environ.get('ADMISSION_SHED_AT', 0.75)),
+    retry_after=int(os.environ.get('ADMISSION_RETRY_AFTER', 2))
+)
+
 # Fallback models tried (in order) when a non-default primary model is rate-limited,
 # unavailable, or returns no content.
 FALLBACK_MODELS = [
@@ -44,23 +260,60 @@ FALLBACK_MODELS = [
 # Models that don't support the 'system' role and need it merged into user messages
 MODELS_WITHOUT_SYSTEM_ROLE = {"google/"}
 
-# Available models - organized by capability tier
+# Available models - organized by capability tier, with each model's context window
+# (tokens) and OpenRouter list price (USD per million prompt / completion tokens)
 AVAILABLE_MODELS = [
     # Swift tier - fast and responsive (free models)
-    {"id": "google/gemma-4-26b-a4b-it:free", "name": "Gemma 4 26B", "tier": "swift"},
-    {"id": "google/gemma-4-31b-it:free", "name": "Gemma 4 31B", "tier": "swift"},
-    {"id": "meta-llama/llama-3.3-70b-instruct:free", "name": "Llama 3.3 70B", "tier": "swift"},
-    {"id": "nousresearch/hermes-3-llama-3.1-405b:free", "name": "Hermes 3 405B", "tier": "swift"},
+    {"id": "google/gemma-4-26b-a4b-it:free", "name": "Gemma 4 26B", "tier": "swift",
+     "context_tokens": 131072, "prompt_price": 0.0, "completion_price": 0.0},
+    {"id": "google/gemma-4-31b-it:free", "name": "Gemma 4 31B", "tier": "swift",
+     "context_tokens": 131072, "prompt_price": 0.0, "completion_price": 0.0},
+    {"id": "meta-llama/llama-3.3-70b-instruct:free", "name": "Llama 3.3 70B", "tier": "swift",
+     "context_tokens": 65536, "prompt_price": 0.0, "completion_price": 0.0},
+    {"id": "nousresearch/hermes-3-llama-3.1-405b:free", "name": "Hermes 3 405B", "tier": "swift",
+     "context_tokens": 131072, "prompt_price": 0.0, "completion_price": 0.0},
     # Balanced tier - good mix of speed and capability
-    {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini", "tier": "balanced"},
-    {"id": "anthropic/claude-haiku-4.5", "name": "Claude Haiku 4.5", "tier": "balanced"},
-    {"id": "deepseek/deepseek-chat", "name": "DeepSeek V3", "tier": "balanced"},
+    {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini", "tier": "balanced",
+     "context_tokens": 128000, "prompt_price": 0.15, "completion_price": 0.60},
+    {"id": "anthropic/claude-haiku-4.5", "name": "Claude Haiku 4.5", "tier": "balanced",
+     "context_tokens": 200000, "prompt_price": 1.00, "completion_price": 5.00},
+    {"id": "deepseek/deepseek-chat", "name": "DeepSeek V3", "tier": "balanced",
+     "context_tokens": 163840, "prompt_price": 0.27, "completion_price": 1.10},
     # Advanced tier - most capable models
-    {"id": "anthropic/claude-sonnet-4", "name": "Claude Sonnet 4", "tier": "advanced"},
-    {"id": "openai/gpt-4o", "name": "GPT-4o", "tier": "advanced"},
-    {"id": "google/gemini-2.5-pro-preview", "name": "Gemini 2.5 Pro", "tier": "advanced"},
-    {"id": "anthropic/claude-opus-4", "name": "Claude Opus 4", "tier": "advanced"},
+    {"id": "anthropic/claude-sonnet-4", "name": "Claude Sonnet 4", "tier": "advanced",
+     "context_tokens": 200000, "prompt_price": 3.00, "completion_price": 15.00},
+    {"id": "openai/gpt-4o", "name": "GPT-4o", "tier": "advanced",
+     "context_tokens": 128000, "prompt_price": 2.50, "completion_price": 10.00},
+    {"id": "google/gemini-2.5-pro-preview", "name": "Gemini 2.5 Pro", "tier": "advanced",
+     "context_tokens": 1048576, "prompt_price": 1.25, "completion_price": 10.00},
+    {"id": "anthropic/claude-opus-4", "name": "Claude Opus 4", "tier": "advanced",
+     "context_tokens": 200000, "prompt_price": 15.00, "completion_price": 75.00},
 ]
+MODEL_TABLE = {entry["id"]: entry for entry in AVAILABLE_MODELS}
+
+# Model router: a request's "model" may be a tier ("swift", "balanced", "advanced") or "auto",
+# optionally with a policy (":fastest" or ":cheapest"), and is resolved to a concrete model from
+# live time to first token, tokens/s, success rate and price. "cheapest" keeps to models whose
+# p95 time to first token is within ROUTER_P95_TTFT_MS. Each decision is explained in an
+# X-Model-Route header; send X-Route-Debug: 1 to also get every candidate's scores.
+ROUTER_AUTO_POLICY = os.environ.get('ROUTER_AUTO_POLICY', 'cheapest')
+ROUTER_TIER_POLICY = os.environ.get('ROUTER_TIER_POLICY', 'fastest')
+ROUTER_P95_TTFT_MS = float(os.environ.get('ROUTER_P95_TTFT_MS', 3000))
+ROUTER_EXPLORE_RATE = float(os.environ.get('ROUTER_EXPLORE_RATE', 0.05))
+ROUTER_DEFAULT_ROUTE = os.environ.get('ROUTER_DEFAULT_ROUTE')  # e.g. "auto" for requests that name no model
+model_router = ModelRouter(
+    AVAILABLE_MODELS, ttft_stats, model_health, circuit_breakers,
+    auto_policy=ROUTER_AUTO_POLICY,
+    tier_policy=ROUTER_TIER_POLICY,
+    p95_target=ROUTER_P95_TTFT_MS / 1000,
+    explore_rate=ROUTER_EXPLORE_RATE
+)
+
+# Read-only catalog responses, serialized once per worker
+FIGURES_RESPONSE = PrecomputedJSON({"figures": get_all_figures()})
+FIGURE_RESPONSES = {figure["id"]: PrecomputedJSON({"figure": get_figure(figure["id"])}) for figure in get_all_figures()}
+MODELS_RESPONSE = PrecomputedJSON({"models": AVAILABLE_MODELS, "default": DEFAULT_MODEL, "routes": model_router.targets()})
+COMBOS_RESPONSE = PrecomputedJSON({"combos": CURATED_COMBOS})
 
 
 def _convert_system_messages(messages: list, model: str) -> list:
@@ -88,7 +341,7 @@ def _convert_system_messages(messages: list, model: str) -> list:
     return converted
 
 
-def _make_api_request(messages: list, model: str, timeout: int = 30, stream: bool = False):
+def _make_api_request(messages: list, model: str, timeout: int = 30, stream: bool = False, max_tokens: int = MAX_RESPONSE_TOKENS):
     """
     Make a single API request to OpenRouter.
     Returns (response, error_info) tuple.
@@ -96,7 +349,7 @@ def _make_api_request(messages: list, model: str, timeout: int = 30, stream: boo
     """
     try:
         api_messages = _convert_system_messages(messages, model)
-        response = requests.post(
+        response = upstream.post(
             OPENROUTER_URL,
             headers={
                 "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -107,7 +360,7 @@ def _make_api_request(messages: list, model: str, timeout: int = 30, stream: boo
             json={
                 "model": model,
                 "messages": api_messages,
-                "max_tokens": 800,
+                "max_tokens": max_tokens,
                 "temperature": 0.8,
                 **({"stream": True} if stream else {})
             },
@@ -126,7 +379,8 @@ def _make_api_request(messages: list, model: str, timeout: int = 30, stream: boo
             return None, {
                 'status_code': 429,
                 'is_rate_limit': True,
-                'message': error_msg
+                'message': error_msg,
+                'retry_after': parse_retry_after(response.headers.get('Retry-After'))
             }
         
         response.raise_for_status()
@@ -162,17 +416,24 @@ def _make_api_request(messages: list, model: str, timeout: int = 30, stream: boo
         }
 
 
-def call_llm_suggestions(messages: list, model: str = None) -> Tuple[str, bool]:
+def call_llm_suggestions(messages: list, model: str = None, deadline: Deadline = None) -> Tuple[str, bool]:
     """
-    Fast version of call_llm optimized for suggestions.
+    Fast version of call_llm optimized for suggestions: one attempt, no fallback,
+    bounded by deadline (SUGGESTION_DEADLINE_SECONDS by default).
     """
     if not OPENROUTER_API_KEY:
         return ("", True)
     
+    deadline = deadline or Deadline(SUGGESTION_DEADLINE_SECONDS)
+    if not deadline.can_attempt():
+        return ("", True)
     selected_model = model or DEFAULT_MODEL
+    if model_health.cooldown_remaining(selected_model) or not circuit_breakers.allow(selected_model):
+        return ("", True)  # rate-limited or failing moments ago; the caller falls back to canned suggestions
     
     try:
-        response = requests.post(
+        started_at = time.monotonic()
+        response = upstream.post(
             OPENROUTER_URL,
             headers={
                 "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -186,25 +447,83 @@ def call_llm_suggestions(messages: list, model: str = None) -> Tuple[str, bool]:
                 "max_tokens": 150,
                 "temperature": 0.7,
             },
-            timeout=10
+            timeout=deadline.timeout(10)
         )
         
         if response.status_code == 200:
             data = response.json()
             if "choices" in data and len(data["choices"]) > 0:
                 content = data["choices"][0]["message"]["content"]
+                _record_upstream_success(selected_model, time.monotonic() - started_at, CIRCUIT_SLOW_RESPONSE_SECONDS)
                 return (content, False)
+        elif response.status_code == 429:
+            upstream_rate_limited_total.inc('suggestions', selected_model)
+            model_health.record_rate_limit(selected_model, parse_retry_after(response.headers.get('Retry-After')))
+            return ("", True)
         
+        app.logger.warning(f"Suggestions API error from {selected_model}: HTTP {response.status_code} without a reply")
+        _record_upstream_failure(selected_model)
         return ("", True)
     except Exception as e:
         app.logger.warning(f"Suggestions API error: {e}")
+        _record_upstream_failure(selected_model)
         return ("", True)
 
 
-def call_llm(messages: list, model: str = None) -> Tuple[str, bool]:
+CIRCUIT_OPEN_ERROR = ("The model provider is not responding reliably right now. "
+                      "Please try again in a moment, or select a different model in session settings.")
+
+
+def _deadline_error(deadline: Deadline, attempts: int) -> str:
+    """Client-facing message for a request that ran out of time."""
+    tried = f" after {attempts} attempt{'s' if attempts != 1 else ''}" if attempts else ""
+    return (f"The model provider did not reply within this request's {deadline.describe()} limit{tried}. "
+            "Please try again, or select a different model in session settings.")
+
+
+def _circuit_transition(model: str, previous: str, state: str, reason: str):
+    circuit_transitions_total.inc(model, previous, state)
+    log = app.logger.warning if state == OPEN else app.logger.info
+    log(f"Circuit for {model}: {previous} -> {state} ({reason})")
+
+
+def _record_upstream_success(model: str, latency: float, slow_after: float):
+    """A reply (or first streamed token) from model after latency seconds; slow past slow_after."""
+    model_health.record_success(model, latency)
+    circuit_breakers.record_success(model, slow=latency > slow_after)
+
+
+def _record_upstream_failure(model: str):
+    """An error or timeout from model (rate limits are recorded by _rate_limit_wait)."""
+    model_health.record_failure(model)
+    circuit_breakers.record_failure(model)
+
+
+def _rate_limit_wait(model: str, retry: int, error_info: dict, later_models: list):
+    """
+    Record a 429 from model and return the seconds to wait before retrying it, or
+    None to move on to the next model: at once while a later model is healthy, after
+    the last retry, or when the provider's Retry-After outlasts the backoff delay.
+    """
+    retry_after = error_info.get('retry_after')
+    model_health.record_rate_limit(model, retry_after)
+    if retry >= MAX_RETRIES - 1 or any(not model_health.cooldown_remaining(m) for m in later_models):
+        return None
+    delay = RETRY_DELAYS[min(retry, len(RETRY_DELAYS) - 1)]
+    if retry_after is not None:
+        if retry_after > delay:
+            return None
+        delay = retry_after
+    return delay
+
+
+def call_llm(messages: list, model: str = None, max_tokens: int = MAX_RESPONSE_TOKENS,
+             deadline: Deadline = None) -> Tuple[str, bool]:
     """
     Call the OpenRouter API with the given messages.
-    Includes retry logic with exponential backoff and model fallback for rate limits.
+    Includes retry logic with exponential backoff and model fallback for rate limits,
+    all within deadline (CHAT_DEADLINE_SECONDS by default): attempt timeouts are clipped
+    to the time left, and backoff or fallback stops once no attempt can still fit.
     Returns a tuple: (response_text, is_error)
     If is_error is True, response_text contains an error message.
     """
@@ -212,27 +531,53 @@ def call_llm(messages: list, model: str = None) -> Tuple[str, bool]:
         app.logger.error("OPENROUTER_API_KEY is not set")
         return ("OpenRouter API key not configured. Please set the OPENROUTER_API_KEY environment variable.", True)
     
+    deadline = deadline or Deadline(CHAT_DEADLINE_SECONDS)
     selected_model = model or DEFAULT_MODEL
-    models_to_try = [selected_model] + [m for m in FALLBACK_MODELS if m != selected_model]
+    models_to_try = model_health.order([selected_model] + [m for m in FALLBACK_MODELS if m != selected_model])
     
     last_error = None
+    attempts = 0
+    out_of_time = False
+    short_circuited = False
     
     for model_index, current_model in enumerate(models_to_try):
+        if not deadline.can_attempt():
+            out_of_time = True
+            break
+        if not circuit_breakers.allow(current_model):
+            app.logger.warning(f"Circuit open for {current_model}, skipping to the next model")
+            short_circuited = True
+            continue
+        if model_index:
+            upstream_fallbacks_total.inc('completion', models_to_try[model_index - 1], current_model)
         app.logger.info(f"Trying model: {current_model} (attempt {model_index + 1}/{len(models_to_try)})")
         
         # Retry loop for current model
         for retry in range(MAX_RETRIES):
+            if not deadline.can_attempt():
+                out_of_time = True
+                break
             app.logger.info(f"Calling OpenRouter API with model: {current_model} (retry {retry + 1}/{MAX_RETRIES})")
+            if retry:
+                upstream_retries_total.inc('completion', current_model)
             
-            response, error_info = _make_api_request(messages, current_model)
+            attempts += 1
+            out_of_time = False
+            attempt_started = time.monotonic()
+            response, error_info = _make_api_request(
+                messages, current_model, timeout=deadline.timeout(30), max_tokens=max_tokens
+            )
             
             if response is not None:
                 # Success! Parse the response
+                mark_stage('upstream_response')
                 try:
                     data = response.json()
                     if "choices" in data and len(data["choices"]) > 0:
                         content = data["choices"][0]["message"]["content"]
                         app.logger.info(f"Successfully received response from {current_model}")
+                        _record_upstream_success(
+                            current_model, time.monotonic() - attempt_started, CIRCUIT_SLOW_RESPONSE_SECONDS)
                         return (content, False)
                     else:
                         app.logger.warning("OpenRouter API returned no choices in response")
@@ -246,30 +591,39 @@ def call_llm(messages: list, model: str = None) -> Tuple[str, bool]:
             
             if error_info['is_rate_limit']:
                 app.logger.warning(f"Rate limited on {current_model}: {error_info['message']}")
+                upstream_rate_limited_total.inc('completion', current_model)
                 
-                # If this is not the last retry, wait before retrying
-                if retry < MAX_RETRIES - 1:
-                    delay = RETRY_DELAYS[min(retry, len(RETRY_DELAYS) - 1)]
-                    app.logger.info(f"Waiting {delay}s before retry...")
-                    time.sleep(delay)
-                else:
-                    # Last retry for this model, try next model
-                    app.logger.info(f"Max retries reached for {current_model}, trying next model...")
+                # Wait and retry (if the deadline allows), unless another model is a better bet
+                delay = _rate_limit_wait(current_model, retry, error_info, models_to_try[model_index + 1:])
+                if delay is None:
+                    app.logger.info(f"{current_model} is cooling down, trying next model...")
+                    break
+                app.logger.info(f"Waiting {delay}s before retry...")
+                if not deadline.sleep(delay):
+                    app.logger.info(f"No time left to retry {current_model}, trying next model...")
+                    out_of_time = True
                     break
             else:
                 # Non-rate-limit error, don't retry this model — fall through to next
+                _record_upstream_failure(current_model)
                 app.logger.error(
                     f"API error from {current_model}: "
                     f"HTTP {error_info.get('status_code')} - {error_info['message']}"
                 )
                 break
     
-    # All models and retries exhausted
-    if last_error and last_error['is_rate_limit']:
+    # All models and retries exhausted, or the deadline passed
+    if last_error and last_error.get('status_code') == 401:
+        return ("I apologize, but your API key appears to be invalid. Please check your configuration.", True)
+    elif out_of_time or not deadline.can_attempt():
+        app.logger.error(f"Deadline of {deadline.describe()} reached after {attempts} attempts. Last error: {last_error}")
+        return (_deadline_error(deadline, attempts), True)
+    elif short_circuited and not attempts:
+        app.logger.error(f"Every model's circuit is open: {', '.join(models_to_try)}")
+        return (CIRCUIT_OPEN_ERROR, True)
+    elif last_error and last_error['is_rate_limit']:
         app.logger.error("All models rate-limited")
         return ("The model provider is handling too many requests right now. Please wait a moment and try again, or select a different model in session settings.", True)
-    elif last_error and last_error.get('status_code') == 401:
-        return ("I apologize, but your API key appears to be invalid. Please check your configuration.", True)
     elif last_error and 'timed out' in last_error.get('message', '').lower():
         return ("The model provider timed out. Please try again in a moment.", True)
     else:
@@ -277,85 +631,160 @@ def call_llm(messages: list, model: str = None) -> Tuple[str, bool]:
         return ("I apologize, but something has disrupted our connection. Please try again.", True)
 
 
-def stream_llm(messages: list, model: str = None):
+def _log_stream_framing(counters):
+    app.logger.debug(f"SSE stream closed: {counters.events} events in {counters.frames} frames, {counters.bytes} bytes")
+
+
+def sse_frames(events):
+    """Encode a stream of event dicts as coalesced SSE byte frames."""
+    return coalesce_frames(events, STREAM_COALESCE_MS, STREAM_COALESCE_MAX_CHARS, sse_metrics, _log_stream_framing)
+
+
+def stream_llm_events(messages: list, model: str = None, max_tokens: int = MAX_RESPONSE_TOKENS,
+                      deadline: Deadline = None, fallback: bool = True, on_response=None, cancelled=None):
     """
-    Stream response from OpenRouter API using Server-Sent Events.
-    Includes retry logic with model fallback for rate limits.
-    Yields SSE-formatted chunks as they arrive.
+    Stream response events from the OpenRouter API.
+    Includes retry logic with model fallback for rate limits (unless fallback is False),
+    bounded by deadline (STREAM_DEADLINE_SECONDS from the first call by default) until
+    the stream starts; after its first text each read may wait STREAM_READ_TIMEOUT_SECONDS.
+    on_response(response) is called for every upstream response opened.
+    When the cancelled Event is set (a hedge race was lost and its response closed) the
+    stream ends quietly, without counting the aborted read against the model.
+    Yields dicts as they arrive: {'content': ...}, then {'done': True, 'model': ...}, or {'error': ...}.
     """
     if not OPENROUTER_API_KEY:
         app.logger.error("OPENROUTER_API_KEY is not set for streaming")
-        yield f"data: {json.dumps({'error': 'OpenRouter API key not configured. Please set the OPENROUTER_API_KEY environment variable.'})}\n\n"
+        yield {'error': 'OpenRouter API key not configured. Please set the OPENROUTER_API_KEY environment variable.'}
         return
     
+    deadline = deadline or Deadline(STREAM_DEADLINE_SECONDS)
     selected_model = model or DEFAULT_MODEL
-    models_to_try = [selected_model] + [m for m in FALLBACK_MODELS if m != selected_model]
+    models_to_try = [selected_model] + ([m for m in FALLBACK_MODELS if m != selected_model] if fallback else [])
+    models_to_try = model_health.order(models_to_try)
+    started_at = time.monotonic()
     
     last_error = None
     success = False
+    attempts = 0
+    out_of_time = False
+    short_circuited = False
     
     for model_index, current_model in enumerate(models_to_try):
         if success:
             break
+        if not deadline.can_attempt():
+            out_of_time = True
+            break
+        if not circuit_breakers.allow(current_model):
+            app.logger.warning(f"Streaming: circuit open for {current_model}, skipping to the next model")
+            short_circuited = True
+            continue
             
+        if model_index:
+            upstream_fallbacks_total.inc('stream', models_to_try[model_index - 1], current_model)
         app.logger.info(f"Streaming: trying model {current_model} (attempt {model_index + 1}/{len(models_to_try)})")
         
         for retry in range(MAX_RETRIES):
             if success:
                 break
+            if cancelled is not None and cancelled.is_set():
+                return  # lost a hedge race while backing off; another attempt would be wasted
+            if not deadline.can_attempt():
+                out_of_time = True
+                break
                 
             app.logger.info(f"Streaming request to OpenRouter API with model: {current_model} (retry {retry + 1}/{MAX_RETRIES})")
+            if retry:
+                upstream_retries_total.inc('stream', current_model)
             
-            response, error_info = _make_api_request(messages, current_model, timeout=60, stream=True)
+            attempts += 1
+            out_of_time = False
+            attempt_started = time.monotonic()
+            response, error_info = _make_api_request(
+                messages, current_model, timeout=deadline.timeout(STREAM_READ_TIMEOUT_SECONDS), stream=True,
+                max_tokens=max_tokens
+            )
             
             if response is not None:
                 # Success! Stream the response
+                if on_response:
+                    on_response(response)
+                mark_stage('upstream_connect')
+                stream_complete = False
+                parser = UpstreamStreamParser()
                 try:
-                    for line in response.iter_lines():
-                        if line:
-                            line_text = line.decode('utf-8')
-                            if line_text.startswith('data: '):
-                                data_str = line_text[6:]  # Remove 'data: ' prefix
-                                if data_str.strip() == '[DONE]':
-                                    yield f"data: {json.dumps({'done': True})}\n\n"
-                                    success = True
-                                    break
-                                try:
-                                    data = json.loads(data_str)
-                                    if 'choices' in data and len(data['choices']) > 0:
-                                        delta = data['choices'][0].get('delta', {})
-                                        content = delta.get('content', '')
-                                        if content:
-                                            yield f"data: {json.dumps({'content': content})}\n\n"
-                                            success = True  # Mark as success once we get content
-                                except json.JSONDecodeError:
-                                    continue
+                    for chunk in response.iter_content(chunk_size=UPSTREAM_READ_SIZE):
+                        if not parser.frames:
+                            mark_stage('first_byte')
+                        for content in parser.feed(chunk):
+                            if not success:
+                                # The stream has started: the deadline no longer bounds each read
+                                upstream.set_read_timeout(response, STREAM_READ_TIMEOUT_SECONDS)
+                                ttft_stats.record(current_model, time.monotonic() - started_at)
+                                _record_upstream_success(
+                                    current_model, time.monotonic() - attempt_started, CIRCUIT_SLOW_TTFT_SECONDS)
+                            yield {'content': content}
+                            success = True  # Mark as success once we get content
+                        if parser.done:
+                            break
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    if not success:
+                        if parser.done:
+                            # An empty reply still completed
+                            _record_upstream_success(
+                                current_model, time.monotonic() - attempt_started, CIRCUIT_SLOW_TTFT_SECONDS)
+                        else:
+                            app.logger.warning(f"Streaming: {current_model} ended the stream without a reply")
+                            last_error = {'message': 'Stream ended without a reply', 'is_rate_limit': False}
+                            _record_upstream_failure(current_model)
+                    if parser.done:
+                        if parser.usage:
+                            app.logger.info(f"Stream usage ({current_model}): {parser.usage}")
+                        done = {'done': True, 'model': current_model}
+                        if parser.usage:
+                            done['usage'] = parser.usage
+                        yield done
+                        success = True
+                    stream_complete = True
                     
                     if success:
                         return  # Exit completely on success
                         
                 except Exception as e:
+                    if cancelled is not None and cancelled.is_set():
+                        app.logger.info(f"Streaming: {current_model} cancelled")
+                        return
                     app.logger.error(f"Streaming read error: {e}")
                     last_error = {'message': str(e), 'is_rate_limit': False}
+                    _record_upstream_failure(current_model)
                     break
+                finally:
+                    # Hand the keep-alive connection back to the shared pool
+                    upstream.release(response, drain=stream_complete)
             else:
                 # Handle error
                 last_error = error_info
                 
                 if error_info['is_rate_limit']:
                     app.logger.warning(f"Streaming rate limited on {current_model}: {error_info['message']}")
+                    upstream_rate_limited_total.inc('stream', current_model)
                     
-                    # If this is not the last retry, wait before retrying
-                    if retry < MAX_RETRIES - 1:
-                        delay = RETRY_DELAYS[min(retry, len(RETRY_DELAYS) - 1)]
-                        app.logger.info(f"Waiting {delay}s before retry...")
-                        time.sleep(delay)
-                    else:
-                        # Last retry for this model, try next model
-                        app.logger.info(f"Max retries reached for {current_model}, trying next model...")
+                    # Wait and retry (if the deadline allows), unless another model is a better bet
+                    delay = _rate_limit_wait(current_model, retry, error_info, models_to_try[model_index + 1:])
+                    if delay is None:
+                        app.logger.info(f"Streaming: {current_model} is cooling down, trying next model...")
+                        break
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    app.logger.info(f"Waiting {delay}s before retry...")
+                    if not deadline.sleep(delay):
+                        app.logger.info(f"Streaming: no time left to retry {current_model}, trying next model...")
+                        out_of_time = True
                         break
                 else:
                     # Non-rate-limit error, don't retry this model — fall through to next
+                    _record_upstream_failure(current_model)
                     app.logger.error(
                         f"Streaming API error from {current_model}: "
                         f"HTTP {error_info.get('status_code')} - {error_info['message']}"
@@ -364,14 +793,570 @@ def stream_llm(messages: list, model: str = None):
     
     # All models and retries exhausted - yield error
     if not success:
-        if last_error and last_error.get('is_rate_limit'):
+        if out_of_time or not deadline.can_attempt():
+            app.logger.error(f"Streaming: deadline of {deadline.describe()} reached after {attempts} attempts. Last error: {last_error}")
+            yield {'error': _deadline_error(deadline, attempts), 'deadline_exceeded': True}
+        elif short_circuited and not attempts:
+            app.logger.error(f"Streaming: every model's circuit is open: {', '.join(models_to_try)}")
+            yield {'error': CIRCUIT_OPEN_ERROR}
+        elif last_error and last_error.get('is_rate_limit'):
             app.logger.error("Streaming: All models rate-limited")
-            yield f"data: {json.dumps({'error': 'The model provider is handling too many requests. Please wait a moment and try again, or select a different model in session settings.', 'rate_limited': True})}\n\n"
+            yield {'error': 'The model provider is handling too many requests. Please wait a moment and try again, or select a different model in session settings.', 'rate_limited': True}
         elif last_error and 'timed out' in last_error.get('message', '').lower():
-            yield f"data: {json.dumps({'error': 'The model provider timed out. Please try again.'})}\n\n"
+            yield {'error': 'The model provider timed out. Please try again.'}
         else:
             app.logger.error(f"Streaming: All attempts failed. Last error: {last_error}")
-            yield f"data: {json.dumps({'error': 'Connection disrupted. Please try again.'})}\n\n"
+            yield {'error': 'Connection disrupted. Please try again.'}
+
+
+def _prompt_cost(model: str, messages: list) -> float:
+    """Estimated list price (USD) of sending messages to model as a prompt."""
+    tokens = sum(estimate_message_tokens(msg) for msg in messages)
+    return tokens * MODEL_TABLE.get(model, {}).get("prompt_price", 0.0) / 1_000_000
+
+
+def _observe_stream(events, route: str, model: str):
+    """Relay live upstream events, recording time to first token, duration and token rate."""
+    started_at = time.monotonic()
+    first_token_at = None
+    chars = 0
+    try:
+        for event in events:
+            if 'content' in event:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                chars += len(event['content'])
+            elif event.get('done') and first_token_at is not None:
+                finished_at = time.monotonic()
+                served_by = event.get('model', model)
+                stream_ttft_seconds.observe(first_token_at - started_at, route, served_by)
+                stream_duration_seconds.observe(finished_at - started_at, route, served_by)
+                tokens = (event.get('usage') or {}).get('completion_tokens') or (chars + 3) // 4
+                if finished_at > first_token_at:
+                    stream_tokens_per_second.observe(tokens / (finished_at - first_token_at), route, served_by)
+                    model_router.record_throughput(served_by, tokens / (finished_at - first_token_at))
+            yield event
+    finally:
+        if hasattr(events, 'close'):
+            events.close()
+
+
+def _live_stream_events(messages: list, model: str = None, max_tokens: int = MAX_RESPONSE_TOKENS,
+                        deadline: Deadline = None, route: str = None):
+    """
+    Stream a turn from the upstream API: a plain stream_llm_events call or, with
+    STREAM_HEDGING on and the primary neither cooling down after a 429 nor behind an
+    open circuit, the primary model raced against the first fallback model other than
+    itself once it is slower to start than usual (a primary with no such fallback is not
+    hedged). Both sides share the deadline. Latency metrics are labelled with route (the
+    current endpoint by default).
+    """
+    route = route or (request.endpoint if has_request_context() else None) or 'background'
+    primary = model or DEFAULT_MODEL
+    hedge_model = next((m for m in FALLBACK_MODELS if m != primary), None)
+    if (not STREAM_HEDGING or hedge_model is None or model_health.cooldown_remaining(primary)
+            or circuit_breakers.state(primary) == OPEN):
+        return _observe_stream(stream_llm_events(messages, model, max_tokens=max_tokens, deadline=deadline),
+                               route, primary)
+    deadline = deadline or Deadline(STREAM_DEADLINE_SECONDS)
+    return _observe_stream(hedged_events(
+        primary,
+        hedge_model,
+        lambda racer_model, on_response, cancelled: stream_llm_events(
+            messages, racer_model, max_tokens=max_tokens, deadline=deadline,
+            fallback=False, on_response=on_response, cancelled=cancelled
+        ),
+        ttft_stats.hedge_after(primary, HEDGE_PERCENTILE, HEDGE_DEFAULT_MS / 1000, HEDGE_MIN_MS / 1000),
+        metrics=hedge_metrics,
+        stats=ttft_stats,
+        cost=lambda racer_model: _prompt_cost(racer_model, messages)
+    ), route, primary)
+
+
+def _prompt_token_budget(model: str) -> int:
+    """Estimated prompt tokens allowed for a model: its context window less the reply, capped by PROMPT_TOKEN_BUDGET."""
+    context_tokens = MODEL_TABLE.get(model, {}).get("context_tokens", DEFAULT_CONTEXT_TOKENS)
+    return min(PROMPT_TOKEN_BUDGET, context_tokens - MAX_RESPONSE_TOKENS)
+
+
+def _build_messages(system_prompt: str, history: list, user_message: str, model: str = None) -> list:
+    """
+    Build the message list for a turn, keeping as much recent history as the model's token budget allows.
+    The trim result is kept on flask.g so the response can report dropped tokens.
+    """
+    model = model or DEFAULT_MODEL
+    trim = build_trimmed_messages(system_prompt, history, user_message, _prompt_token_budget(model))
+    g.history_trim = trim
+    if trim.dropped_messages:
+        profile = MODEL_TABLE.get(model, {})
+        cost = trim.prompt_tokens * profile.get("prompt_price", 0.0) / 1_000_000
+        app.logger.info(
+            f"History trimmed for {model}: dropped {trim.dropped_messages} messages (~{trim.dropped_tokens} tokens), "
+            f"kept {trim.kept_messages}; prompt ~{trim.prompt_tokens} tokens (~${cost:.5f})"
+        )
+    return trim.messages
+
+
+def _summarize_conversation(previous_summary: str, messages: list) -> str:
+    """Fold messages into a running summary with a small model call; returns None on failure."""
+    transcript = '\n\n'.join(f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in messages)
+    if previous_summary:
+        content = f"EXISTING SUMMARY:\n{previous_summary}\n\nNEW MESSAGES:\n{transcript}"
+    else:
+        content = f"MESSAGES:\n{transcript}"
+    summary, is_error = call_llm(
+        [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": content}],
+        SUMMARY_MODEL,
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
+    if is_error:
+        app.logger.warning(f"Conversation summary failed: {summary}")
+        return None
+    return summary.strip()
+
+
+summarizer = ConversationSummarizer(summary_cache, _summarize_conversation, keep_recent=SUMMARY_KEEP_RECENT)
+
+
+def _figure_chat_messages(figure_id: str, system_prompt: str, history: list, user_message: str, model: str) -> list:
+    """Build a figure chat turn, replacing older history with its cached rolling summary when there is one."""
+    if CONVERSATION_SUMMARIES:
+        summary, history = summarizer.lookup(figure_id, history)
+        system_prompt = with_summary(system_prompt, summary)
+    return _build_messages(system_prompt, history, user_message, model)
+
+
+def _refresh_summary(figure_id: str, history: list, user_message: str, reply: str):
+    """Summarize ahead for the next turn once this turn's reply is complete."""
+    if CONVERSATION_SUMMARIES and reply:
+        summarizer.refresh(figure_id, history + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply}
+        ])
+
+
+def _summarize_after(events, figure_id: str, history: list, user_message: str):
+    """Relay stream events, then refresh the conversation summary when the reply completes."""
+    reply = _ReplyCollector()
+    for event in events:
+        reply.add(event)
+        if event.get('done'):
+            _refresh_summary(figure_id, history, user_message, reply.text())
+        yield event
+
+
+def _valid_history(history) -> bool:
+    """Whether a request's history is a list of chat messages with text role and content (null means none)."""
+    return history is None or isinstance(history, list) and all(
+        isinstance(msg, dict) and isinstance(msg.get('role', 'user'), str) and isinstance(msg.get('content', ''), str)
+        for msg in history
+    )
+
+
+def _load_history(data: dict, subject: str):
+    """
+    Return (history, session_id, error_response) for a chat request about subject (a
+    figure or guest list, e.g. "figure:ada"). Without a session store or session_id the
+    request's own history is used. With one, a request that carries history (re)seeds the
+    session for subject; otherwise the stored history is used if the client's history_hash
+    matches it and the session belongs to subject, and a 409 asks for the full history if not.
+    History that is not a list of text messages is a 400.
+    """
+    if not _valid_history(data.get('history')):
+        return None, None, (jsonify({"error": "Invalid history; expected a list of {role, content} text messages"}), 400)
+    session_id = data.get('session_id')
+    if session_store is None or not session_id:
+        return data.get('history') or [], None, None
+    if not valid_session_id(session_id):
+        return None, None, (jsonify({"error": "Invalid session_id"}), 400)
+    if 'history' in data:
+        history = data.get('history') or []
+        session_store.save(session_id, history, subject=subject)
+        return history, session_id, None
+
+    stored = session_store.load(session_id)
+    if stored is None:
+        return None, None, (jsonify({"error": "Session not found; resend the full history"}), 409)
+    history, digest, stored_subject = stored
+    if stored_subject != subject:
+        return None, None, (jsonify({"error": "Session belongs to another conversation; resend the full history"}), 409)
+    if data.get('history_hash') != digest:
+        return None, None, (jsonify({"error": "Session history has changed; resend the full history",
+                                     "history_hash": digest}), 409)
+    return history, session_id, None
+
+
+def _record_session_turn(session_id: str, subject: str, history: list, user_message: str, reply: str):
+    """
+    Append a completed turn to the session; returns its new history_hash, or None. A store
+    error (e.g. a locked SQLite database) is logged, not raised: the reply has already been
+    delivered and the client can reseed the session next turn.
+    """
+    if not session_id or not reply:
+        return None
+    try:
+        digest = session_store.save(session_id, history + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply}
+        ], expected_hash=history_hash(history), subject=subject)
+    except sqlite3.Error as e:
+        app.logger.warning(f"Session {session_id} could not be saved; reply not recorded: {e}")
+        return None
+    if digest is None:
+        app.logger.warning(f"Session {session_id} changed during the turn; reply not recorded")
+    return digest
+
+
+def _session_after(events, session_id: str, subject: str, history: list, user_message: str):
+    """Relay stream events; once the reply completes, record it and send a session event before done."""
+    reply = _ReplyCollector()
+    for event in events:
+        reply.add(event)
+        if event.get('done') and session_id:
+            digest = _record_session_turn(session_id, subject, history, user_message, reply.text())
+            if digest:
+                yield {'event': 'session', 'session_id': session_id, 'history_hash': digest}
+        yield event
+
+
+def _session_fields(session_id: str, subject: str, history: list, user_message: str, reply: str) -> dict:
+    """Record a completed non-streaming turn and return the session field for its JSON response."""
+    digest = _record_session_turn(session_id, subject, history, user_message, reply)
+    return {"session": {"session_id": session_id, "history_hash": digest}} if digest else {}
+
+
+def _generate_suggestions(kind: str, subject, history: list, last_response: str, build_messages, parse,
+                          deadline: Deadline = None, model: str = None) -> list:
+    """
+    Follow-up questions for a reply, from the suggestion cache or one fast model call.
+    Only the reply's opening (see suggestion_basis) is used, so the speculative call and a
+    later endpoint request for the same reply share a cache entry. history is the
+    conversation before the reply that build_messages draws on ([] if it uses none) and is
+    part of the cache key. Returns [] on failure.
+    """
+    basis, _ = suggestion_basis(last_response)
+    if not basis:
+        return []
+    model = model or SUGGESTION_MODEL
+    cache_key = make_cache_key(f'{kind}-suggestions', subject, model, history, basis)
+    cached = suggestion_cache.get(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    response_text, is_error = call_llm_suggestions(build_messages(basis), model, deadline)
+    if is_error:
+        app.logger.warning(f"Failed to generate {kind} suggestions")
+        return []
+    suggestions = parse(response_text)
+    if suggestions:
+        suggestion_cache.set(cache_key, json.dumps(suggestions))
+    return suggestions
+
+
+def _suggest_alongside(events, generate):
+    """
+    Relay stream events, generating follow-up suggestions from the first speaker's opening
+    paragraph while the rest streams, and send them as a suggestions event before done.
+    generate(basis) returns the suggestion list.
+    """
+    if not SPECULATIVE_SUGGESTIONS:
+        yield from events
+        return
+    speculative = SpeculativeSuggestions(generate)
+    first_speaker = None
+    for event in events:
+        if 'content' in event and not speculative.started:
+            if first_speaker is None:
+                first_speaker = event.get('figure_id', '')
+            if event.get('figure_id', '') == first_speaker:
+                speculative.feed(event['content'])
+        elif event.get('done'):
+            suggestions = speculative.result(SUGGESTION_WAIT_MS / 1000)
+            if suggestions:
+                yield {'event': 'suggestions', 'suggestions': suggestions}
+        yield event
+
+
+@app.after_request
+def _report_history_trim(response):
+    """Expose how much history the token budget dropped for this turn."""
+    trim = g.get('history_trim')
+    if trim is not None:
+        response.headers['X-History-Tokens-Dropped'] = str(trim.dropped_tokens)
+        response.headers['X-Prompt-Tokens-Estimate'] = str(trim.prompt_tokens)
+    return response
+
+
+def _route_model(model):
+    """
+    Resolve a tier or "auto" model request to a concrete model, keeping the decision for the
+    response headers. Routes call it once a request has passed validation, so rejected
+    requests never count as routing decisions.
+    """
+    decision = model_router.route(model or ROUTER_DEFAULT_ROUTE)
+    if decision is None:
+        return model
+    g.route_decision = decision
+    router_decisions_total.inc(decision.requested, decision.model)
+    app.logger.info(f"Routed {decision.requested} to {decision.model}: {decision.reason}")
+    return decision.model
+
+
+@app.after_request
+def _report_route(response):
+    """Explain a routed model choice; X-Route-Debug: 1 adds every candidate's scores."""
+    decision = g.get('route_decision')
+    if decision is not None:
+        response.headers['X-Model-Route'] = decision.header()
+        if request.headers.get('X-Route-Debug') == '1':
+            response.headers['X-Model-Route-Candidates'] = decision.candidates_header()
+    return response
+
+
+@app.before_request
+def _start_request_trace():
+    """Trace chat requests, timing the JSON body parse as their first stage."""
+    if request.endpoint not in TRACED_ENDPOINTS:
+        stop_trace()
+        return
+    g.trace = start_trace(request.endpoint)
+    request.get_json(silent=True)  # cached for the view's own get_json()
+    g.trace.mark('parse')
+
+
+@app.before_request
+def _admit_request():
+    """Hold an admission slot for routes that call the model provider, or shed the request with 503."""
+    route_class = ADMISSION_ROUTE_CLASSES.get(request.endpoint)
+    if route_class is None or not admission.enabled:
+        return None
+    try:
+        g.admission = admission.acquire(route_class)
+    except Rejected as e:
+        app.logger.warning(f"Shedding {request.endpoint}: {e}")
+        response = jsonify({
+            "error": "SeanceAI is handling too many conversations right now. Please try again in a moment.",
+            "overloaded": True
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    mark_stage('admission')
+    return None
+
+
+@app.teardown_request
+def _release_admission(exc):
+    """Free the admission slot of a request whose response was not handed to a stream."""
+    ticket = g.pop('admission', None)
+    if ticket is not None:
+        ticket.release()
+
+
+@app.after_request
+def _report_timing(response):
+    """Send the stages so far as Server-Timing; streams report the rest in a timing event."""
+    trace = g.get('trace')
+    if trace is not None:
+        response.headers['Server-Timing'] = trace.server_timing()
+        if response.mimetype != 'text/event-stream':
+            _log_trace(trace)
+    return response
+
+
+def _log_trace(trace):
+    """Log a sampled structured record of a request's stage timings."""
+    if random.random() < TRACE_LOG_SAMPLE_RATE:
+        app.logger.info(json.dumps({"trace": trace.name, **trace.summary()}))
+
+
+def _trace_stream(events, trace):
+    """Relay stream events, marking the first relayed token and stream end, then send a timing event before done."""
+    for event in events:
+        if 'content' in event:
+            trace.mark('first_token')
+        elif event.get('done'):
+            trace.mark('stream_end')
+            yield {'event': 'timing', **trace.summary()}
+            _log_trace(trace)
+        yield event
+
+
+def _response_cache_key(route: str, kind: str, subject, model: str, history: list, message: str):
+    """
+    Return the response cache key for a turn, or None if caching is off for the route
+    or the conversation is too far along to be repeatable.
+    """
+    if route not in RESPONSE_CACHE_ROUTES or len(history) > RESPONSE_CACHE_MAX_HISTORY:
+        return None
+    return make_cache_key(kind, subject, model or DEFAULT_MODEL, history, message)
+
+
+def _replay_events(text: str):
+    """Replay a cached reply as the same content/done events a live stream produces."""
+    for start in range(0, len(text), REPLAY_CHUNK_CHARS):
+        yield {'content': text[start:start + REPLAY_CHUNK_CHARS]}
+    yield {'done': True}
+
+
+class _ReplyCollector:
+    """
+    Accumulates a streamed reply. Plain content is joined as it arrived; per-guest
+    events from multi-request salons become a "[guest_id]: text" transcript.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.turns = {}
+
+    def add(self, event: dict):
+        if event.get('event') == 'guest_start':
+            self.turns.setdefault(event['figure_id'], [])
+        elif 'content' in event:
+            self.turns.get(event.get('figure_id'), self.parts).append(event['content'])
+
+    def text(self) -> str:
+        return ''.join(self.parts) or '\n\n'.join(
+            f"[{guest_id}]: {''.join(text).strip()}" for guest_id, text in self.turns.items()
+        )
+
+
+def _cache_through(cache_key: str, events):
+    """Relay live stream events, storing the full reply once the stream completes cleanly."""
+    reply = _ReplyCollector()
+    for event in events:
+        reply.add(event)
+        if event.get('done'):
+            text = reply.text()
+            if text:
+                response_cache.set(cache_key, text)
+        yield event
+
+
+def _cached_stream_events(cache_key, messages: list, model: str, live=None, deadline: Deadline = None):
+    """
+    Return (events, cache_status) for a streaming turn.
+    Pre-generated openings are served first, then the response cache, then live events
+    from live() (a _live_stream_events call within deadline by default). Openings are
+    single completions, so a turn with its own live() (a multi-request salon mode)
+    never gets one.
+    """
+    opening = opening_store.lookup(model or DEFAULT_MODEL, messages) if live is None else None
+    if opening is not None:
+        return _replay_events(opening), 'PREGENERATED'
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return _replay_events(cached), 'HIT'
+    live_events = live() if live else _live_stream_events(messages, model, deadline=deadline)
+    if not cache_key:
+        return live_events, None
+    return _cache_through(cache_key, live_events), 'MISS'
+
+
+def _cached_completion(cache_key, messages: list, model: str, deadline: Deadline = None) -> Tuple[str, bool]:
+    """Non-streaming counterpart of _cached_stream_events; returns (response_text, is_error)."""
+    opening = opening_store.lookup(model or DEFAULT_MODEL, messages)
+    if opening is not None:
+        return (opening, False)
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return (cached, False)
+    ai_response, is_error = call_llm(messages, model, deadline=deadline)
+    if cache_key and not is_error:
+        response_cache.set(cache_key, ai_response)
+    return (ai_response, is_error)
+
+
+def _salon_guest_messages(messages: list, guest_id: str) -> list:
+    """
+    Copy a salon message list so the moderator's latest message asks one guest to reply.
+    The system prompt and history stay identical across guests, keeping the shared prefix cacheable.
+    """
+    guest_messages = messages[:-1]
+    guest_messages.append({
+        "role": "user",
+        "content": f"{messages[-1]['content']}\n\n{get_salon_guest_turn(guest_id)}"
+    })
+    return guest_messages
+
+
+def _salon_reaction_messages(messages: list, guest_id: str, prior_turns: list) -> list:
+    """
+    Message list for one guest in a sequential salon turn.
+    The replies already given this turn follow the moderator's message as an assistant
+    transcript, so every guest shares the system prompt, history and moderator prefix.
+    """
+    if not prior_turns:
+        return _salon_guest_messages(messages, guest_id)
+    transcript = '\n\n'.join(f"[{speaker}]: {text}" for speaker, text in prior_turns)
+    return messages + [
+        {"role": "assistant", "content": transcript},
+        {"role": "user", "content": get_salon_guest_turn(guest_id, reacting=True)}
+    ]
+
+
+def _event_stream_response(events, cache_status: str = None) -> Response:
+    """Wrap stream events in an SSE response."""
+    headers = {
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no'
+    }
+    if cache_status:
+        headers['X-Cache'] = cache_status
+    trace = g.get('trace')
+    if trace is not None:
+        events = _trace_stream(events, trace)
+    response = Response(_count_open_stream(sse_frames(events), request.endpoint),
+                        mimetype='text/event-stream', headers=headers)
+    ticket = g.pop('admission', None)
+    if ticket is not None:
+        response.call_on_close(ticket.release)  # the slot is held until the stream is written
+    return response
+
+
+def _count_open_stream(frames, route: str):
+    """Relay SSE frames, counting the response in the open-streams gauge while it is written."""
+    sse_open_streams.inc(route)
+    try:
+        yield from frames
+    finally:
+        sse_open_streams.dec(route)
+        if hasattr(frames, 'close'):
+            frames.close()
+
+
+def _collect_cache_metrics():
+    """Mirror the caches' own hit and miss counters into the metrics registry."""
+    for name, cache in (('response', response_cache), ('summary', summary_cache), ('suggestion', suggestion_cache)):
+        cache_lookups_total.set(cache.hits, name, 'hit')
+        cache_lookups_total.set(cache.misses, name, 'miss')
+
+
+metrics_registry.add_collector(_collect_cache_metrics)
+
+
+def _collect_admission_metrics():
+    """Mirror admission slots, queue depth and rejections into the metrics registry."""
+    for name, route_class in admission.snapshot()['classes'].items():
+        admission_in_flight.set(route_class['in_flight'], name)
+        admission_queue_depth.set(route_class['waiting'], name)
+        for reason, count in route_class['rejected'].items():
+            admission_rejected_total.set(count, name, reason)
+
+
+metrics_registry.add_collector(_collect_admission_metrics)
+
+
+def _collect_circuit_metrics():
+    """Mirror each model's circuit state and short-circuited calls into the metrics registry."""
+    for model, breaker in circuit_breakers.snapshot()['models'].items():
+        for state in (CLOSED, HALF_OPEN, OPEN):
+            circuit_breaker_state.set(1 if breaker['state'] == state else 0, model, state)
+        circuit_short_circuited_total.set(breaker['short_circuited'], model)
+
+
+metrics_registry.add_collector(_collect_circuit_metrics)
 
 
 @app.route('/')
@@ -383,16 +1368,15 @@ def index():
 @app.route('/api/figures')
 def api_figures():
     """Return list of all historical figures."""
-    figures = get_all_figures()
-    return jsonify({"figures": figures})
+    return FIGURES_RESPONSE.response()
 
 
 @app.route('/api/figures/<figure_id>')
 def api_figure(figure_id):
     """Return data for a single historical figure."""
-    figure = get_figure(figure_id)
-    if figure:
-        return jsonify({"figure": figure})
+    figure_response = FIGURE_RESPONSES.get(figure_id)
+    if figure_response:
+        return figure_response.response()
     else:
         return jsonify({"error": "Figure not found"}), 404
 
@@ -400,7 +1384,7 @@ def api_figure(figure_id):
 @app.route('/api/models')
 def api_models():
     """Return list of available AI models."""
-    return jsonify({"models": AVAILABLE_MODELS, "default": DEFAULT_MODEL})
+    return MODELS_RESPONSE.response()
 
 
 @app.route('/api/health')
@@ -408,7 +1392,21 @@ def api_health():
     """Health check endpoint for Railway monitoring."""
     health_status = {
         "status": "healthy",
-        "api_key_configured": bool(OPENROUTER_API_KEY)
+        "api_key_configured": bool(OPENROUTER_API_KEY),
+        "upstream_pool": upstream.metrics.snapshot(),
+        "prompt_cache": prompt_cache_stats(),
+        "response_cache": response_cache.stats(),
+        "pregenerated_openings": opening_store.stats(),
+        "sse_framing": sse_metrics.snapshot(),
+        "conversation_summaries": summarizer.stats(),
+        "sessions": session_store.stats() if session_store else None,
+        "suggestion_cache": suggestion_cache.stats(),
+        "time_to_first_token": ttft_stats.snapshot(),
+        "stream_hedging": {"enabled": STREAM_HEDGING, **hedge_metrics.snapshot()},
+        "admission": {"enabled": admission.enabled, **admission.snapshot()},
+        "model_health": model_health.snapshot(),
+        "circuit_breakers": circuit_breakers.snapshot(),
+        "model_router": model_router.snapshot()
     }
     
     if not OPENROUTER_API_KEY:
@@ -418,14 +1416,22 @@ def api_health():
     return jsonify(health_status)
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics, merged across gunicorn workers."""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
     """
     Handle chat messages.
     Expects JSON body: { "figure_id": "einstein", "message": "Hello!", "history": [...] }
-    Returns: { "response": "Ah, greetings!...", "figure": {...} }
+    With SESSION_STORE set, "session_id" plus "history_hash" may replace "history".
+    Returns: { "response": "Ah, greetings!...", "figure": {...}, "session": {...} }
     """
     try:
+        deadline = Deadline(CHAT_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
@@ -433,8 +1439,6 @@ def api_chat():
         
         figure_id = data.get('figure_id')
         user_message = data.get('message', '').strip()
-        history = data.get('history', [])
-        model = data.get('model')  # Optional model override
         
         if not figure_id:
             return jsonify({"error": "No figure_id provided"}), 400
@@ -442,28 +1446,32 @@ def api_chat():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
+        mark_stage('validate')
+        
         # Get figure data and system prompt
         figure = get_figure(figure_id)
         system_prompt = get_system_prompt(figure_id)
         
         if not figure or not system_prompt:
             return jsonify({"error": "Figure not found"}), 404
+        mark_stage('system_prompt')
         
-        # Build messages for the API
-        messages = [{"role": "system", "content": system_prompt}]
+        # Conversation history comes from the request or the server-side session
+        session_subject = f"figure:{figure_id}"
+        history, session_id, session_error = _load_history(data, session_subject)
+        if session_error:
+            return session_error
+        mark_stage('history')
         
-        # Add conversation history (limited to last MAX_HISTORY messages)
-        for msg in history[-MAX_HISTORY:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
+        model = _route_model(data.get('model'))  # Optional model, tier or "auto"
         
-        # Add the new user message
-        messages.append({"role": "user", "content": user_message})
+        # Build messages for the API: rolling summary of older turns, then history within the token budget
+        messages = _figure_chat_messages(figure_id, system_prompt, history, user_message, model)
+        mark_stage('prompt')
         
-        # Get AI response
-        ai_response, is_error = call_llm(messages, model)
+        # Get AI response (from the response cache when this turn is repeatable)
+        cache_key = _response_cache_key('chat', 'chat', figure_id, model, history, user_message)
+        ai_response, is_error = _cached_completion(cache_key, messages, model, deadline)
         
         if is_error:
             return jsonify({
@@ -471,9 +1479,11 @@ def api_chat():
                 "figure": figure
             }), 500
         else:
+            _refresh_summary(figure_id, history, user_message, ai_response)
             return jsonify({
                 "response": ai_response,
-                "figure": figure
+                "figure": figure,
+                **_session_fields(session_id, session_subject, history, user_message, ai_response)
             })
         
     except Exception as e:
@@ -486,9 +1496,11 @@ def api_chat_stream():
     """
     Handle streaming chat messages using Server-Sent Events.
     Expects JSON body: { "figure_id": "einstein", "message": "Hello!", "history": [...] }
-    Returns: SSE stream with content chunks
+    With SESSION_STORE set, "session_id" plus "history_hash" may replace "history".
+    Returns: SSE stream with content chunks, then session and suggestions events before done
     """
     try:
+        deadline = Deadline(STREAM_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
@@ -496,8 +1508,6 @@ def api_chat_stream():
         
         figure_id = data.get('figure_id')
         user_message = data.get('message', '').strip()
-        history = data.get('history', [])
-        model = data.get('model')  # Optional model override
         
         if not figure_id:
             return jsonify({"error": "No figure_id provided"}), 400
@@ -505,36 +1515,41 @@ def api_chat_stream():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
+        mark_stage('validate')
+        
         # Get figure data and system prompt
         figure = get_figure(figure_id)
         system_prompt = get_system_prompt(figure_id)
         
         if not figure or not system_prompt:
             return jsonify({"error": "Figure not found"}), 404
-        
-        # Build messages for the API
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (limited to last MAX_HISTORY messages)
-        for msg in history[-MAX_HISTORY:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Add the new user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Return streaming response
-        return Response(
-            stream_llm(messages, model),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+        mark_stage('system_prompt')
+        
+        # Conversation history comes from the request or the server-side session
+        session_subject = f"figure:{figure_id}"
+        history, session_id, session_error = _load_history(data, session_subject)
+        if session_error:
+            return session_error
+        mark_stage('history')
+        
+        model = _route_model(data.get('model'))  # Optional model, tier or "auto"
+        
+        # Build messages for the API: rolling summary of older turns, then history within the token budget
+        messages = _figure_chat_messages(figure_id, system_prompt, history, user_message, model)
+        mark_stage('prompt')
+        
+        # Return streaming response; the next turn's summary is prepared once this reply completes
+        cache_key = _response_cache_key('chat-stream', 'chat', figure_id, model, history, user_message)
+        events, cache_status = _cached_stream_events(cache_key, messages, model, deadline=deadline)
+        events = _summarize_after(events, figure_id, history, user_message)
+        events = _session_after(events, session_id, session_subject, history, user_message)
+        turn_history = history + [{"role": "user", "content": user_message}]
+        events = _suggest_alongside(events, lambda basis: _generate_suggestions(
+            'figure', figure_id, turn_history, basis,
+            lambda text: figure_suggestion_messages(figure['name'], turn_history, text),
+            parse_figure_suggestions
+        ))
+        return _event_stream_response(events, cache_status)
         
     except Exception as e:
         app.logger.error(f"Stream chat error: {e}")
@@ -544,7 +1559,7 @@ def api_chat_stream():
 @app.route('/api/dinner-party/combos')
 def api_dinner_party_combos():
     """Return curated guest combinations for dinner parties."""
-    return jsonify({"combos": CURATED_COMBOS})
+    return COMBOS_RESPONSE.response()
 
 
 @app.route('/api/dinner-party/chat', methods=['POST'])
@@ -554,6 +1569,7 @@ def api_dinner_party_chat():
     Uses a single LLM call with structured output for efficiency.
     """
     try:
+        deadline = Deadline(CHAT_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
@@ -561,8 +1577,6 @@ def api_dinner_party_chat():
         
         guest_ids = data.get('guests', [])
         user_message = data.get('message', '').strip()
-        history = data.get('history', [])
-        model = data.get('model')
         
         if not guest_ids or len(guest_ids) < 2:
             return jsonify({"error": "At least 2 guests required"}), 400
@@ -581,24 +1595,28 @@ def api_dinner_party_chat():
                 return jsonify({"error": f"Guest '{guest_id}' not found"}), 404
             guests.append(figure)
         
+        mark_stage('validate')
+        
         # Build the dinner party system prompt
         system_prompt = get_dinner_party_prompt(guest_ids)
+        mark_stage('system_prompt')
         
-        # Build messages for the API
-        messages = [{"role": "system", "content": system_prompt}]
+        # Conversation history comes from the request or the server-side session
+        session_subject = f"party:{','.join(guest_ids)}"
+        history, session_id, session_error = _load_history(data, session_subject)
+        if session_error:
+            return session_error
+        mark_stage('history')
         
-        # Add conversation history
-        for msg in history[-MAX_HISTORY:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
+        model = _route_model(data.get('model'))  # Optional model, tier or "auto"
         
-        # Add the new user message
-        messages.append({"role": "user", "content": user_message})
+        # Build messages for the API, trimming history to the model's token budget
+        messages = _build_messages(system_prompt, history, user_message, model)
+        mark_stage('prompt')
         
-        # Get AI response
-        ai_response, is_error = call_llm(messages, model)
+        # Get AI response (from the response cache when this turn is repeatable)
+        cache_key = _response_cache_key('dinner-party', 'dinner-party', guest_ids, model, history, user_message)
+        ai_response, is_error = _cached_completion(cache_key, messages, model, deadline)
         
         if is_error:
             return jsonify({
@@ -613,7 +1631,8 @@ def api_dinner_party_chat():
         return jsonify({
             "responses": responses,
             "raw_response": ai_response,
-            "guests": guests
+            "guests": guests,
+            **_session_fields(session_id, session_subject, history, user_message, ai_response)
         })
         
     except Exception as e:
@@ -625,8 +1644,13 @@ def api_dinner_party_chat():
 def api_dinner_party_chat_stream():
     """
     Handle streaming dinner party messages using Server-Sent Events.
+    Each guest's reply is streamed as typed events: guest_start, content and guest_end,
+    all carrying the guest's figure_id. Optional "mode": "parallel" answers with one
+    concurrent upstream request per guest instead of a single shared completion, and
+    "sequential" with one request per guest in order, each reacting to the guests before.
     """
     try:
+        deadline = Deadline(STREAM_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
@@ -634,8 +1658,7 @@ def api_dinner_party_chat_stream():
         
         guest_ids = data.get('guests', [])
         user_message = data.get('message', '').strip()
-        history = data.get('history', [])
-        model = data.get('model')
+        mode = data.get('mode') or SALON_MODE
         
         if not guest_ids or len(guest_ids) < 2:
             return jsonify({"error": "At least 2 guests required"}), 400
@@ -646,37 +1669,68 @@ def api_dinner_party_chat_stream():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
+        if not isinstance(mode, str) or mode not in SALON_MODES:
+            return jsonify({"error": f"Unknown salon mode {mode!r}"}), 400
+        
         # Validate all guests exist
         for guest_id in guest_ids:
             if not get_figure(guest_id):
                 return jsonify({"error": f"Guest '{guest_id}' not found"}), 404
         
+        mark_stage('validate')
+        
         # Build the dinner party system prompt
         system_prompt = get_dinner_party_prompt(guest_ids)
-        
-        # Build messages for the API
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history
-        for msg in history[-MAX_HISTORY:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Add the new user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Return streaming response
-        return Response(
-            stream_llm(messages, model),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+        mark_stage('system_prompt')
+        
+        # Conversation history comes from the request or the server-side session
+        session_subject = f"party:{','.join(guest_ids)}"
+        history, session_id, session_error = _load_history(data, session_subject)
+        if session_error:
+            return session_error
+        mark_stage('history')
+        
+        model = _route_model(data.get('model'))  # Optional model, tier or "auto"
+        
+        # Build messages for the API, trimming history to the model's token budget
+        messages = _build_messages(system_prompt, history, user_message, model)
+        mark_stage('prompt')
+        
+        # Return streaming response. Parallel guests share the request's deadline; in
+        # sequential mode each guest's stream starts later and gets its own.
+        live = None
+        endpoint = request.endpoint
+        if mode == 'parallel':
+            live = lambda: fan_out_events(
+                guest_ids,
+                lambda guest_id: _salon_guest_messages(messages, guest_id),
+                lambda guest_messages: _live_stream_events(
+                    guest_messages, model, max_tokens=SALON_GUEST_MAX_TOKENS, deadline=deadline, route=endpoint
+                )
+            )
+        elif mode == 'sequential':
+            live = lambda: turn_taking_events(
+                guest_ids,
+                lambda guest_id, prior_turns: _salon_reaction_messages(messages, guest_id, prior_turns),
+                lambda guest_messages: _live_stream_events(
+                    guest_messages, model, max_tokens=SALON_GUEST_MAX_TOKENS,
+                    deadline=Deadline(STREAM_DEADLINE_SECONDS), route=endpoint
+                )
+            )
+        # Single mode shares its entries with the non-streaming route; the multi-request modes
+        # answer with a different event shape, so each keeps its own
+        kind = 'dinner-party' if mode == 'single' else f'dinner-party-{mode}'
+        cache_key = _response_cache_key('dinner-party-stream', kind, guest_ids, model, history, user_message)
+        events, cache_status = _cached_stream_events(cache_key, messages, model, live, deadline)
+        # Emit guest_start / content / guest_end events as each guest's marker arrives
+        events = _session_after(events, session_id, session_subject, history, user_message)
+        guest_names = [get_figure(guest_id)['name'] for guest_id in guest_ids]
+        events = _suggest_alongside(parse_guest_stream(events, guest_ids), lambda basis: _generate_suggestions(
+            'dinner-party', guest_ids, [], basis,
+            lambda text: party_suggestion_messages(guest_names, text),
+            parse_party_suggestions
+        ))
+        return _event_stream_response(events, cache_status)
         
     except Exception as e:
         app.logger.error(f"Dinner party stream error: {e}")
@@ -688,83 +1742,32 @@ def parse_dinner_party_response(response: str, guest_ids: list) -> list:
     Parse the dinner party response into individual figure responses.
     Expected format: [FIGURE_ID]: response text
     """
-    responses = []
-    current_figure = None
-    current_text = []
-    
-    lines = response.strip().split('\n')
-    
-    for line in lines:
-        # Check if this line starts a new figure's response
-        found_figure = False
-        for guest_id in guest_ids:
-            # Check for various formats: [einstein]:, EINSTEIN:, **Einstein:**
-            markers = [
-                f"[{guest_id}]:",
-                f"[{guest_id.upper()}]:",
-                f"{guest_id.upper()}:",
-                f"**{guest_id.title()}:**",
-                f"**{get_figure(guest_id)['name']}:**",
-                f"{get_figure(guest_id)['name']}:",
-            ]
-            for marker in markers:
-                if line.strip().upper().startswith(marker.upper().rstrip(':')):
-                    # Save previous figure's response
-                    if current_figure and current_text:
-                        responses.append({
-                            "figure_id": current_figure,
-                            "response": '\n'.join(current_text).strip()
-                        })
-                    
-                    current_figure = guest_id
-                    # Extract text after the marker
-                    remaining = line
-                    for m in markers:
-                        if remaining.strip().upper().startswith(m.upper().rstrip(':')):
-                            remaining = remaining[len(m):].strip()
-                            break
-                    current_text = [remaining] if remaining else []
-                    found_figure = True
-                    break
-            if found_figure:
-                break
-        
-        if not found_figure and current_figure:
-            current_text.append(line)
-    
-    # Don't forget the last figure's response
-    if current_figure and current_text:
-        responses.append({
-            "figure_id": current_figure,
-            "response": '\n'.join(current_text).strip()
-        })
-    
-    # If parsing failed, return the whole response attributed to first guest
-    if not responses and response.strip():
-        responses.append({
-            "figure_id": guest_ids[0],
-            "response": response.strip()
-        })
-    
-    return responses
+    return parse_salon_response(response, guest_ids)
 
 
 @app.route('/api/dinner-party/suggestions', methods=['POST'])
 def api_dinner_party_suggestions():
     """
     Generate follow-up question suggestions for dinner party using LLM.
-    Returns quickly with 3 contextual suggestions.
+    Streamed salon replies already carry them as a suggestions event; this is the
+    cached fallback. Returns quickly with 3 contextual suggestions.
     """
     try:
+        deadline = Deadline(SUGGESTION_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
             return jsonify({"suggestions": ["What do you think?", "Tell us more!", "Do you agree?"]}), 200
         
         guest_ids = data.get('guests', [])
-        history = data.get('history', [])
         last_response = data.get('last_response', '')
         
+        # The client sends the "[guest_id]: text" transcript; like the streamed reply's
+        # suggestions, these are based on the first speaker's turn
+        turns = parse_salon_response(last_response, guest_ids) if guest_ids else []
+        if turns:
+            last_response = turns[0]['response']
+        
         # Build guest names
         guest_names = []
         for guest_id in guest_ids:
@@ -772,52 +1775,30 @@ def api_dinner_party_suggestions():
             if figure:
                 guest_names.append(figure['name'])
         
-        prompt = f"""Generate 3 short follow-up questions (under 40 chars each) for a dinner party with {', '.join(guest_names[:3])}.
-
-Last response: "{last_response[:200]}..."
-
-Return ONLY a JSON array: ["Question 1?", "Question 2?", "Question 3?"]"""
-        
-        messages = [
-            {"role": "system", "content": "You generate short, engaging discussion questions. Return only valid JSON array, no other text."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response, is_error = call_llm(messages, None)
-        
-        if is_error:
-            return jsonify({"suggestions": ["What else?", "Do you agree?", "Tell us more!"]}), 200
-        
-        # Parse JSON response
-        try:
-            import re
-            import json
-            match = re.search(r'\[.*?\]', response, re.DOTALL)
-            if match:
-                suggestions = json.loads(match.group())
-                if isinstance(suggestions, list) and len(suggestions) >= 3:
-                    suggestions = [s.strip()[:40] for s in suggestions[:3] if s.strip()]
-                    if len(suggestions) >= 3:
-                        return jsonify({"suggestions": suggestions}), 200
-        except Exception:
-            pass
-        
-        # Fallback
-        return jsonify({"suggestions": ["What else?", "Do you agree?", "Tell us more!"]}), 200
+        suggestions = _generate_suggestions(
+            'dinner-party', guest_ids, [], last_response,
+            lambda text: party_suggestion_messages(guest_names, text),
+            parse_party_suggestions,
+            deadline
+        )
+        return jsonify({"suggestions": suggestions or PARTY_FALLBACK_SUGGESTIONS}), 200
         
     except Exception as e:
         app.logger.error(f"Suggestions error: {e}")
-        return jsonify({"suggestions": ["What else?", "Do you agree?", "Tell us more!"]}), 200
+        return jsonify({"suggestions": PARTY_FALLBACK_SUGGESTIONS}), 200
 
 
 @app.route('/api/suggestions', methods=['POST'])
 def api_suggestions():
     """
     Generate contextual follow-up questions based on conversation history.
-    Expects JSON body: { "figure_id": "einstein", "history": [...], "last_response": "..." }
+    Streamed figure replies already carry them as a suggestions event; this is the
+    cached fallback.
+    Expects JSON body: { "figure_id": "einstein", "history": [...], "last_response": "...", "model": "..." (optional) }
     Returns: { "suggestions": ["question1", "question2", ...] }
     """
     try:
+        deadline = Deadline(SUGGESTION_DEADLINE_SECONDS)
         data = request.get_json()
         
         if not data:
@@ -826,7 +1807,7 @@ def api_suggestions():
         figure_id = data.get('figure_id')
         history = data.get('history', [])
         last_response = data.get('last_response', '')
-        model = data.get('model')  # Optional model override
+        model = data.get('model')  # Optional suggestion model override
         
         if not figure_id:
             return jsonify({"error": "No figure_id provided"}), 400
@@ -836,69 +1817,26 @@ def api_suggestions():
         if not figure:
             return jsonify({"error": "Figure not found"}), 404
         
-        # Build a prompt to generate contextual questions
-        conversation_context = ""
-        if history:
-            # Include last few exchanges for context
-            recent_history = history[-4:] if len(history) > 4 else history
-            for msg in recent_history:
-                role = "User" if msg.get("role") == "user" else figure['name']
-                conversation_context += f"{role}: {msg.get('content', '')}\n\n"
-        
-        if last_response:
-            conversation_context += f"{figure['name']}: {last_response}\n\n"
-        
-        recent_context = conversation_context[-500:] if len(conversation_context) > 500 else conversation_context
-        suggestion_prompt = f"""Generate 2-3 short follow-up questions (under 50 chars each) for a conversation with {figure['name']}.
-
-Last exchange:
-{recent_context}
-
-Return ONLY the questions, one per line, no numbering."""
-
-        messages = [
-            {"role": "system", "content": "Generate 2-3 short conversation questions. Return only questions, one per line."},
-            {"role": "user", "content": suggestion_prompt}
-        ]
-        
-        fast_model = "meta-llama/llama-3.3-70b-instruct:free"
-        response_text, is_error = call_llm_suggestions(messages, fast_model)
-        
-        # If there's an error, use fallback suggestions
-        if is_error:
-            app.logger.warning(f"Failed to generate suggestions: {response_text}")
-        
-        # Parse the response into individual questions
-        suggestions = []
-        for line in response_text.strip().split('\n'):
-            line = line.strip()
-            # Remove numbering/bullets if present
-            line = line.lstrip('0123456789.-•* ').strip()
-            if line and len(line) > 10:  # Filter out very short lines
-                suggestions.append(line)
-        
-        suggestions = suggestions[:3]
+        # The client's history ends with the reply itself; without it the cache key matches
+        # the one the streamed turn used
+        if history and history[-1].get('role') == 'assistant' and history[-1].get('content') == last_response:
+            history = history[:-1]
+        
+        suggestions = _generate_suggestions(
+            'figure', figure_id, history, last_response,
+            lambda text: figure_suggestion_messages(figure['name'], history, text),
+            parse_figure_suggestions,
+            deadline,
+            model
+        )
         
         # If we didn't get good suggestions, provide some generic ones
-        if not suggestions:
-            suggestions = [
-                "Tell me more about that.",
-                "What was your perspective on that?",
-                "How did that affect you?"
-            ]
-        
-        return jsonify({"suggestions": suggestions})
+        return jsonify({"suggestions": suggestions or FIGURE_FALLBACK_SUGGESTIONS})
         
     except Exception as e:
         app.logger.error(f"Suggestions error: {e}")
         # Return generic fallback suggestions
-        return jsonify({
-            "suggestions": [
-                "Tell me more about that.",
-                "What was your perspective on that?",
-                "How did that affect you?"
-            ]
-        })
+        return jsonify({"suggestions": FIGURE_FALLBACK_SUGGESTIONS})
 
 
 @app.errorhandler(404)
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: salon reply parsing.
+
+Compares the previous line x guest x marker parser (which rebuilt a figure dict
+for every marker check) with the single-pass compiled-marker parser on a
+realistic five-guest, ~800-token reply.
+
+Usage:
+    python benchmarks/bench_salon_parser.py [--iterations 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figures import CURATED_COMBOS, _build_figure_record  # noqa: E402
+from salon_parser import parse_salon_response  # noqa: E402
+
+GUESTS = CURATED_COMBOS["right-to-rule"]["guests"]
+
+PARAGRAPH = (
+    "The question you put to us turns on what authority is owed when the law itself "
+    "protects an injustice, and I cannot answer it without recalling the conditions "
+    "under which I acted, the people whose consent I claimed, and the limits that my "
+    "own period placed upon what I could know or be expected to judge."
+)
+
+
+def build_reply() -> str:
+    """Five guests, two paragraphs each, roughly 800 tokens in total."""
+    turns = []
+    for guest_id in GUESTS:
+        turns.append(f"[{guest_id}]: {PARAGRAPH}\n\n{PARAGRAPH} {PARAGRAPH[:40]}.")
+    return "\n\n".join(turns)
+
+
+def legacy_parse(response: str, guest_ids: list) -> list:
+    """The previous implementation, with get_figure rebuilding a record per call as it did."""
+    def get_figure(figure_id):
+        return _build_figure_record(figure_id, "ARC-PENDING")
+
+    responses = []
+    current_figure = None
+    current_text = []
+    for line in response.strip().split('\n'):
+        found_figure = False
+        for guest_id in guest_ids:
+            markers = [
+                f"[{guest_id}]:",
+                f"[{guest_id.upper()}]:",
+                f"{guest_id.upper()}:",
+                f"**{guest_id.title()}:**",
+                f"**{get_figure(guest_id)['name']}:**",
+                f"{get_figure(guest_id)['name']}:",
+            ]
+            for marker in markers:
+                if line.strip().upper().startswith(marker.upper().rstrip(':')):
+                    if current_figure and current_text:
+                        responses.append({"figure_id": current_figure, "response": '\n'.join(current_text).strip()})
+                    current_figure = guest_id
+                    remaining = line
+                    for m in markers:
+                        if remaining.strip().upper().startswith(m.upper().rstrip(':')):
+                            remaining = remaining[len(m):].strip()
+                            break
+                    current_text = [remaining] if remaining else []
+                    found_figure = True
+                    break
+            if found_figure:
+                break
+        if not found_figure and current_figure:
+            current_text.append(line)
+    if current_figure and current_text:
+        responses.append({"figure_id": current_figure, "response": '\n'.join(current_text).strip()})
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    reply = build_reply()
+    assert legacy_parse(reply, GUESTS) == parse_salon_response(reply, GUESTS)
+
+    legacy = timeit.timeit(lambda: legacy_parse(reply, GUESTS), number=args.iterations)
+    compiled = timeit.timeit(lambda: parse_salon_response(reply, GUESTS), number=args.iterations)
+
+    print(f"reply: {len(GUESTS)} guests, {len(reply)} chars (~{len(reply) // 4} tokens)")
+    print(f"legacy parser:   {legacy / args.iterations * 1e6:9.1f} us/reply")
+    print(f"compiled parser: {compiled / args.iterations * 1e6:9.1f} us/reply")
+    print(f"speedup:         {legacy / compiled:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
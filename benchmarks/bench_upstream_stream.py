@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: upstream completion stream parsing.
+
+Replays a recorded OpenRouter chat completion stream (a three-guest salon reply
+with keep-alive comments, a role-only opening chunk, an empty finish chunk and
+a usage chunk) through requests, and compares the previous iter_lines loop,
+which decoded and json.loads'd every data line, with UpstreamStreamParser.
+Throughput is for one core.
+
+Usage:
+    python benchmarks/bench_upstream_stream.py [--iterations 500] [--fixture PATH]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sse import UPSTREAM_READ_SIZE, UpstreamStreamParser  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openrouter_salon_stream.sse")
+
+
+def replay(body: bytes) -> requests.Response:
+    """A streaming requests.Response whose socket is the recorded body."""
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def legacy_read(body: bytes) -> str:
+    """The previous stream loop, minus the yields."""
+    parts = []
+    for line in replay(body).iter_lines():
+        if line:
+            line_text = line.decode('utf-8')
+            if line_text.startswith('data: '):
+                data_str = line_text[6:]
+                if data_str.strip() == '[DONE]':
+                    break
+                try:
+                    data = json.loads(data_str)
+                    if 'choices' in data and len(data['choices']) > 0:
+                        content = data['choices'][0].get('delta', {}).get('content', '')
+                        if content:
+                            parts.append(content)
+                except json.JSONDecodeError:
+                    continue
+    return ''.join(parts)
+
+
+def incremental_read(body: bytes) -> str:
+    parser = UpstreamStreamParser()
+    parts = []
+    for chunk in replay(body).iter_content(chunk_size=UPSTREAM_READ_SIZE):
+        parts.extend(parser.feed(chunk))
+        if parser.done:
+            break
+    assert parser.usage is not None
+    return ''.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--fixture", default=FIXTURE)
+    args = parser.parse_args()
+
+    with open(args.fixture, "rb") as f:
+        body = f.read()
+    frames = body.count(b"\n\n")
+    assert legacy_read(body) == incremental_read(body)
+
+    legacy = timeit.timeit(lambda: legacy_read(body), number=args.iterations) / args.iterations
+    incremental = timeit.timeit(lambda: incremental_read(body), number=args.iterations) / args.iterations
+
+    print(f"stream: {frames} frames, {len(body)} bytes")
+    for label, seconds in (("iter_lines + json.loads", legacy), ("incremental parser", incremental)):
+        print(f"{label:24} {seconds * 1e6:9.1f} us/stream  {len(body) / seconds / 1e6:7.1f} MB/s  "
+              f"{frames / seconds / 1000:7.1f}k frames/s")
+    print(f"speedup:                 {legacy / incremental:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
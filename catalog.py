@@ -0,0 +1,50 @@
+"""
+Pre-serialized JSON payloads for SeanceAI's read-only catalog routes.
+Figures, models and curated salons never change while a worker runs, so each
+payload is encoded, gzipped and hashed once and then served as raw bytes with a
+strong ETag that lets browsers revalidate with a cheap 304.
+"""
+
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+# Payloads smaller than this are not worth a Content-Encoding round trip
+GZIP_MIN_BYTES = 512
+
+
+class PrecomputedJSON:
+    """An immutable JSON response body with identity and gzip representations."""
+
+    def __init__(self, payload):
+        # Matches Flask's compact jsonify output (insertion order, ASCII-escaped)
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        if len(self.body) >= GZIP_MIN_BYTES:
+            self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+            # Each representation needs its own strong validator
+            self.gzip_etag = f"{digest}-gzip"
+        else:
+            self.gzipped = None
+            self.gzip_etag = None
+
+    def response(self) -> Response:
+        """Serve the payload for the current request, answering 304 when the ETag matches."""
+        use_gzip = self.gzipped is not None and request.accept_encodings["gzip"] > 0
+        etag = self.gzip_etag if use_gzip else self.etag
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.gzipped if use_gzip else self.body, mimetype="application/json")
+            if use_gzip:
+                response.headers["Content-Encoding"] = "gzip"
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        if self.gzipped is not None:
+            response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,158 @@
+"""
+Per-model circuit breakers for SeanceAI's fallback chain.
+A model that keeps timing out would otherwise be tried on every request, each
+attempt waiting out a 30-60s timeout before the fallback model gets a turn. Each
+model's breaker watches its recent outcomes: once enough calls fail or are slow,
+it opens and requests skip that model straight to the next one. After
+open_seconds it goes half-open and lets a few probe requests through; enough
+successful probes close it again, and any failed probe opens it again.
+
+Rate limits are not failures here (ModelHealth cools those models down); only
+errors, timeouts and slow replies count. Breakers are per worker.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state for one model over its last window calls."""
+
+    def __init__(self, model: str, window: int = 20, min_calls: int = 5, error_rate: float = 0.5,
+                 slow_rate: float = 0.5, open_seconds: float = 30.0, probes: int = 2, on_transition=None):
+        self.model = model
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.on_transition = on_transition
+        self.state = CLOSED
+        self.changed_at = time.monotonic()
+        self.short_circuited = 0
+        self.transitions = deque(maxlen=10)
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._probes_started = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def _move(self, state: str, reason: str):
+        previous, self.state = self.state, state
+        self.changed_at = time.monotonic()
+        self._probes_started = self._probe_successes = 0
+        if state != HALF_OPEN:
+            self._outcomes.clear()
+        self.transitions.append({"at": time.time(), "from": previous, "to": state, "reason": reason})
+        if self.on_transition:
+            self.on_transition(self.model, previous, state, reason)
+
+    def allow(self) -> bool:
+        """Whether a request may call this model now; counts half-open probes as they start."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.changed_at < self.open_seconds:
+                    self.short_circuited += 1
+                    return False
+                self._move(HALF_OPEN, f"open for {self.open_seconds:g}s")
+            if self.state == HALF_OPEN:
+                if self._probes_started >= self.probes:
+                    # Probes that never reported (a 429, a cancelled hedge) are replaced after a while
+                    if now - self.changed_at < self.open_seconds:
+                        self.short_circuited += 1
+                        return False
+                    self.changed_at = now
+                    self._probes_started = self._probe_successes
+                self._probes_started += 1
+            return True
+
+    def record_success(self, slow: bool = False):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if slow:
+                    self._move(OPEN, "slow probe")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._move(CLOSED, f"{self._probe_successes} probes succeeded")
+                return
+            self._outcomes.append((False, slow))
+            self._check()
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._move(OPEN, "failed probe")
+                return
+            self._outcomes.append((True, False))
+            self._check()
+
+    def _check(self):
+        calls = len(self._outcomes)
+        if self.state != CLOSED or calls < self.min_calls:
+            return
+        failed = sum(1 for failure, _ in self._outcomes if failure) / calls
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow) / calls
+        if failed >= self.error_rate:
+            self._move(OPEN, f"error rate {failed:.0%} over {calls} calls")
+        elif slow >= self.slow_rate:
+            self._move(OPEN, f"slow-call rate {slow:.0%} over {calls} calls")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "for_s": round(time.monotonic() - self.changed_at, 1),
+                "calls": calls,
+                "error_rate": round(sum(1 for f, _ in self._outcomes if f) / calls, 3) if calls else 0.0,
+                "slow_rate": round(sum(1 for _, s in self._outcomes if s) / calls, 3) if calls else 0.0,
+                "short_circuited": self.short_circuited,
+                "transitions": list(self.transitions),
+            }
+
+
+class CircuitBreakers:
+    """This worker's breakers, created per model on first use with shared settings."""
+
+    def __init__(self, enabled: bool = True, on_transition=None, **settings):
+        self.enabled = enabled
+        self.on_transition = on_transition
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    model, CircuitBreaker(model, on_transition=self.on_transition, **self.settings))
+        return breaker
+
+    def allow(self, model: str) -> bool:
+        return not self.enabled or self.get(model).allow()
+
+    def record_success(self, model: str, slow: bool = False):
+        if self.enabled:
+            self.get(model).record_success(slow)
+
+    def record_failure(self, model: str):
+        if self.enabled:
+            self.get(model).record_failure()
+
+    def state(self, model: str) -> str:
+        breaker = self._breakers.get(model)
+        return breaker.state if breaker else CLOSED
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "models": {model: breaker.snapshot() for model, breaker in sorted(self._breakers.items())},
+        }
@@ -0,0 +1,51 @@
+"""
+Per-request deadlines for SeanceAI.
+A route sets one time budget for everything it asks of OpenRouter: each attempt's
+timeout is clipped to what is left, a backoff sleep only happens if an attempt can
+still follow it, and model fallback stops once no attempt fits. The caller gets a
+specific "no reply within N s" error instead of a worker tied up for minutes.
+"""
+
+import time
+
+# An attempt with less time than this left is not worth starting
+MIN_ATTEMPT_SECONDS = 1.0
+
+
+class Deadline:
+    """A fixed point in time, measured on the monotonic clock, by which work must finish."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def can_attempt(self, reserve: float = MIN_ATTEMPT_SECONDS) -> bool:
+        """Whether enough time is left to start another upstream attempt."""
+        return self.remaining() >= reserve
+
+    def timeout(self, cap: float) -> float:
+        """A request timeout of at most cap seconds that does not outlive the deadline."""
+        return max(0.001, min(cap, self.remaining()))
+
+    def sleep(self, delay: float, reserve: float = MIN_ATTEMPT_SECONDS) -> bool:
+        """
+        Sleep for delay seconds if an attempt can still be made afterwards. Returns
+        False without sleeping if it could not.
+        """
+        if self.remaining() < delay + reserve:
+            return False
+        time.sleep(delay)
+        return True
+
+    def describe(self) -> str:
+        return f"{self.seconds:g}s"
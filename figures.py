@@ -2,6 +2,8 @@
 Historical Figures Data and Prompt Templates for SeanceAI
 """
 
+from functools import lru_cache
+
 FIGURE_PROMPT_TEMPLATE = """You are {name}, {title}, who lived from {birth_year} to {death_year}.
 
 PERSONALITY & SPEAKING STYLE:
@@ -1206,47 +1208,94 @@ RULES:
 Respond to the moderator now."""
 
 
-def get_dinner_party_prompt(guest_ids: list) -> str:
-    """Generate the system prompt for a dinner party with multiple guests."""
-    guest_descriptions = []
-    
-    for guest_id in guest_ids:
-        figure = HISTORICAL_FIGURES.get(guest_id)
-        if figure:
-            # Handle BCE dates
-            birth = f"{abs(figure['birth_year'])} BCE" if figure['birth_year'] < 0 else str(figure['birth_year'])
-            death = f"{abs(figure['death_year'])} BCE" if figure['death_year'] < 0 else str(figure['death_year'])
-            
-            desc = f"""**{figure['name']}** ({figure['title']}, {birth}-{death})
+# Bound on distinct salon guest lineups whose compiled prompts are kept in memory
+SALON_PROMPT_CACHE_SIZE = 256
+
+
+def _format_year(year: int) -> str:
+    """Format a year for display, handling BCE dates."""
+    return f"{abs(year)} BCE" if year < 0 else str(year)
+
+
+def _compile_figure_prompt(figure: dict) -> str:
+    """Render the single-figure system prompt for one figure."""
+    return FIGURE_PROMPT_TEMPLATE.format(
+        name=figure['name'],
+        title=figure['title'],
+        birth_year=_format_year(figure['birth_year']),
+        death_year=_format_year(figure['death_year']),
+        personality=figure['personality'],
+        beliefs=figure['beliefs']
+    )
+
+
+def _compile_guest_description(guest_id: str, figure: dict) -> str:
+    """Render one guest's block of the dinner party system prompt."""
+    birth = _format_year(figure['birth_year'])
+    death = _format_year(figure['death_year'])
+    return f"""**{figure['name']}** ({figure['title']}, {birth}-{death})
 - Personality: {figure['personality']}
 - Beliefs: {figure['beliefs']}
 - Knowledge boundary: nothing after {death}; earlier dates are not proof of firsthand knowledge
 - Guest ID for responses: [{guest_id}]"""
-            guest_descriptions.append(desc)
-    
+
+
+# Every persona prompt is compiled once at import; chat turns reuse the same strings,
+# which also keeps the prompt prefix byte-identical for provider-side prompt caching.
+FIGURE_PROMPTS = {
+    fig_id: _compile_figure_prompt(figure) for fig_id, figure in HISTORICAL_FIGURES.items()
+}
+_GUEST_DESCRIPTIONS = {
+    fig_id: _compile_guest_description(fig_id, figure) for fig_id, figure in HISTORICAL_FIGURES.items()
+}
+
+
+@lru_cache(maxsize=SALON_PROMPT_CACHE_SIZE)
+def _compile_dinner_party_prompt(guest_ids: tuple) -> str:
+    """Render the salon prompt for an ordered guest lineup."""
+    guest_descriptions = [_GUEST_DESCRIPTIONS[guest_id] for guest_id in guest_ids if guest_id in _GUEST_DESCRIPTIONS]
     return DINNER_PARTY_PROMPT_TEMPLATE.format(
         guest_descriptions='\n\n'.join(guest_descriptions)
     )
 
 
-def get_system_prompt(figure_id: str) -> str:
-    """Generate the system prompt for a historical figure."""
-    figure = HISTORICAL_FIGURES.get(figure_id)
+def get_dinner_party_prompt(guest_ids: list) -> str:
+    """Generate the system prompt for a dinner party with multiple guests."""
+    return _compile_dinner_party_prompt(tuple(guest_ids))
+
+
+SALON_GUEST_TURN_TEMPLATE = """[Salon turn: reply now only as {name} ({guest_id}). Give this guest's response in 1-2 paragraphs without a speaker marker, and do not write lines for any other guest.]"""
+
+SALON_REACTION_TURN_TEMPLATE = """[Salon turn: {name} ({guest_id}) speaks next. Answer the moderator and react to what the guests above just said where it is natural, in 1-2 paragraphs without a speaker marker, and do not write lines for any other guest.]"""
+
+
+def get_salon_guest_turn(guest_id: str, reacting: bool = False) -> str:
+    """
+    Instruction asking one guest to answer on their own.
+    With reacting=True the guest is also asked to respond to the turns already given.
+    """
+    figure = HISTORICAL_FIGURES.get(guest_id)
     if not figure:
         return None
-    
-    # Handle BCE dates
-    birth = f"{abs(figure['birth_year'])} BCE" if figure['birth_year'] < 0 else str(figure['birth_year'])
-    death = f"{abs(figure['death_year'])} BCE" if figure['death_year'] < 0 else str(figure['death_year'])
-    
-    return FIGURE_PROMPT_TEMPLATE.format(
-        name=figure['name'],
-        title=figure['title'],
-        birth_year=birth,
-        death_year=death,
-        personality=figure['personality'],
-        beliefs=figure['beliefs']
-    )
+    template = SALON_REACTION_TURN_TEMPLATE if reacting else SALON_GUEST_TURN_TEMPLATE
+    return template.format(name=figure['name'], guest_id=guest_id)
+
+
+def get_system_prompt(figure_id: str) -> str:
+    """Generate the system prompt for a historical figure."""
+    return FIGURE_PROMPTS.get(figure_id)
+
+
+def prompt_cache_stats() -> dict:
+    """Report compiled prompt counts and salon prompt cache hit/miss counters."""
+    info = _compile_dinner_party_prompt.cache_info()
+    return {
+        "figure_prompts": len(FIGURE_PROMPTS),
+        "salon_prompts": info.currsize,
+        "salon_capacity": info.maxsize,
+        "salon_hits": info.hits,
+        "salon_misses": info.misses,
+    }
 
 
 def get_figure_display_dates(figure_id: str) -> str:
@@ -1255,67 +1304,27 @@ def get_figure_display_dates(figure_id: str) -> str:
     if not figure:
         return ""
     
-    birth = f"{abs(figure['birth_year'])} BCE" if figure['birth_year'] < 0 else str(figure['birth_year'])
-    death = f"{abs(figure['death_year'])} BCE" if figure['death_year'] < 0 else str(figure['death_year'])
-    
-    return f"{birth} - {death}"
+    return f"{_format_year(figure['birth_year'])} - {_format_year(figure['death_year'])}"
 
 
-def get_all_figures() -> list:
-    """Get all figures formatted for the API response."""
-    figures = []
-    for fig_id, fig_data in HISTORICAL_FIGURES.items():
-        metadata = CURATORIAL_METADATA.get(fig_id, {})
-        figures.append({
-            "id": fig_data["id"],
-            "name": fig_data["name"],
-            "title": fig_data["title"],
-            "dates": get_figure_display_dates(fig_id),
-            "era": fig_data["era"],
-            "tagline": fig_data["tagline"],
-            "starter_questions": metadata.get("questions", fig_data["starter_questions"]),
-            "birth_year": fig_data["birth_year"],
-            "death_year": fig_data["death_year"],
-            "knowledge_cutoff": get_figure_display_dates(fig_id).split(" - ")[-1],
-            "featured": fig_id in FEATURED_FIGURE_IDS,
-            "catalog_id": metadata.get("catalog_id", f"ARC-{len(figures) + 1:03d}"),
-            "locations": metadata.get("locations", "Location record pending verification"),
-            "curatorial_introduction": metadata.get(
-                "introduction",
-                "This archive persona is retained from the original collection; curatorial review is pending."
-            ),
-            "limitations": metadata.get(
-                "limitations",
-                "Persona notes and interpretive claims have not yet received source-by-source curatorial review."
-            ),
-            "source_status": "Sources pending verification",
-            "primary_sources": [],
-            "secondary_sources": [],
-            "portrait_status": "Interpretive likeness; source and license pending verification"
-        })
-    return figures
-
-
-def get_figure(figure_id: str) -> dict:
-    """Get a single figure formatted for the API response."""
-    figure = HISTORICAL_FIGURES.get(figure_id)
-    if not figure:
-        return None
-    
+def _build_figure_record(figure_id: str, catalog_id_fallback: str) -> dict:
+    """Format one figure for the API, merging its curatorial metadata."""
+    figure = HISTORICAL_FIGURES[figure_id]
     metadata = CURATORIAL_METADATA.get(figure_id, {})
+    dates = get_figure_display_dates(figure_id)
     return {
         "id": figure["id"],
         "name": figure["name"],
         "title": figure["title"],
-        "dates": get_figure_display_dates(figure_id),
+        "dates": dates,
         "era": figure["era"],
         "tagline": figure["tagline"],
         "starter_questions": metadata.get("questions", figure["starter_questions"]),
         "birth_year": figure["birth_year"],
         "death_year": figure["death_year"],
-        "knowledge_cutoff": get_figure_display_dates(figure_id).split(" - ")[-1],
+        "knowledge_cutoff": dates.split(" - ")[-1],
         "featured": figure_id in FEATURED_FIGURE_IDS,
-        "catalog_id": metadata.get("catalog_id", "ARC-PENDING"),
+        "catalog_id": metadata.get("catalog_id", catalog_id_fallback),
         "locations": metadata.get("locations", "Location record pending verification"),
         "curatorial_introduction": metadata.get(
             "introduction",
@@ -1330,3 +1339,31 @@ def get_figure(figure_id: str) -> dict:
         "secondary_sources": [],
         "portrait_status": "Interpretive likeness; source and license pending verification"
     }
+
+
+# The catalog never changes at runtime, so API records are built once at import.
+# Callers get copies, so nothing they do to a record can leak into the next request.
+_CATALOG_RECORDS = [
+    _build_figure_record(fig_id, f"ARC-{index:03d}")
+    for index, fig_id in enumerate(HISTORICAL_FIGURES, start=1)
+]
+_FIGURE_RECORDS = {
+    fig_id: _build_figure_record(fig_id, "ARC-PENDING")
+    for fig_id in HISTORICAL_FIGURES
+}
+
+
+def _copy_record(record: dict) -> dict:
+    """Copy a figure record along with its list fields; the remaining values are immutable."""
+    return {key: list(value) if isinstance(value, list) else value for key, value in record.items()}
+
+
+def get_all_figures() -> list:
+    """Get all figures formatted for the API response."""
+    return [_copy_record(record) for record in _CATALOG_RECORDS]
+
+
+def get_figure(figure_id: str) -> dict:
+    """Get a single figure formatted for the API response."""
+    record = _FIGURE_RECORDS.get(figure_id)
+    return _copy_record(record) if record is not None else None
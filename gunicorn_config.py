@@ -2,6 +2,8 @@
 # Optimized for Server-Sent Events (SSE) streaming
 
 import os
+import shutil
+import tempfile
 
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
@@ -25,3 +27,28 @@ forwarded_allow_ips = "*"
 # Graceful restart
 graceful_timeout = 30
 
+# Each worker writes its metrics here so /metrics can merge all of them
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"seanceai-metrics-{os.environ.get('PORT', '5000')}"))
+
+# Workers share model cooldowns after 429s through this SQLite file (kept across restarts:
+# its cooldowns are wall-clock deadlines that simply expire)
+os.environ.setdefault('MODEL_HEALTH_DB', os.path.join(tempfile.gettempdir(), f"seanceai-model-health-{os.environ.get('PORT', '5000')}.sqlite3"))
+
+
+def on_starting(server):
+    """Clear metrics left by a previous run so counters start from zero."""
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+
+def post_worker_init(worker):
+    """Start the worker's metrics flush and open keep-alive connections to OpenRouter before its first request."""
+    import threading
+    from app import metrics_registry, upstream, OPENROUTER_URL
+
+    metrics_registry.start()
+
+    def warm_up():
+        warmed = upstream.warm_up(OPENROUTER_URL, connections=int(os.environ.get('UPSTREAM_WARM_CONNECTIONS', 2)))
+        worker.log.info(f"Upstream pool warmed with {warmed} connection(s)")
+
+    threading.Thread(target=warm_up, daemon=True).start()
@@ -0,0 +1,221 @@
+"""
+Hedged upstream streams for SeanceAI.
+Free-tier models have a long tail of time to first token. A hedged stream sends
+the request to the primary model and, if no text has arrived by the time that
+model usually has started (a percentile of its recent time to first token),
+sends the same request to a backup model as well. Whichever produces text first
+is relayed and the other is cancelled with its upstream connection closed, so
+only slow requests pay for a second call.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+
+_FINISHED = object()
+
+
+class TTFTStats:
+    """Rolling time-to-first-token samples (seconds) per model."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, pct: float):
+        """The pct-th percentile (nearest rank) for a model, or None below min_samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(1, -(-len(samples) * pct // 100))
+        return samples[int(rank) - 1]
+
+    def hedge_after(self, model: str, pct: float, default: float, floor: float = 0.0) -> float:
+        """Seconds to wait for a model's first token before hedging."""
+        threshold = self.percentile(model, pct)
+        return max(floor, default if threshold is None else threshold)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = {model: sorted(samples) for model, samples in self._samples.items()}
+        snapshot = {}
+        for model, samples in models.items():
+            snapshot[model] = {"samples": len(samples)}
+            for pct in (50, 90, 99):
+                rank = max(1, -(-len(samples) * pct // 100))
+                snapshot[model][f"p{pct}_ms"] = round(samples[int(rank) - 1] * 1000)
+        return snapshot
+
+
+class HedgeMetrics:
+    """Counters describing hedged streams for one worker."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.cancelled = 0
+        self.added_cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, **increments):
+        with self._lock:
+            for name, amount in increments.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+                "failovers": self.failovers,
+                "cancelled": self.cancelled,
+                "added_cost_usd": round(self.added_cost_usd, 6),
+            }
+
+
+class _Racer:
+    """One model's stream, pumped on its own thread (in the caller's context) into a shared queue."""
+
+    def __init__(self, model: str, stream_events, results: queue.Queue):
+        self.model = model
+        self.started_at = time.monotonic()
+        self.cancelled = threading.Event()
+        self.finished = False
+        self._responses = []
+        self._lock = threading.Lock()
+        threading.Thread(target=contextvars.copy_context().run, args=(self._run, stream_events, results),
+                         daemon=True).start()
+
+    def _track(self, response):
+        with self._lock:
+            self._responses.append(response)
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            _close(response)
+
+    def _run(self, stream_events, results):
+        events = None
+        try:
+            events = stream_events(self.model, self._track, self.cancelled)
+            for event in events:
+                if self.cancelled.is_set():
+                    break
+                results.put((self, event))
+        except Exception as e:
+            results.put((self, {'error': str(e)}))
+        finally:
+            if events is not None and hasattr(events, 'close'):
+                events.close()
+            results.put((self, _FINISHED))
+
+    def cancel(self):
+        """Stop relaying and close any upstream connection this stream has open."""
+        self.cancelled.set()
+        with self._lock:
+            responses = list(self._responses)
+        for response in responses:
+            _close(response)
+
+
+def _close(response):
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+def hedged_events(primary_model: str, hedge_model: str, stream_events, hedge_after: float,
+                  metrics: HedgeMetrics = None, stats: TTFTStats = None, cost=None):
+    """
+    Stream from primary_model, hedging to hedge_model if it is slow to start.
+
+    stream_events(model, on_response, cancelled) returns one model's upstream event
+    iterator and calls on_response(response) for each upstream response it opens, so
+    a cancelled stream can be closed even while it waits for its first byte; the
+    cancelled Event is set first, so the stream can tell that closing from a failure
+    of the upstream. If the
+    primary has produced no text after hedge_after seconds the same request starts
+    on hedge_model, and if it fails first the hedge starts at once. The first model
+    to produce text wins and the other is cancelled: cost(model) is added to the
+    metrics as the price of the extra request, and a cancelled primary's wait is
+    recorded in stats as a lower bound on its time to first token, so the threshold
+    is not learned from fast requests alone. Yields the winner's events, or the
+    last failure if no model produced text.
+    """
+    results = queue.Queue()
+    started_at = time.monotonic()
+    primary = _Racer(primary_model, stream_events, results)
+    racers = [primary]
+    hedge = None
+    hedged = False
+    winner = None
+    failure = None
+    finished = 0
+    if metrics:
+        metrics.record(requests=1)
+
+    try:
+        while winner is None:
+            timeout = None if hedge else max(0.0, hedge_after - (time.monotonic() - started_at))
+            try:
+                racer, event = results.get(timeout=timeout)
+            except queue.Empty:
+                hedge = _Racer(hedge_model, stream_events, results)
+                racers.append(hedge)
+                hedged = True
+                if metrics:
+                    metrics.record(hedged=1)
+                continue
+            if event is _FINISHED:
+                racer.finished = True
+                finished += 1
+                if hedge is None:
+                    hedge = _Racer(hedge_model, stream_events, results)
+                    racers.append(hedge)
+                    if metrics:
+                        metrics.record(failovers=1)
+                elif finished == len(racers):
+                    yield failure or {'error': 'No model produced a reply.'}
+                    return
+                continue
+            if event.get('content'):
+                winner = racer
+            elif 'error' in event or event.get('done'):
+                failure = event  # an error, or a reply that finished empty
+
+        for racer in racers:
+            if racer is winner or racer.finished:
+                continue
+            racer.cancel()
+            if stats and racer is primary:
+                stats.record(racer.model, time.monotonic() - racer.started_at)
+            if metrics:
+                metrics.record(cancelled=1, added_cost_usd=cost(racer.model) if cost else 0.0)
+        if metrics and hedged and winner is hedge:
+            metrics.record(hedge_wins=1)
+
+        yield event
+        while True:
+            racer, event = results.get()
+            if racer is not winner:
+                continue
+            if event is _FINISHED:
+                return
+            yield event
+    finally:
+        for racer in racers:
+            racer.cancel()
@@ -0,0 +1,389 @@
+"""
+Load generator for SeanceAI.
+
+Runs virtual users against a running server, each playing weighted scenarios
+back to back: a curated salon opening, a long single-figure session, a burst of
+suggestion requests or a catalog browse. Streaming routes are read as SSE, so
+every request records time to first byte and, for streams, time to first token,
+tokens per second and whether the stream finished. Users are gevent greenlets,
+so one process can hold thousands of open streams.
+
+The report gives p50/p95/p99 per route and counts of each error class, as a
+text table and optionally as JSON. Pair it with mock_openrouter.py to size
+gunicorn workers or catch regressions without calling the real provider.
+
+Usage:
+    python loadgen.py http://127.0.0.1:5000 [--users 200] [--duration 60 | --iterations 5]
+        [--mix salon-opening=2,figure-session=1,suggestion-burst=1,catalog=1]
+        [--ramp-up 10] [--think-time 1] [--json report.json] [--max-error-rate 0.01]
+"""
+
+# Patch gevent before requests is imported, so every virtual user is a greenlet
+from gevent import monkey
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+import requests  # noqa: E402
+
+from token_budget import estimate_tokens  # noqa: E402
+
+DEFAULT_MIX = {"salon-opening": 2, "figure-session": 1, "suggestion-burst": 1, "catalog": 1}
+SESSION_TURNS = 6  # Turns per long single-figure session
+BURST_SIZE = 5  # Concurrent suggestion requests per burst
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: list, pct: float):
+    """The pct-th percentile (nearest rank) of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def classify_status(status: int) -> str:
+    if status == 429:
+        return "http_429"
+    if status == 503:
+        return "http_503"
+    return "http_4xx" if status < 500 else "http_5xx"
+
+
+class LoadClient:
+    """One virtual user's HTTP session; every request appends a sample to samples."""
+
+    def __init__(self, base_url: str, samples: list, timeout: float = 120):
+        self.base_url = base_url.rstrip("/")
+        self.samples = samples
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _record(self, route: str, started: float, **fields) -> dict:
+        sample = {"route": route, "status": None, "error": None, "ttfb": None, "ttft": None,
+                  "duration": time.monotonic() - started, "tokens": 0, "tokens_per_second": None}
+        sample.update(fields)
+        self.samples.append(sample)
+        return sample
+
+    def _send(self, method: str, path: str, **kwargs):
+        """(response, error class); response is None on connection failure or timeout."""
+        try:
+            return self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs), None
+        except requests.exceptions.Timeout:
+            return None, "timeout"
+        except requests.exceptions.RequestException:
+            return None, "connection"
+
+    def get(self, path: str, route: str = None):
+        """GET a JSON route; returns the decoded body, or None on error."""
+        started = time.monotonic()
+        response, error = self._send("GET", path)
+        if response is None:
+            self._record(route or path, started, error=error)
+            return None
+        ttfb = response.elapsed.total_seconds()
+        body = response.json() if response.ok else None
+        self._record(route or path, started, status=response.status_code, ttfb=ttfb,
+                     error=None if response.ok else classify_status(response.status_code))
+        return body
+
+    def post(self, path: str, body: dict):
+        started = time.monotonic()
+        response, error = self._send("POST", path, json=body)
+        if response is None:
+            self._record(path, started, error=error)
+            return None
+        self._record(path, started, status=response.status_code, ttfb=response.elapsed.total_seconds(),
+                     error=None if response.ok else classify_status(response.status_code))
+        return response.json() if response.ok else None
+
+    def stream(self, path: str, body: dict) -> str:
+        """POST to an SSE route and read it to the end; returns the streamed reply text."""
+        started = time.monotonic()
+        response, error = self._send("POST", path, json=body, stream=True)
+        if response is None:
+            self._record(path, started, error=error)
+            return ""
+        fields = {"status": response.status_code}
+        if not response.ok:
+            response.close()
+            self._record(path, started, error=classify_status(response.status_code), **fields)
+            return ""
+
+        parts = []
+        first_token_at = None
+        completion_tokens = None
+        error = "incomplete"
+        try:
+            for event, data in read_sse(response):
+                if "ttfb" not in fields:
+                    fields["ttfb"] = time.monotonic() - started
+                if event in (None, "content") and data.get("content"):
+                    first_token_at = first_token_at or time.monotonic()
+                    parts.append(data["content"])
+                elif data.get("error") or event == "guest_error":
+                    error = "deadline_exceeded" if data.get("deadline_exceeded") else (
+                        "rate_limited" if data.get("rate_limited") else "stream_error")
+                    break
+                elif data.get("done"):
+                    completion_tokens = (data.get("usage") or {}).get("completion_tokens")
+                    error = None
+                    break
+        except requests.exceptions.RequestException:
+            error = "disconnected"
+        finally:
+            response.close()
+
+        ended = time.monotonic()
+        text = "".join(parts)
+        fields["tokens"] = completion_tokens or estimate_tokens(text)
+        if first_token_at is not None:
+            fields["ttft"] = first_token_at - started
+            if ended - first_token_at > 0:
+                fields["tokens_per_second"] = fields["tokens"] / (ended - first_token_at)
+        self._record(path, started, error=error, **fields)
+        return text
+
+
+def read_sse(response):
+    """Yield (event type or None, decoded data) for each SSE frame of a streaming response."""
+    event = None
+    for line in response.iter_lines():
+        if not line:
+            event = None
+            continue
+        if line.startswith(b"event:"):
+            event = line[6:].strip().decode()
+        elif line.startswith(b"data:"):
+            try:
+                yield event, json.loads(line[5:])
+            except ValueError:
+                continue
+
+
+# Scenarios: each takes (client, rng, catalog) and plays one visit.
+
+def salon_opening(client: LoadClient, rng: random.Random, catalog: dict):
+    """Open a curated salon with one of its starter questions."""
+    client.get("/api/dinner-party/combos")
+    combo = rng.choice(list(catalog["combos"].values()))
+    client.stream("/api/dinner-party/chat/stream", {
+        "guests": combo["guests"],
+        "message": rng.choice(combo.get("starter_questions") or ["What do you make of one another?"]),
+        "history": [],
+    })
+
+
+def figure_session(client: LoadClient, rng: random.Random, catalog: dict, think_time: float = 0):
+    """A long conversation with one figure; history grows every turn."""
+    figure = rng.choice(catalog["figures"])
+    client.get(f"/api/figures/{figure['id']}", route="/api/figures/<figure_id>")
+    questions = list(figure.get("starter_questions") or ["Tell me about your work."])
+    history = []
+    for turn in range(SESSION_TURNS):
+        message = questions[turn % len(questions)]
+        reply = client.stream("/api/chat/stream", {"figure_id": figure["id"], "message": message, "history": history})
+        history += [{"role": "user", "content": message}, {"role": "assistant", "content": reply or "..."}]
+        _think(rng, think_time)
+
+
+def suggestion_burst(client: LoadClient, rng: random.Random, catalog: dict):
+    """Several suggestion requests at once, as when replies finish together."""
+    figure = rng.choice(catalog["figures"])
+    question = (figure.get("starter_questions") or ["Tell me about your work."])[0]
+    body = {
+        "figure_id": figure["id"],
+        "history": [{"role": "user", "content": question}],
+        "last_response": f"As {figure['name']}, I would answer that carefully.",
+    }
+    gevent.joinall([gevent.spawn(client.post, "/api/suggestions", body) for _ in range(BURST_SIZE)])
+
+
+def catalog_browse(client: LoadClient, rng: random.Random, catalog: dict):
+    client.get("/api/figures")
+    client.get("/api/models")
+    client.get("/api/dinner-party/combos")
+    figure = rng.choice(catalog["figures"])
+    client.get(f"/api/figures/{figure['id']}", route="/api/figures/<figure_id>")
+
+
+SCENARIOS = {
+    "salon-opening": salon_opening,
+    "figure-session": figure_session,
+    "suggestion-burst": suggestion_burst,
+    "catalog": catalog_browse,
+}
+
+
+def _think(rng: random.Random, think_time: float):
+    if think_time:
+        gevent.sleep(think_time * rng.uniform(0.5, 1.5))
+
+
+def parse_mix(text: str) -> dict:
+    """Parse "name=weight,name=weight" into a scenario weight mapping."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_catalog(base_url: str, timeout: float = 30) -> dict:
+    """Figures and curated combos, fetched once so scenarios can pick real ids."""
+    base_url = base_url.rstrip("/")
+    figures = requests.get(f"{base_url}/api/figures", timeout=timeout).json()["figures"]
+    combos = requests.get(f"{base_url}/api/dinner-party/combos", timeout=timeout).json()["combos"]
+    return {"figures": figures, "combos": combos}
+
+
+def run_load(base_url: str, mix: dict = None, users: int = 10, duration: float = None, iterations: int = None,
+             ramp_up: float = 0, think_time: float = 0, timeout: float = 120, seed: int = 0) -> dict:
+    """
+    Run users virtual users until duration seconds pass or each has played
+    iterations scenarios (one scenario each if neither is set), and return the report.
+    """
+    mix = mix or DEFAULT_MIX
+    catalog = load_catalog(base_url, timeout)
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    started = time.monotonic()
+    stop_at = started + duration if duration else None
+    iterations = iterations or (None if duration else 1)
+
+    def user(index: int):
+        rng = random.Random(f"{seed}:{index}")
+        client = LoadClient(base_url, samples, timeout)
+        gevent.sleep(ramp_up * index / max(1, users))
+        played = 0
+        while (iterations is None or played < iterations) and (stop_at is None or time.monotonic() < stop_at):
+            name = rng.choices(names, weights)[0]
+            if name == "figure-session":
+                figure_session(client, rng, catalog, think_time)
+            else:
+                SCENARIOS[name](client, rng, catalog)
+            played += 1
+            _think(rng, think_time)
+
+    gevent.joinall([gevent.spawn(user, index) for index in range(users)])
+    return summarize(samples, time.monotonic() - started, users)
+
+
+def _millis(values: list) -> dict:
+    return {f"p{pct}": None if not values else round(percentile(values, pct) * 1000, 1) for pct in PERCENTILES}
+
+
+def summarize(samples: list, elapsed: float, users: int = None) -> dict:
+    """Per-route latency percentiles, throughput and error classes for a run."""
+    routes = {}
+    for sample in samples:
+        routes.setdefault(sample["route"], []).append(sample)
+
+    report = {"elapsed_s": round(elapsed, 2), "users": users, "requests": len(samples),
+              "errors": sum(1 for s in samples if s["error"]), "routes": {}}
+    for route, group in sorted(routes.items()):
+        ok = [s for s in group if not s["error"]]
+        error_classes = {}
+        for sample in group:
+            if sample["error"]:
+                error_classes[sample["error"]] = error_classes.get(sample["error"], 0) + 1
+        rates = [s["tokens_per_second"] for s in ok if s["tokens_per_second"] is not None]
+        report["routes"][route] = {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "error_classes": error_classes,
+            "requests_per_second": round(len(group) / elapsed, 2) if elapsed else None,
+            "ttfb_ms": _millis([s["ttfb"] for s in ok if s["ttfb"] is not None]),
+            "ttft_ms": _millis([s["ttft"] for s in ok if s["ttft"] is not None]),
+            "duration_ms": _millis([s["duration"] for s in ok]),
+            "tokens_per_second": {f"p{pct}": None if not rates else round(percentile(rates, pct), 1)
+                                  for pct in PERCENTILES},
+        }
+    return report
+
+
+def render_table(report: dict) -> str:
+    """The report as a fixed-width text table, one row per route, then error classes."""
+    def cell(stats: dict) -> str:
+        return "/".join("-" if stats[f"p{pct}"] is None else f"{stats[f'p{pct}']:g}" for pct in PERCENTILES)
+
+    headers = ("route", "reqs", "err", "req/s", "ttfb ms p50/95/99", "ttft ms p50/95/99",
+               "total ms p50/95/99", "tok/s p50/95/99")
+    rows = [headers]
+    for route, stats in report["routes"].items():
+        rows.append((route, str(stats["requests"]), str(stats["errors"]), f"{stats['requests_per_second']:g}",
+                     cell(stats["ttfb_ms"]), cell(stats["ttft_ms"]), cell(stats["duration_ms"]),
+                     cell(stats["tokens_per_second"])))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+
+    lines.append("")
+    lines.append(f"{report['requests']} requests, {report['errors']} errors in {report['elapsed_s']}s "
+                 f"with {report['users']} users")
+    for route, stats in report["routes"].items():
+        for error, count in sorted(stats["error_classes"].items()):
+            lines.append(f"  {route}: {error} x{count}")
+    return "\n".join(lines)
+
+
+def _raise_open_file_limit():
+    """Each open stream holds a socket; lift the soft descriptor limit to the hard one."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Drive SeanceAI with concurrent scenario traffic and report latencies.")
+    parser.add_argument("base_url", help="Server to load, e.g. http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, help="Seconds to run (default: --iterations)")
+    parser.add_argument("--iterations", type=int, help="Scenarios per user (default 1 without --duration)")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help=f"Weighted scenarios, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean seconds a user pauses between steps")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for scenario and figure choices")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON ('-' for stdout)")
+    parser.add_argument("--max-error-rate", type=float,
+                        help="Exit with status 1 if more than this share of requests fail")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    _raise_open_file_limit()
+    report = run_load(args.base_url, mix, args.users, args.duration, args.iterations,
+                      args.ramp_up, args.think_time, args.timeout, args.seed)
+
+    print(render_table(report), file=sys.stderr if args.json_path == "-" else sys.stdout)
+    if args.json_path == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.max_error_rate is not None and report["requests"]:
+        if report["errors"] / report["requests"] > args.max_error_rate:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
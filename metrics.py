@@ -0,0 +1,239 @@
+"""
+Prometheus-style metrics for SeanceAI.
+Counters, gauges and histograms are plain per-worker dicts updated without locks:
+gevent workers run every greenlet on one OS thread and only switch on I/O, so an
+update cannot be interleaved. Each worker periodically writes its values to a
+file in METRICS_DIR; a /metrics scrape flushes the serving worker's own values,
+merges every worker's file and renders the Prometheus text format. Gauges only
+count workers that are still alive; counters and histograms from exited workers
+are kept so totals never go backwards.
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60)
+TOKEN_RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 120, 160, 240, 320)
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def describe(self) -> dict:
+        return {"kind": self.kind, "help": self.help, "labels": list(self.labels)}
+
+    def dump(self) -> list:
+        return [[list(labels), value] for labels, value in list(self.values.items())]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels):
+        """Mirror a running total kept elsewhere (e.g. a cache's own hit counter)."""
+        self.values[labels] = value
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+
+class Histogram(_Family):
+    """Per-bucket (not cumulative) counts with +Inf last, then the sum of observations."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def describe(self) -> dict:
+        return {**super().describe(), "buckets": list(self.buckets)}
+
+    def dump(self) -> list:
+        return [[list(labels), list(value)] for labels, value in list(self.values.items())]
+
+
+class MetricsRegistry:
+    """
+    The metric families of one worker. directory enables cross-worker merging;
+    without it a scrape reports this process only.
+    """
+
+    def __init__(self, directory: str = None, flush_interval: float = 5.0):
+        self.directory = directory or None
+        self.flush_interval = flush_interval
+        self.families = {}
+        self._collectors = []
+        self._flusher = None
+        self._flusher_pid = None
+
+    def _add(self, family):
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collect):
+        """Register collect(), called before every snapshot to refresh mirrored values."""
+        self._collectors.append(collect)
+
+    def snapshot(self) -> dict:
+        for collect in self._collectors:
+            collect()
+        return {
+            "pid": os.getpid(),
+            "families": {
+                name: {**family.describe(), "samples": family.dump()}
+                for name, family in self.families.items()
+            },
+        }
+
+    def start(self):
+        """Start this worker's background flush (once per process; no-op without a directory)."""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_forever, daemon=True)
+        self._flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self):
+        """Write this worker's snapshot atomically to its file in the metrics directory."""
+        snapshot = self.snapshot()
+        path = os.path.join(self.directory, f"worker-{snapshot['pid']}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(snapshot, handle, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def collect(self) -> dict:
+        """Merged families of every worker (or this one alone without a directory)."""
+        if not self.directory:
+            return merge_snapshots([self.snapshot()])
+        os.makedirs(self.directory, exist_ok=True)
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "worker-*.json")):
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    snapshots.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_text(self.collect())
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: list) -> dict:
+    """Sum worker snapshots into {name: description with samples {labels tuple: value}}."""
+    merged = {}
+    for snapshot in snapshots:
+        alive = _alive(snapshot.get("pid", 0))
+        for name, family in snapshot.get("families", {}).items():
+            if family["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**family, "samples": {}})
+            samples = target["samples"]
+            for labels, value in family["samples"]:
+                key = tuple(labels)
+                if family["kind"] == "histogram":
+                    current = samples.get(key)
+                    samples[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    samples[key] = samples.get(key, 0) + value
+    return merged
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: list, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_text(families: dict) -> str:
+    """Render merged families in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        names = family["labels"]
+        for labels, value in sorted(family["samples"].items()):
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_label_text(names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family["buckets"] + ["+Inf"], value[:-1]):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else _number(bound)}"'
+                lines.append(f"{name}_bucket{_label_text(names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(names, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_label_text(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,251 @@
+"""
+Local mock of the OpenRouter chat completions API.
+
+Serves POST /api/v1/chat/completions, streaming and non-streaming, with
+per-model behaviour taken from a scenario: token rate, time to first token
+distribution, reply length, 429 bursts with Retry-After, mid-stream disconnects
+and malformed chunks. Every random choice is drawn from a generator seeded with
+the scenario seed, the model and that model's request number, so a run with the
+same requests in the same order behaves the same way every time.
+GET /mock/stats reports what was served per model.
+
+Point the app at it with OPENROUTER_URL (any OPENROUTER_API_KEY is accepted):
+
+    python mock_openrouter.py --port 8089 [--scenario benchmarks/fixtures/mock_openrouter_flaky.json]
+    OPENROUTER_URL=http://127.0.0.1:8089/api/v1/chat/completions OPENROUTER_API_KEY=mock python app.py
+
+A scenario is JSON: {"seed": 1, "default": {...}, "models": {"model/id": {...}}},
+where each model's settings override "default", which overrides DEFAULT_BEHAVIOUR.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+DEFAULT_BEHAVIOUR = {
+    "tokens_per_second": 60,          # Streamed content chunks (one word each) per second
+    "ttft_ms": {"p50": 400, "p95": 1200},  # Log-normal time to first token, or a fixed number of ms
+    "reply_tokens": 120,              # Words per reply, capped by the request's max_tokens
+    "rate_limit": None,               # {"after": N, "burst": K, "retry_after": S}: K 429s after every N requests
+    "disconnect_rate": 0.0,           # Share of streams cut off part way through, without [DONE]
+    "malformed_rate": 0.0,            # Share of stream chunks preceded by a truncated JSON frame
+}
+
+WORDS = (
+    "the question of liberty turns upon what we owe one another and what the law "
+    "may ask of those who did not consent to it yet I have seen reason fail where "
+    "habit held firm so let us weigh the evidence of history with patience"
+).split()
+
+
+def load_scenario(path: str = None, seed: int = None) -> dict:
+    """Read a scenario file (or start from the defaults), optionally overriding its seed."""
+    scenario = {}
+    if path:
+        with open(path, encoding="utf-8") as handle:
+            scenario = json.load(handle)
+    scenario.setdefault("seed", 0)
+    scenario.setdefault("default", {})
+    scenario.setdefault("models", {})
+    if seed is not None:
+        scenario["seed"] = seed
+    return scenario
+
+
+def _ttft_seconds(spec, rng: random.Random) -> float:
+    """Draw a time to first token from a fixed value or a log-normal fitted to p50 and p95."""
+    if not isinstance(spec, dict):
+        return float(spec) / 1000
+    p50 = float(spec["p50"])
+    p95 = float(spec.get("p95", p50))
+    sigma = math.log(p95 / p50) / 1.645 if p95 > p50 > 0 else 0.0
+    return p50 * math.exp(rng.gauss(0, 1) * sigma) / 1000
+
+
+def _reply_words(count: int, rng: random.Random) -> list:
+    """Deterministic filler prose: sentences of 8-16 words, paragraphs of three sentences."""
+    words = []
+    sentence = paragraph = 0
+    for index in range(count):
+        word = rng.choice(WORDS)
+        words.append(word.capitalize() if sentence == 0 else word)
+        sentence += 1
+        if sentence >= 8 + rng.randrange(9) or index == count - 1:
+            words[-1] += "."
+            sentence = 0
+            paragraph += 1
+            if paragraph == 3 and index < count - 1:
+                words[-1] += "\n\n"
+                paragraph = 0
+    return words
+
+
+class _Disconnect(Exception):
+    """Raised inside a stream to drop the connection without finishing the response."""
+
+
+class MockUpstream:
+    """Scenario state: per-model request numbering and served counters."""
+
+    def __init__(self, scenario: dict):
+        self.scenario = scenario
+        self._lock = threading.Lock()
+        self._served = {}
+        self.stats = {}
+
+    def behaviour(self, model: str) -> dict:
+        return {
+            **DEFAULT_BEHAVIOUR,
+            **self.scenario.get("default", {}),
+            **self.scenario.get("models", {}).get(model, {}),
+        }
+
+    def begin(self, model: str):
+        """Number this request for model and return (behaviour, seeded rng, request number)."""
+        with self._lock:
+            number = self._served.get(model, 0)
+            self._served[model] = number + 1
+        rng = random.Random(f"{self.scenario.get('seed', 0)}:{model}:{number}")
+        return self.behaviour(model), rng, number
+
+    def count(self, model: str, outcome: str, amount: int = 1):
+        with self._lock:
+            counts = self.stats.setdefault(model, {})
+            counts[outcome] = counts.get(outcome, 0) + amount
+
+    def rate_limited(self, behaviour: dict, number: int):
+        """Retry-After seconds if request number falls in a 429 burst, else None."""
+        limit = behaviour.get("rate_limit")
+        if not limit:
+            return None
+        after = int(limit.get("after", 0))
+        burst = int(limit.get("burst", 1))
+        if number % (after + burst) < after:
+            return None
+        return limit.get("retry_after", 1)
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    frame = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        frame["usage"] = usage
+    # Compact separators, as OpenRouter sends its chunks
+    return f"data: {json.dumps(frame, separators=(',', ':'))}\n\n"
+
+
+def _usage(messages: list, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(str(msg.get("content", ""))) for msg in messages) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(scenario: dict = None) -> Flask:
+    """The mock API as a Flask app; its MockUpstream is app.config['MOCK_UPSTREAM']."""
+    mock = MockUpstream(scenario or load_scenario())
+    mock_app = Flask(__name__)
+    mock_app.config["MOCK_UPSTREAM"] = mock
+
+    @mock_app.route("/api/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        body = request.get_json(silent=True) or {}
+        model = body.get("model") or "mock/default"
+        messages = body.get("messages") or []
+        behaviour, rng, number = mock.begin(model)
+        mock.count(model, "requests")
+
+        retry_after = mock.rate_limited(behaviour, number)
+        if retry_after is not None:
+            mock.count(model, "rate_limited")
+            response = jsonify({"error": {
+                "code": 429,
+                "message": "Rate limit exceeded",
+                "metadata": {"raw": f"{model} is temporarily rate-limited upstream. Please retry shortly."},
+            }})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+
+        ttft = _ttft_seconds(behaviour["ttft_ms"], rng)
+        words = _reply_words(min(int(behaviour["reply_tokens"]), int(body.get("max_tokens") or 10 ** 6)), rng)
+        interval = 1 / float(behaviour["tokens_per_second"])
+        completion_id = f"gen-mock-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            time.sleep(ttft + interval * len(words))
+            mock.count(model, "completed")
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(messages, len(words)),
+            })
+
+        cut_at = rng.randrange(1, len(words)) if len(words) > 1 and rng.random() < behaviour["disconnect_rate"] else None
+        malformed = [rng.random() < behaviour["malformed_rate"] for _ in words]
+
+        def generate():
+            yield ": OPENROUTER PROCESSING\n\n"
+            time.sleep(ttft)
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for index, word in enumerate(words):
+                if index == cut_at:
+                    mock.count(model, "disconnected")
+                    raise _Disconnect(f"mock disconnect after {index} tokens")
+                if index:
+                    time.sleep(interval)
+                if malformed[index]:
+                    mock.count(model, "malformed_chunks")
+                    yield 'data: {"id":"' + completion_id + '","choices":[{"delta":{"content":"\n\n'
+                yield _chunk(completion_id, model, {"content": word if index == 0 else f" {word}"})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield _chunk(completion_id, model, {}, usage=_usage(messages, len(words)))
+            yield "data: [DONE]\n\n"
+            mock.count(model, "completed")
+
+        return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @mock_app.route("/mock/stats")
+    def mock_stats():
+        return jsonify({"seed": mock.scenario.get("seed", 0), "models": mock.stats})
+
+    return mock_app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenRouter chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--scenario", help="Scenario JSON file (default: every model uses DEFAULT_BEHAVIOUR)")
+    parser.add_argument("--seed", type=int, help="Override the scenario seed")
+    args = parser.parse_args(argv)
+
+    mock_app = create_app(load_scenario(args.scenario, args.seed))
+    print(f"Mock OpenRouter: OPENROUTER_URL=http://{args.host}:{args.port}/api/v1/chat/completions", file=sys.stderr)
+    mock_app.run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
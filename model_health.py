@@ -0,0 +1,252 @@
+"""
+Shared model health for SeanceAI.
+When a model answers 429, every later request would otherwise rediscover the
+outage for itself, spending attempts and backoff sleeps on the same failing
+model. ModelHealth records a cooldown per model instead: until the provider's
+Retry-After (or an exponential default when it sends none), callers try healthy
+models first. It also keeps a rolling success rate and latency per model.
+
+State lives in memory and, with db_path set, in a SQLite table shared by every
+gunicorn worker on the host. Only cooldown changes (one starting or clearing)
+write straight to the table; the rolling success rate and latency are updated in
+memory and flushed at most every flush_interval seconds. Reads use a copy
+refreshed at most every refresh_interval seconds, so the hot path seldom touches
+the disk. Timestamps are wall-clock so every process agrees on them.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+EWMA_ALPHA = 0.2  # Weight of the newest outcome in the rolling success rate and latency
+
+
+def parse_retry_after(value, now: float = None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class ModelHealth:
+    """Per-model cooldowns after 429s, plus rolling success rate and latency."""
+
+    _COLUMNS = ("cooldown_until", "retry_after", "rate_limits", "success_rate", "latency", "samples", "updated_at")
+    _COOLDOWN_COLUMNS = ("cooldown_until", "retry_after", "rate_limits")
+    _STATS_COLUMNS = ("success_rate", "latency", "samples", "updated_at")
+
+    def __init__(self, db_path: str = None, default_cooldown: float = 10.0, max_cooldown: float = 120.0,
+                 refresh_interval: float = 1.0, flush_interval: float = 5.0):
+        self.db_path = db_path or None
+        self.default_cooldown = default_cooldown
+        self.max_cooldown = max_cooldown
+        self.refresh_interval = refresh_interval
+        self.flush_interval = flush_interval
+        self._models = {}
+        self._unflushed = set()  # Models whose stats changed since they were last written
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._flushed_at = time.monotonic()
+        self.skipped = 0  # Requests that moved past a cooling model without calling it
+        if self.db_path:
+            self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=1.0)
+
+    def _init_db(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS model_health ("
+                "model TEXT PRIMARY KEY, cooldown_until REAL NOT NULL DEFAULT 0, retry_after REAL, "
+                "rate_limits INTEGER NOT NULL DEFAULT 0, success_rate REAL NOT NULL DEFAULT 1, "
+                "latency REAL, samples INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+
+    def _blank(self) -> dict:
+        return dict(zip(self._COLUMNS, (0.0, None, 0, 1.0, None, 0, 0.0)))
+
+    def _state(self, model: str) -> dict:
+        """This process's view of model, refreshed from the shared table when stale."""
+        if self.db_path and time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._refresh()
+        with self._lock:
+            return dict(self._models.get(model) or self._blank())
+
+    def _refresh(self):
+        self._refreshed_at = time.monotonic()
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(f"SELECT model, {', '.join(self._COLUMNS)} FROM model_health").fetchall()
+        except sqlite3.Error:
+            return
+        with self._lock:
+            for row in rows:
+                state = dict(zip(self._COLUMNS, row[1:]))
+                if row[0] in self._unflushed:
+                    # Keep this worker's newer stats until they are flushed
+                    state.update((column, self._models[row[0]][column]) for column in self._STATS_COLUMNS)
+                self._models[row[0]] = state
+
+    def _update(self, model: str, change):
+        """
+        Apply change(state, now) to this worker's view of model. A cooldown that starts
+        or clears is written through to the shared table at once, read-modify-write so
+        consecutive 429s seen by different workers add up; stats wait for the next flush.
+        """
+        now = time.time()
+        with self._lock:
+            state = self._models.setdefault(model, self._blank())
+            cooldown = tuple(state[column] for column in self._COOLDOWN_COLUMNS)
+            change(state, now)
+            state["updated_at"] = now
+            cooldown_changed = cooldown != tuple(state[column] for column in self._COOLDOWN_COLUMNS)
+            if self.db_path:
+                self._unflushed.add(model)
+        if not self.db_path:
+            return
+        if cooldown_changed:
+            self._write_through(model, change, now)
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def _write_through(self, model: str, change, now: float):
+        """Apply change to the shared cooldown of model, storing this worker's stats alongside."""
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    f"SELECT {', '.join(self._COLUMNS)} FROM model_health WHERE model = ?", (model,)
+                ).fetchone()
+                shared = dict(zip(self._COLUMNS, row)) if row else self._blank()
+                change(shared, now)
+                with self._lock:
+                    state = self._models[model]
+                    state.update((column, shared[column]) for column in self._COOLDOWN_COLUMNS)
+                    self._unflushed.discard(model)
+                    values = tuple(state[column] for column in self._COLUMNS)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO model_health (model, {', '.join(self._COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' for _ in self._COLUMNS)})",
+                    (model, *values)
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self._unflushed.add(model)  # this worker's own view stands until the next write
+
+    def flush(self):
+        """Write this worker's pending success-rate and latency stats to the shared table."""
+        self._flushed_at = time.monotonic()
+        if not self.db_path:
+            return
+        with self._lock:
+            pending = {model: self._models[model] for model in self._unflushed}
+            rows = [(model, *(state[column] for column in self._STATS_COLUMNS)) for model, state in pending.items()]
+            self._unflushed.clear()
+        if not rows:
+            return
+        stats = ', '.join(self._STATS_COLUMNS)
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    f"INSERT INTO model_health (model, {stats}) VALUES (?, {', '.join('?' for _ in self._STATS_COLUMNS)}) "
+                    f"ON CONFLICT(model) DO UPDATE SET "
+                    f"{', '.join(f'{column} = excluded.{column}' for column in self._STATS_COLUMNS)}",
+                    rows
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self._unflushed.update(pending)
+
+    @staticmethod
+    def _outcome(state: dict, success: bool, latency: float = None):
+        state["success_rate"] = (1 - EWMA_ALPHA) * state["success_rate"] + EWMA_ALPHA * (1.0 if success else 0.0)
+        if latency is not None:
+            previous = state["latency"]
+            state["latency"] = latency if previous is None else (1 - EWMA_ALPHA) * previous + EWMA_ALPHA * latency
+        state["samples"] += 1
+
+    def record_success(self, model: str, latency: float = None):
+        """A reply (or first streamed token) arrived after latency seconds; any cooldown ends."""
+        def change(state, now):
+            self._outcome(state, True, latency)
+            state["rate_limits"] = 0
+            state["cooldown_until"] = 0.0
+            state["retry_after"] = None
+        self._update(model, change)
+
+    def record_rate_limit(self, model: str, retry_after: float = None) -> float:
+        """
+        Start a cooldown after a 429: retry_after seconds if the provider sent one,
+        else default_cooldown doubled for each consecutive 429, up to max_cooldown.
+        Returns the cooldown length.
+        """
+        cooldown = {}
+
+        def change(state, now):
+            self._outcome(state, False)
+            state["rate_limits"] += 1
+            seconds = retry_after if retry_after is not None else min(
+                self.max_cooldown, self.default_cooldown * 2 ** (state["rate_limits"] - 1))
+            state["retry_after"] = retry_after
+            state["cooldown_until"] = max(state["cooldown_until"], now + seconds)
+            cooldown["seconds"] = seconds
+        self._update(model, change)
+        return cooldown["seconds"]
+
+    def record_failure(self, model: str):
+        """A non-429 failure: counted in the success rate, but no cooldown."""
+        self._update(model, lambda state, now: self._outcome(state, False))
+
+    def cooldown_remaining(self, model: str) -> float:
+        return max(0.0, self._state(model)["cooldown_until"] - time.time())
+
+    def success_rate(self, model: str) -> float:
+        """Rolling share of recent calls to model that succeeded (1.0 before any are recorded)."""
+        return self._state(model)["success_rate"]
+
+    def order(self, models: list) -> list:
+        """
+        models with the cooling ones moved to the end, soonest recovery first, so
+        callers try healthy models first and cooling ones only as a last resort.
+        """
+        remaining = {model: self.cooldown_remaining(model) for model in models}
+        healthy = [model for model in models if not remaining[model]]
+        cooling = sorted((model for model in models if remaining[model]), key=remaining.get)
+        if healthy and models and remaining[models[0]]:
+            self.skipped += 1
+        return healthy + cooling
+
+    def snapshot(self) -> dict:
+        if self.db_path:
+            self.flush()
+            self._refresh()
+        now = time.time()
+        with self._lock:
+            models = {
+                model: {
+                    "cooldown_remaining_s": round(max(0.0, state["cooldown_until"] - now), 1),
+                    "retry_after_s": state["retry_after"],
+                    "consecutive_rate_limits": state["rate_limits"],
+                    "success_rate": round(state["success_rate"], 3),
+                    "latency_ms": None if state["latency"] is None else round(state["latency"] * 1000),
+                    "samples": state["samples"],
+                }
+                for model, state in sorted(self._models.items())
+            }
+        return {"shared_db": bool(self.db_path), "skipped_cooling_models": self.skipped, "models": models}
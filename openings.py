@@ -0,0 +1,138 @@
+"""
+Pre-generated opening turns for SeanceAI.
+Curated salon starters and figure starter questions are generated offline (see
+pregenerate.py) and stored as versioned JSON artifacts keyed by model and prompt
+hash. A turn is served from the store only when the prompt it would send today
+hashes identically, so editing a persona or template silently retires old output.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from figures import CURATED_COMBOS, HISTORICAL_FIGURES, get_dinner_party_prompt, get_figure, get_system_prompt
+
+# Bump when the artifact layout or generation parameters change
+ARTIFACT_VERSION = 1
+
+
+def prompt_hash(messages: list, model: str) -> str:
+    """Hash the exact request a turn would send upstream."""
+    encoded = json.dumps(
+        {"model": model, "messages": [[m["role"], m["content"]] for m in messages]},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _model_slug(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+def plan_openings() -> list:
+    """
+    List every opening turn worth pre-generating: each curated salon's starter
+    questions and each figure's catalog starter questions.
+    """
+    entries = []
+    for combo_id, combo in CURATED_COMBOS.items():
+        system_prompt = get_dinner_party_prompt(combo["guests"])
+        for question in combo["starter_questions"]:
+            entries.append({
+                "kind": "dinner-party",
+                "subject": combo_id,
+                "message": question,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": question},
+                ],
+            })
+    for figure_id in HISTORICAL_FIGURES:
+        system_prompt = get_system_prompt(figure_id)
+        for question in get_figure(figure_id)["starter_questions"]:
+            entries.append({
+                "kind": "chat",
+                "subject": figure_id,
+                "message": question,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": question},
+                ],
+            })
+    return entries
+
+
+class OpeningStore:
+    """Directory of pre-generated replies: <root>/v<version>/<model>/<prompt_hash>.json"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._responses = {}
+        self.hits = 0
+
+    def model_dir(self, model: str) -> str:
+        return os.path.join(self.root, f"v{ARTIFACT_VERSION}", _model_slug(model))
+
+    def artifact_path(self, model: str, digest: str) -> str:
+        return os.path.join(self.model_dir(model), f"{digest}.json")
+
+    def load(self) -> int:
+        """Index every artifact of the current version; returns the number loaded."""
+        self._responses = {}
+        version_dir = os.path.join(self.root, f"v{ARTIFACT_VERSION}")
+        if not os.path.isdir(version_dir):
+            return 0
+        for model_slug in os.listdir(version_dir):
+            model_dir = os.path.join(version_dir, model_slug)
+            if not os.path.isdir(model_dir):
+                continue
+            for name in os.listdir(model_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(model_dir, name), encoding="utf-8") as f:
+                        artifact = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if artifact.get("version") == ARTIFACT_VERSION and artifact.get("response"):
+                    self._responses[(artifact["model"], artifact["prompt_hash"])] = artifact["response"]
+        return len(self._responses)
+
+    def lookup(self, model: str, messages: list):
+        """Return the pre-generated reply for this exact opening request, if any."""
+        if not self._responses or len(messages) != 2:
+            return None
+        response = self._responses.get((model, prompt_hash(messages, model)))
+        if response is not None:
+            self.hits += 1
+        return response
+
+    def has(self, model: str, digest: str) -> bool:
+        return os.path.exists(self.artifact_path(model, digest))
+
+    def save(self, artifact: dict):
+        """Atomically write one artifact so an interrupted job never leaves partial files."""
+        directory = self.model_dir(artifact["model"])
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": ARTIFACT_VERSION, **artifact}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.artifact_path(artifact["model"], artifact["prompt_hash"]))
+
+    def prune(self, model: str, keep: set) -> int:
+        """Delete artifacts for a model whose prompt hash is no longer planned."""
+        directory = self.model_dir(model)
+        if not os.path.isdir(directory):
+            return 0
+        removed = 0
+        for name in os.listdir(directory):
+            if name.endswith(".json") and name[:-5] not in keep:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        return {"artifacts": len(self._responses), "hits": self.hits}
@@ -0,0 +1,110 @@
+"""
+Pre-generate SeanceAI opening turns.
+
+Walks every curated salon and figure starter question, calls the model with
+bounded concurrency, and writes one versioned artifact per prompt into the
+opening store. Re-running the job is safe: entries whose prompt hash already has
+an artifact are skipped, so an interrupted run resumes where it stopped.
+
+Usage:
+    python pregenerate.py [--model MODEL ...] [--concurrency 4] [--kind salon|figure|all] [--prune]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from app import DEFAULT_MODEL, OPENINGS_DIR, call_llm
+from openings import OpeningStore, plan_openings, prompt_hash
+
+KINDS = {"salon": {"dinner-party"}, "figure": {"chat"}, "all": {"dinner-party", "chat"}}
+
+
+def _generate(entry: dict, model: str) -> dict:
+    started = time.monotonic()
+    response, is_error = call_llm(entry["messages"], model)
+    return {
+        "entry": entry,
+        "model": model,
+        "response": response,
+        "is_error": is_error,
+        "elapsed": time.monotonic() - started,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate curated salon and starter-question openings.")
+    parser.add_argument("--model", action="append", dest="models",
+                        help=f"Model to generate for (repeatable, default {DEFAULT_MODEL})")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum in-flight model calls")
+    parser.add_argument("--kind", choices=sorted(KINDS), default="all", help="Which openings to generate")
+    parser.add_argument("--out", default=OPENINGS_DIR, help="Opening store directory")
+    parser.add_argument("--prune", action="store_true", help="Delete artifacts whose prompt is no longer planned")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be generated and exit")
+    args = parser.parse_args(argv)
+
+    store = OpeningStore(args.out)
+    models = args.models or [DEFAULT_MODEL]
+    entries = [entry for entry in plan_openings() if entry["kind"] in KINDS[args.kind]]
+
+    pending = []
+    skipped = 0
+    planned_hashes = {model: set() for model in models}
+    for model in models:
+        for entry in entries:
+            digest = prompt_hash(entry["messages"], model)
+            planned_hashes[model].add(digest)
+            if store.has(model, digest):
+                skipped += 1
+            else:
+                pending.append((dict(entry, prompt_hash=digest), model))
+
+    print(f"{len(entries) * len(models)} openings planned, {skipped} unchanged, {len(pending)} to generate")
+    if args.dry_run:
+        return 0
+
+    started = time.monotonic()
+    generated = 0
+    generated_chars = 0
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        futures = [pool.submit(_generate, entry, model) for entry, model in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            entry = result["entry"]
+            label = f"{entry['kind']}:{entry['subject']} [{result['model']}] {entry['message']}"
+            if result["is_error"] or not result["response"].strip():
+                failures.append((label, result["response"]))
+                print(f"  FAILED  {label}: {result['response']}")
+                continue
+            store.save({
+                "kind": entry["kind"],
+                "subject": entry["subject"],
+                "message": entry["message"],
+                "model": result["model"],
+                "prompt_hash": entry["prompt_hash"],
+                "response": result["response"],
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "latency_ms": round(result["elapsed"] * 1000),
+            })
+            generated += 1
+            generated_chars += len(result["response"])
+            print(f"  ok      {label} ({result['elapsed']:.1f}s)")
+
+    if args.prune:
+        removed = sum(store.prune(model, planned_hashes[model]) for model in models)
+        print(f"Pruned {removed} stale artifact(s)")
+
+    elapsed = time.monotonic() - started
+    rate = generated / elapsed if elapsed else 0.0
+    print(
+        f"Generated {generated}, skipped {skipped}, failed {len(failures)} "
+        f"in {elapsed:.1f}s ({rate:.2f} openings/s, {generated_chars / elapsed if elapsed else 0:.0f} chars/s)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
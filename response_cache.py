@@ -0,0 +1,156 @@
+"""
+Response cache for repeatable SeanceAI turns.
+Curated salon openings and starter questions arrive with the same guests, model,
+history and message over and over; caching the finished reply lets those turns
+skip a paid model call. Entries live in an in-process LRU and, optionally, in a
+SQLite file shared by every gunicorn worker on the host.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_message(text: str) -> str:
+    """Collapse whitespace and case so trivially different phrasings share a key."""
+    return ' '.join(text.split()).casefold()
+
+
+def history_hash(history: list) -> str:
+    """Stable hash of a conversation history (role and trimmed content only)."""
+    normalized = [
+        [msg.get("role", "user"), str(msg.get("content", "")).strip()]
+        for msg in history
+    ]
+    encoded = json.dumps(normalized, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(route: str, subject, model: str, history: list, message: str) -> str:
+    """Build the cache key for a turn: route, figure or guest tuple, model, history and message."""
+    if isinstance(subject, (list, tuple)):
+        subject = ",".join(subject)
+    parts = [route, subject, model, history_hash(history), normalize_message(message)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier TTL + LRU cache of finished model replies."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400, db_path: str = None,
+                 max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        if self.db_path:
+            self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=1.0)
+
+    def _init_db(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def get(self, key: str):
+        """Return the cached reply for key, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+        value = self._disk_get(key, now) if self.db_path else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self._memory_set(key, value, now + self.ttl)
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a finished reply in both tiers."""
+        if not value:
+            return
+        expires_at = time.time() + self.ttl
+        self._memory_set(key, value, expires_at)
+        with self._lock:
+            self.stores += 1
+        if self.db_path:
+            self._disk_set(key, value, expires_at)
+
+    def _memory_set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def _disk_set(self, key: str, value: str, expires_at: float):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now)
+                )
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "capacity": self.max_entries,
+            "shared_db": bool(self.db_path),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
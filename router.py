@@ -0,0 +1,188 @@
+"""
+Latency- and cost-aware model routing for SeanceAI.
+A request's model may name a tier ("swift", "balanced", "advanced") or "auto"
+(every model) instead of a concrete model id, optionally with a policy suffix
+such as "swift:fastest" or "auto:cheapest". The router then picks the concrete
+model from live per-model statistics: rolling time to first token, streamed
+tokens per second, success rate, cooldowns and circuit state, and list price.
+
+Policies:
+- fastest: the healthy model with the lowest expected reply time (median time to
+  first token plus a typical reply at its median token rate), penalised by its
+  failure rate.
+- cheapest: the cheapest healthy model whose p95 time to first token meets the
+  target, falling back to fastest when none does.
+
+Models without enough samples use prior estimates, so new or idle models still
+get traffic and are measured; a small share of requests also explores another
+healthy candidate so the statistics keep up as free-tier performance shifts.
+Exploration stays within the policy: only models within the p95 target and, for
+cheapest, within EXPLORE_PRICE_BAND of the pick's price. Every decision records
+why it was made, for the X-Model-Route header.
+"""
+
+import json
+import random
+import threading
+from collections import deque
+
+from circuit_breaker import OPEN
+
+POLICIES = ('fastest', 'cheapest')
+AUTO = 'auto'
+# "cheapest" explores only among models priced at most this multiple of its pick (so free picks stay free)
+EXPLORE_PRICE_BAND = 2.0
+
+
+class RouteDecision:
+    """The model picked for a routed request and the reasoning behind it."""
+
+    def __init__(self, requested: str, model: str, policy: str, reason: str, candidates: list):
+        self.requested = requested
+        self.model = model
+        self.policy = policy
+        self.reason = reason
+        self.candidates = candidates
+
+    def header(self) -> str:
+        """Summary for the X-Model-Route response header."""
+        reason = self.reason.replace('"', "'")
+        return f'{self.model}; requested={self.requested}; policy={self.policy}; reason="{reason}"'
+
+    def candidates_header(self) -> str:
+        """The scored candidates as compact JSON, for X-Model-Route-Candidates."""
+        return json.dumps(self.candidates, separators=(",", ":"))
+
+
+class ModelRouter:
+    """Routes tier and "auto" requests to concrete models; see the module docstring."""
+
+    def __init__(self, models: list, ttft_stats, health, breakers, auto_policy: str = 'cheapest',
+                 tier_policy: str = 'fastest', p95_target: float = 3.0, explore_rate: float = 0.05,
+                 prior_ttft: float = 1.5, prior_tokens_per_second: float = 40.0, reply_tokens: int = 300,
+                 min_success_rate: float = 0.5, rng: random.Random = None):
+        self.models = models
+        self.tiers = {}
+        for entry in models:
+            self.tiers.setdefault(entry["tier"], []).append(entry)
+        self.ttft_stats = ttft_stats
+        self.health = health
+        self.breakers = breakers
+        self.auto_policy = auto_policy
+        self.tier_policy = tier_policy
+        self.p95_target = p95_target
+        self.explore_rate = explore_rate
+        self.prior_ttft = prior_ttft
+        self.prior_tokens_per_second = prior_tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.min_success_rate = min_success_rate
+        self.rng = rng or random.Random()
+        self.decisions = {}
+        self._throughput = {}
+        self._lock = threading.Lock()
+
+    def targets(self) -> list:
+        """Model values the router accepts besides concrete model ids."""
+        return [AUTO, *self.tiers]
+
+    def parse(self, requested):
+        """(scope, policy) for a routing target such as "auto" or "swift:cheapest", else None."""
+        if not isinstance(requested, str) or '/' in requested:
+            return None
+        scope, _, policy = requested.partition(':')
+        if scope != AUTO and scope not in self.tiers:
+            return None
+        policy = policy or (self.auto_policy if scope == AUTO else self.tier_policy)
+        return (scope, policy) if policy in POLICIES else None
+
+    def record_throughput(self, model: str, tokens_per_second: float):
+        with self._lock:
+            self._throughput.setdefault(model, deque(maxlen=200)).append(tokens_per_second)
+
+    def _median_throughput(self, model: str):
+        with self._lock:
+            samples = sorted(self._throughput.get(model, ()))
+        return samples[len(samples) // 2] if len(samples) >= 5 else None
+
+    def _candidate(self, entry: dict) -> dict:
+        model = entry["id"]
+        p50 = self.ttft_stats.percentile(model, 50)
+        p95 = self.ttft_stats.percentile(model, 95)
+        rate = self._median_throughput(model)
+        success = self.health.success_rate(model)
+        expected = (self.prior_ttft if p50 is None else p50) + self.reply_tokens / (rate or self.prior_tokens_per_second)
+        excluded = None
+        if self.health.cooldown_remaining(model):
+            excluded = "cooling down after 429"
+        elif self.breakers.state(model) == OPEN:
+            excluded = "circuit open"
+        elif success < self.min_success_rate:
+            excluded = f"success rate {success:.0%}"
+        return {
+            "model": model,
+            "ttft_p50_ms": None if p50 is None else round(p50 * 1000),
+            "ttft_p95_ms": None if p95 is None else round(p95 * 1000),
+            "tokens_per_second": None if rate is None else round(rate, 1),
+            "success_rate": round(success, 3),
+            # Blended list price per million tokens; chat turns send about three prompt tokens per reply token
+            "price": round((3 * entry.get("prompt_price", 0.0) + entry.get("completion_price", 0.0)) / 4, 4),
+            "expected_s": round(expected, 2),
+            "score": round(expected / max(success, 0.05), 2),
+            "excluded": excluded,
+        }
+
+    def route(self, requested):
+        """A RouteDecision for a routing target, or None for a concrete model id (or no model)."""
+        parsed = self.parse(requested)
+        if parsed is None:
+            return None
+        scope, policy = parsed
+        entries = self.models if scope == AUTO else self.tiers[scope]
+        candidates = [self._candidate(entry) for entry in entries]
+        healthy = [c for c in candidates if not c["excluded"]]
+        fastest = sorted(healthy, key=lambda c: c["score"])
+        target_ms = self.p95_target * 1000
+        eligible = [c for c in healthy if (c["ttft_p95_ms"] or self.prior_ttft * 2000) <= target_ms]
+        explorable = []
+
+        if not healthy:
+            chosen = min(candidates, key=lambda c: c["score"])
+            reason = f"no healthy model in {scope}; fastest regardless"
+        elif policy == 'cheapest':
+            if eligible:
+                chosen = min(eligible, key=lambda c: (c["price"], c["score"]))
+                measured = "unmeasured" if chosen["ttft_p95_ms"] is None else f"p95 TTFT {chosen['ttft_p95_ms']}ms"
+                reason = f"cheapest healthy at ${chosen['price']:g}/M with {measured} within {target_ms:g}ms"
+                explorable = [c for c in eligible if c["price"] <= chosen["price"] * EXPLORE_PRICE_BAND]
+            else:
+                chosen = fastest[0]
+                reason = f"no healthy model within {target_ms:g}ms p95 TTFT; fastest at ~{chosen['expected_s']:g}s"
+        else:
+            chosen = fastest[0]
+            reason = f"fastest healthy at ~{chosen['expected_s']:g}s per reply"
+            explorable = eligible
+
+        explorable = [c for c in explorable if c is not chosen]
+        if explorable and self.rng.random() < self.explore_rate:
+            exploit = chosen
+            chosen = self.rng.choice(explorable)
+            reason = f"exploration: {chosen['model']} instead of {policy} pick {exploit['model']} ({reason})"
+
+        key = (requested, chosen["model"])
+        with self._lock:
+            self.decisions[key] = self.decisions.get(key, 0) + 1
+        return RouteDecision(requested, chosen["model"], policy, reason, candidates)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            decisions = [
+                {"requested": requested, "model": model, "count": count}
+                for (requested, model), count in sorted(self.decisions.items())
+            ]
+        return {
+            "targets": self.targets(),
+            "auto_policy": self.auto_policy,
+            "tier_policy": self.tier_policy,
+            "p95_target_ms": round(self.p95_target * 1000),
+            "decisions": decisions,
+        }
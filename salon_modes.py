@@ -0,0 +1,142 @@
+"""
+Alternative salon turn strategies for SeanceAI.
+The default salon turn is one completion that writes every guest's reply. These
+strategies instead give each guest their own upstream request and merge the
+results into the same guest_start / content / guest_end event stream: fan-out
+runs every guest at once, turn-taking runs them one after another so each guest
+can react to the ones before.
+"""
+
+import queue
+import threading
+import time
+
+_FINISHED = object()
+
+
+def fan_out_events(guest_ids: list, build_messages, stream_events):
+    """
+    Stream every guest's reply concurrently and multiplex the results.
+
+    build_messages(guest_id) returns the message list for one guest and
+    stream_events(messages) returns that guest's upstream event iterator. Each
+    guest runs on its own thread (a greenlet under gevent), so the turn takes as
+    long as the slowest guest rather than the sum of all of them. Yields typed
+    events tagged with figure_id, guest_error for a guest that failed, and a
+    final done, or the first error if no guest produced any text.
+    """
+    results = queue.Queue()
+    cancelled = threading.Event()
+    started_at = time.monotonic()
+
+    def run_guest(guest_id):
+        events = None
+        try:
+            events = stream_events(build_messages(guest_id))
+            for event in events:
+                if cancelled.is_set():
+                    break
+                results.put((guest_id, event))
+        except Exception as e:
+            results.put((guest_id, {'error': str(e)}))
+        finally:
+            if events is not None and hasattr(events, 'close'):
+                events.close()
+            results.put((guest_id, _FINISHED))
+
+    for guest_id in guest_ids:
+        threading.Thread(target=run_guest, args=(guest_id,), daemon=True).start()
+
+    speaking = {}
+    errors = {}
+    finished = 0
+    try:
+        while finished < len(guest_ids):
+            guest_id, event = results.get()
+            if event is _FINISHED:
+                finished += 1
+                if guest_id in speaking:
+                    yield _guest_end(guest_id, started_at, speaking[guest_id])
+                elif guest_id in errors:
+                    yield {'event': 'guest_error', 'figure_id': guest_id, 'message': errors[guest_id]['error']}
+                continue
+            if event.get('content'):
+                if guest_id not in speaking:
+                    speaking[guest_id] = time.monotonic()
+                    yield {'event': 'guest_start', 'figure_id': guest_id}
+                yield {'event': 'content', 'content': event['content'], 'figure_id': guest_id}
+            elif 'error' in event:
+                errors[guest_id] = event
+
+        if not speaking and errors:
+            yield errors[guest_ids[0]] if guest_ids[0] in errors else next(iter(errors.values()))
+        else:
+            yield {'done': True, 'elapsed_ms': _elapsed_ms(started_at)}
+    finally:
+        cancelled.set()
+
+
+def turn_taking_events(guest_ids: list, build_messages, stream_events):
+    """
+    Stream guests one after another, each seeing the replies given before it.
+
+    build_messages(guest_id, prior_turns) returns the message list for one guest,
+    where prior_turns is the list of (guest_id, text) replies completed so far, and
+    stream_events(messages) returns that guest's upstream event iterator. The next
+    guest is dispatched as soon as the previous guest's stream reports done, and
+    each guest's text is relayed as it arrives. Event shapes match fan_out_events;
+    guest_end also reports when the guest's request was dispatched.
+    """
+    started_at = time.monotonic()
+    prior_turns = []
+    first_error = None
+
+    for guest_id in guest_ids:
+        dispatched_at = time.monotonic()
+        first_token_at = None
+        parts = []
+        error = None
+        events = stream_events(build_messages(guest_id, list(prior_turns)))
+        try:
+            for event in events:
+                if event.get('content'):
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                        yield {'event': 'guest_start', 'figure_id': guest_id}
+                    parts.append(event['content'])
+                    yield {'event': 'content', 'content': event['content'], 'figure_id': guest_id}
+                elif 'error' in event:
+                    error = event
+                    break
+                elif event.get('done'):
+                    break
+        finally:
+            if hasattr(events, 'close'):
+                events.close()
+
+        if first_token_at is not None:
+            end = _guest_end(guest_id, started_at, first_token_at)
+            end['dispatched_ms'] = round((dispatched_at - started_at) * 1000)
+            yield end
+            prior_turns.append((guest_id, ''.join(parts).strip()))
+        elif error is not None:
+            first_error = first_error or error
+            yield {'event': 'guest_error', 'figure_id': guest_id, 'message': error['error']}
+
+    if not prior_turns and first_error:
+        yield first_error
+    else:
+        yield {'done': True, 'elapsed_ms': _elapsed_ms(started_at)}
+
+
+def _elapsed_ms(since: float) -> int:
+    return round((time.monotonic() - since) * 1000)
+
+
+def _guest_end(guest_id: str, started_at: float, first_token_at: float) -> dict:
+    return {
+        'event': 'guest_end',
+        'figure_id': guest_id,
+        'first_token_ms': round((first_token_at - started_at) * 1000),
+        'elapsed_ms': _elapsed_ms(started_at),
+    }
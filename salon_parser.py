@@ -0,0 +1,196 @@
+"""
+Salon response parsing for SeanceAI.
+A salon reply is one completion in which each guest's turn starts with a speaker
+marker ("[guest_id]:", "NAME:", "**Name:**", ...) at the beginning of a line.
+Markers for a guest lineup are compiled once into a single alternation, so a
+finished reply is split in one pass, and GuestStreamParser turns the live token
+stream into per-guest events as it arrives.
+"""
+
+import re
+from functools import lru_cache
+
+from figures import HISTORICAL_FIGURES
+
+# Bound on distinct guest lineups whose compiled marker index is kept
+MARKER_CACHE_SIZE = 256
+
+
+def _marker_forms(label: str) -> list:
+    """Speaker marker spellings for one label (a guest id or display name)."""
+    return [f"{label}:", f"**{label}:**", f"**{label}**:"]
+
+
+@lru_cache(maxsize=MARKER_CACHE_SIZE)
+def _marker_index(guest_ids: tuple):
+    """
+    Build the marker index for an ordered guest lineup.
+    Returns (variants, pattern): lower-cased (marker, guest_id) pairs, longest
+    first, and one compiled case-insensitive alternation anchored at line starts
+    whose named group g<N> identifies the guest.
+    """
+    variants = []
+    alternatives = []
+    for index, guest_id in enumerate(guest_ids):
+        labels = [f"[{guest_id}]", guest_id]
+        figure = HISTORICAL_FIGURES.get(guest_id)
+        if figure:
+            labels.append(figure["name"])
+        forms = sorted({form.lower() for label in labels for form in _marker_forms(label)}, key=len, reverse=True)
+        variants.extend((form, guest_id) for form in forms)
+        alternatives.append(f"(?P<g{index}>{'|'.join(re.escape(form) for form in forms)})")
+    variants.sort(key=lambda pair: len(pair[0]), reverse=True)
+    pattern = re.compile(rf"^[ \t]*(?:{'|'.join(alternatives)})", re.IGNORECASE | re.MULTILINE)
+    return tuple(variants), pattern
+
+
+def guest_marker_variants(guest_ids: list) -> tuple:
+    """Lower-cased speaker markers for each guest, as (marker, guest_id) pairs."""
+    return _marker_index(tuple(guest_ids))[0]
+
+
+def parse_salon_response(response: str, guest_ids: list) -> list:
+    """
+    Split a finished salon reply into [{"figure_id", "response"}] in a single pass.
+    Text before the first marker is dropped; if no marker is found the whole reply
+    is attributed to the first guest.
+    """
+    guest_ids = tuple(guest_ids)
+    _, pattern = _marker_index(guest_ids)
+    responses = []
+    matches = list(pattern.finditer(response))
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(response)
+        text = response[match.end():end].strip()
+        if text:
+            responses.append({
+                "figure_id": guest_ids[int(match.lastgroup[1:])],
+                "response": text
+            })
+
+    if not responses and response.strip():
+        responses.append({
+            "figure_id": guest_ids[0],
+            "response": response.strip()
+        })
+    return responses
+
+
+class GuestStreamParser:
+    """
+    Incremental state machine over a salon token stream, sharing the marker
+    index used by parse_salon_response.
+
+    feed() accepts text chunks of any size and returns events:
+        {'event': 'guest_start', 'figure_id': id}
+        {'event': 'content', 'content': text, 'figure_id': id}
+        {'event': 'guest_end', 'figure_id': id}
+    Text at the start of a line is held back only while it could still be a
+    marker; everything else is emitted immediately. Text before the first marker
+    is emitted as content with figure_id None. Call close() at end of stream.
+    """
+
+    def __init__(self, guest_ids: list):
+        self.markers = guest_marker_variants(guest_ids)
+        self.current = None
+        self._pending = ''
+        self._at_line_start = True
+        self._skip_leading_space = False
+
+    def feed(self, text: str) -> list:
+        events = []
+        pos = 0
+        while pos < len(text):
+            newline = text.find('\n', pos)
+            end = len(text) if newline == -1 else newline + 1
+            piece = text[pos:end]
+            pos = end
+
+            if not self._at_line_start:
+                events.extend(self._content(piece))
+                self._at_line_start = newline != -1
+                continue
+
+            self._pending += piece
+            verdict = self._classify(self._pending)
+            if verdict is None:
+                continue  # still ambiguous; wait for more text
+            pending, self._pending = self._pending, ''
+            if verdict is False:
+                events.extend(self._content(pending))
+                self._at_line_start = pending.endswith('\n')
+                continue
+
+            guest_id, marker_end = verdict
+            events.extend(self._switch(guest_id))
+            self._skip_leading_space = True
+            self._at_line_start = False
+            # Re-scan whatever followed the marker as ordinary text
+            text = pending[marker_end:] + text[pos:]
+            pos = 0
+        return events
+
+    def close(self) -> list:
+        events = []
+        if self._pending:
+            events.extend(self._content(self._pending))
+            self._pending = ''
+        if self.current is not None:
+            events.append({'event': 'guest_end', 'figure_id': self.current})
+            self.current = None
+        return events
+
+    def _classify(self, pending: str):
+        """
+        Decide whether text at a line start is a speaker marker.
+        Returns (guest_id, marker_end), False if it cannot be one, or None if undecided.
+        """
+        stripped = pending.lstrip(' \t')
+        if not stripped:
+            return False if pending.endswith('\n') else None
+        lowered = stripped.lower()
+        offset = len(pending) - len(stripped)
+        undecided = False
+        for marker, guest_id in self.markers:
+            if lowered.startswith(marker):
+                return guest_id, offset + len(marker)
+            if marker.startswith(lowered):
+                undecided = True
+        return None if undecided else False
+
+    def _switch(self, guest_id: str) -> list:
+        events = []
+        if self.current is not None:
+            events.append({'event': 'guest_end', 'figure_id': self.current})
+        self.current = guest_id
+        events.append({'event': 'guest_start', 'figure_id': guest_id})
+        return events
+
+    def _content(self, text: str) -> list:
+        if self._skip_leading_space:
+            text = text.lstrip()
+            if not text:
+                return []
+            self._skip_leading_space = False
+        if not text:
+            return []
+        return [{'event': 'content', 'content': text, 'figure_id': self.current}]
+
+
+def parse_guest_stream(events, guest_ids: list):
+    """
+    Re-emit a salon's stream events with per-guest structure.
+    Content events are split by guest; events that are already typed pass through
+    untouched, and done/error events pass through after the parser is flushed.
+    """
+    parser = GuestStreamParser(guest_ids)
+    for event in events:
+        if 'event' in event:
+            yield event  # already attributed to a guest upstream
+            continue
+        if 'content' in event:
+            yield from parser.feed(event['content'])
+            continue
+        yield from parser.close()
+        yield event
+    yield from parser.close()
@@ -0,0 +1,163 @@
+"""
+Server-side conversation sessions for SeanceAI.
+Without a session every turn re-sends the whole history array from the
+browser. With one, the client sends its session id, the history hash the
+server last returned and only the new message; the server rebuilds the history
+and records each completed turn. Writes are compare-and-swap on the history
+hash, so a stale or concurrent client gets a conflict instead of silently
+forking the conversation. Each session also records its subject (the figure or
+guest list it was created for), and a turn for any other subject is refused.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from response_cache import history_hash
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def valid_session_id(session_id) -> bool:
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+class SessionStore(ABC):
+    """
+    Interface for session backends.
+    load() returns (history, history_hash, subject) or None for an unknown or
+    expired session. save() replaces a session's history if its stored hash still
+    equals expected_hash and it belongs to subject (expected_hash None means "create
+    or overwrite", taking on subject), returning the new hash, or None on a conflict.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, history: list, expected_hash: str = None, subject: str = ''):
+        ...
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU + TTL store; sessions are not shared between workers."""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 7 * 86400):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            history, digest, subject, expires_at = entry
+            if expires_at <= time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return list(history), digest, subject
+
+    def save(self, session_id: str, history: list, expected_hash: str = None, subject: str = ''):
+        digest = history_hash(history)
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if expected_hash is not None and (entry is None or entry[1:3] != (expected_hash, subject)):
+                return None
+            self._sessions[session_id] = (list(history), digest, subject, time.time() + self.ttl)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return digest
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "sessions": len(self._sessions), "capacity": self.max_sessions}
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite store shared by every gunicorn worker on the host."""
+
+    def __init__(self, db_path: str, ttl: float = 7 * 86400):
+        self.db_path = db_path
+        self.ttl = ttl
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, history TEXT NOT NULL, history_hash TEXT NOT NULL, "
+                "subject TEXT NOT NULL DEFAULT '', expires_at REAL NOT NULL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if "subject" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN subject TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=2.0)
+
+    def load(self, session_id: str):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT history, history_hash, subject FROM sessions WHERE id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def save(self, session_id: str, history: list, expected_hash: str = None, subject: str = ''):
+        digest = history_hash(history)
+        encoded = json.dumps(history, separators=(",", ":"), ensure_ascii=False)
+        now = time.time()
+        with self._connect() as conn:
+            if expected_hash is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (id, history, history_hash, subject, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (session_id, encoded, digest, subject, now + self.ttl)
+                )
+            else:
+                updated = conn.execute(
+                    "UPDATE sessions SET history = ?, history_hash = ?, expires_at = ? "
+                    "WHERE id = ? AND history_hash = ? AND subject = ? AND expires_at > ?",
+                    (encoded, digest, now + self.ttl, session_id, expected_hash, subject, now)
+                ).rowcount
+                if not updated:
+                    return None
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        return digest
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        return {"backend": "sqlite", "sessions": count}
+
+
+def open_session_store(spec: str, ttl: float = 7 * 86400):
+    """
+    Create a store from a SESSION_STORE setting: "memory", "sqlite:///path/to/file"
+    or a bare .sqlite3 path. An empty setting disables sessions and returns None.
+    """
+    spec = (spec or '').strip()
+    if not spec:
+        return None
+    if spec == 'memory':
+        return MemorySessionStore(ttl=ttl)
+    if spec.startswith('sqlite:///'):
+        return SQLiteSessionStore(spec[len('sqlite://'):], ttl=ttl)
+    if spec.startswith('sqlite:'):
+        return SQLiteSessionStore(spec[len('sqlite:'):], ttl=ttl)
+    return SQLiteSessionStore(spec, ttl=ttl)
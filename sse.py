@@ -0,0 +1,278 @@
+"""
+Server-Sent Events framing for SeanceAI.
+Upstream deltas are often a single token, and writing each one as its own frame
+costs a json.dumps call, a WSGI write and usually a TCP packet. coalesce_frames
+merges consecutive text deltas for a short window (or up to a size budget) into
+one frame, builds text frames from pre-encoded byte templates, and counts the
+events, frames and bytes of every stream. UpstreamStreamParser reads the
+provider's completion stream the other way round, straight from raw bytes.
+"""
+
+import contextvars
+import json
+import queue
+import re
+import threading
+import time
+from functools import lru_cache
+from json.decoder import scanstring
+
+_CONTENT_OPEN = b'data: {"content": '
+_TYPED_CONTENT_OPEN = b'event: content\ndata: {"content": '
+_FRAME_CLOSE = b'}\n\n'
+_UNTYPED = object()
+_END = object()
+_TIMEOUT = object()
+
+# Bound on distinct figure ids whose typed content frame suffix is kept
+SUFFIX_CACHE_SIZE = 256
+
+# Bytes requested per read from the upstream completion stream
+UPSTREAM_READ_SIZE = 16384
+
+# A completion chunk whose delta carries no text (role-only or empty content)
+_EMPTY_DELTA = re.compile(rb'"content"\s*:\s*(?:""|null)')
+_CONTENT_VALUE = b'"content":"'
+
+
+def encode_event(payload: dict) -> bytes:
+    """Encode one event dict as an SSE frame; an 'event' key becomes the SSE event type."""
+    if 'event' in payload:
+        data = {key: value for key, value in payload.items() if key != 'event'}
+        return f"event: {payload['event']}\ndata: {json.dumps(data)}\n\n".encode()
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+@lru_cache(maxsize=SUFFIX_CACHE_SIZE)
+def _typed_content_close(figure_id) -> bytes:
+    return b', "figure_id": ' + json.dumps(figure_id).encode() + _FRAME_CLOSE
+
+
+def _merge_key(event: dict):
+    """Return what a text delta may be merged with, or None if the event must be framed alone."""
+    if 'event' not in event:
+        return _UNTYPED if event.keys() == {'content'} else None
+    if event['event'] == 'content' and event.keys() <= {'event', 'content', 'figure_id'}:
+        return ('content', event.get('figure_id'))
+    return None
+
+
+def _encode_text(key, text: str) -> bytes:
+    """Build a content frame from the byte templates; identical to encode_event's output."""
+    if key is _UNTYPED:
+        return _CONTENT_OPEN + json.dumps(text).encode() + _FRAME_CLOSE
+    return _TYPED_CONTENT_OPEN + json.dumps(text).encode() + _typed_content_close(key[1])
+
+
+class StreamCounters:
+    """Events received and frames and bytes written for one stream."""
+
+    __slots__ = ('events', 'frames', 'bytes')
+
+    def __init__(self):
+        self.events = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def frame(self, data: bytes) -> bytes:
+        self.frames += 1
+        self.bytes += len(data)
+        return data
+
+
+class FramingMetrics:
+    """Process-wide totals of per-stream framing counters."""
+
+    def __init__(self):
+        self.streams = 0
+        self.events = 0
+        self.frames = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, counters: StreamCounters):
+        with self._lock:
+            self.streams += 1
+            self.events += counters.events
+            self.frames += counters.frames
+            self.bytes += counters.bytes
+
+    def snapshot(self) -> dict:
+        return {
+            "streams": self.streams,
+            "events": self.events,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "events_per_frame": round(self.events / self.frames, 2) if self.frames else 0.0,
+            "frames_per_stream": round(self.frames / self.streams, 1) if self.streams else 0.0,
+        }
+
+
+def coalesce_frames(events, window_ms: float = 40, max_chars: int = 1024, metrics: FramingMetrics = None,
+                    on_close=None):
+    """
+    Encode stream events as SSE byte frames, merging consecutive text deltas.
+
+    A delta is held for at most window_ms, or until max_chars of text is pending,
+    and is flushed early when an event that cannot be merged arrives (a different
+    guest's text, guest_start, done, error, ...). The first text of a stream is
+    sent at once so coalescing never delays the first token. With window_ms <= 0
+    every event becomes its own frame. The source is read on a helper thread (a
+    greenlet under gevent), in a copy of the caller's context so request-scoped
+    state such as the trace still applies, and a pending delta is flushed on time
+    even while the upstream is quiet. On close the stream's StreamCounters are
+    recorded in metrics and passed to on_close.
+    """
+    counters = StreamCounters()
+    try:
+        if window_ms <= 0:
+            for event in events:
+                counters.events += 1
+                key = _merge_key(event)
+                data = encode_event(event) if key is None else _encode_text(key, event['content'])
+                yield counters.frame(data)
+        else:
+            yield from _coalesce(events, window_ms / 1000, max_chars, counters)
+    finally:
+        if metrics is not None:
+            metrics.record(counters)
+        if on_close is not None:
+            on_close(counters)
+
+
+def _coalesce(events, window: float, max_chars: int, counters: StreamCounters):
+    inbox = queue.Queue()
+    cancelled = threading.Event()
+    threading.Thread(target=contextvars.copy_context().run, args=(_pump, events, inbox, cancelled),
+                     daemon=True).start()
+
+    pending = []
+    pending_key = None
+    pending_size = 0
+    deadline = None
+    first_text_sent = False
+    try:
+        while True:
+            try:
+                item = inbox.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = _TIMEOUT
+            if item is _TIMEOUT or item is _END or isinstance(item, BaseException):
+                if pending:
+                    yield counters.frame(_encode_text(pending_key, ''.join(pending)))
+                    pending, pending_size, deadline = [], 0, None
+                if item is _TIMEOUT:
+                    continue
+                if item is _END:
+                    return
+                raise item
+
+            counters.events += 1
+            key = _merge_key(item)
+            if pending and key != pending_key:
+                yield counters.frame(_encode_text(pending_key, ''.join(pending)))
+                pending, pending_size, deadline = [], 0, None
+            if key is None:
+                yield counters.frame(encode_event(item))
+                continue
+            if not first_text_sent:
+                first_text_sent = True
+                yield counters.frame(_encode_text(key, item['content']))
+                continue
+
+            if not pending:
+                pending_key = key
+                deadline = time.monotonic() + window
+            pending.append(item['content'])
+            pending_size += len(item['content'])
+            if pending_size >= max_chars:
+                yield counters.frame(_encode_text(pending_key, ''.join(pending)))
+                pending, pending_size, deadline = [], 0, None
+    finally:
+        cancelled.set()
+
+
+def _pump(events, inbox: queue.Queue, cancelled: threading.Event):
+    """Move source events into the inbox until the source ends or the reader goes away."""
+    try:
+        for event in events:
+            if cancelled.is_set():
+                break
+            inbox.put(event)
+    except Exception as e:
+        inbox.put(e)
+    finally:
+        if hasattr(events, 'close'):
+            events.close()
+        inbox.put(_END)
+
+
+class UpstreamStreamParser:
+    """
+    Incremental parser for an OpenAI-style chat completion SSE stream.
+
+    feed() takes raw response bytes in chunks of any size and returns the text
+    deltas completed by that chunk. Each chunk is split into lines once, with only
+    a trailing partial line carried over to the next chunk. Keep-alive comments,
+    role-only and empty deltas are dropped before any JSON is decoded, and a chunk
+    with a single text delta has only that string decoded. After feed() returns,
+    done is set once "data: [DONE]" has been seen and usage holds the usage object
+    of the final chunk, if the provider sent one.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.usage = None
+        self.frames = 0
+        self.skipped = 0
+        self._tail = b''
+
+    def feed(self, chunk: bytes) -> list:
+        if self.done:
+            return []
+        lines = (self._tail + chunk if self._tail else chunk).split(b'\n')
+        self._tail = lines.pop()
+        texts = []
+        for line in lines:
+            if not line.startswith(b'data:'):
+                continue  # blank separator, ": keep-alive" comment or another field
+            payload = line[6:] if line.startswith(b'data: ') else line[5:]
+            payload = payload.rstrip(b'\r')
+            self.frames += 1
+            if b'"usage"' not in payload:
+                start = payload.find(_CONTENT_VALUE)
+                if start != -1 and payload.find(_CONTENT_VALUE, start + 1) == -1:
+                    start += len(_CONTENT_VALUE)
+                    if payload[start:start + 1] == b'"':
+                        self.skipped += 1  # role-only or empty delta
+                        continue
+                    try:
+                        texts.append(scanstring(payload[start:].decode('utf-8'), 0)[0])
+                        continue
+                    except ValueError:
+                        pass  # unusual escaping; decode the whole chunk below
+                elif payload == b'[DONE]':
+                    self.done = True
+                    self._tail = b''
+                    break
+                elif b'"content"' not in payload or _EMPTY_DELTA.search(payload):
+                    self.skipped += 1
+                    continue
+            text = self._decode_frame(payload)
+            if text:
+                texts.append(text)
+        return texts
+
+    def _decode_frame(self, payload: bytes):
+        """Fully decode a chunk the fast path could not handle, keeping its usage if any."""
+        try:
+            frame = json.loads(payload)
+        except ValueError:
+            self.skipped += 1
+            return None
+        if frame.get('usage'):
+            self.usage = frame['usage']
+        choices = frame.get('choices')
+        if choices:
+            return (choices[0].get('delta') or {}).get('content') or None
+        return None
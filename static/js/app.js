@@ -573,31 +573,44 @@ async function sendMessage() {
     setLoading(true, 'figure');
 
     const article = createStreamingMessage(elements.messages, state.currentFigure.name, state.currentFigure);
+    const subject = state.currentFigure.id;
     const requestBody = {
-        figure_id: state.currentFigure.id,
+        figure_id: subject,
         message,
-        history: requestHistory,
-        model: state.selectedModel
+        model: state.selectedModel,
+        ...sessionFields('figure', subject, requestHistory)
     };
+    let session = null;
+    let suggestions = null;
 
     try {
-        const content = await streamRequest('/api/chat/stream', requestBody, partial => updateStreamingMessage(article, partial));
+        const content = await streamWithSession('/api/chat/stream', requestBody, requestHistory,
+            partial => updateStreamingMessage(article, partial),
+            (type, data) => {
+                if (type === 'session') session = data;
+                else if (type === 'suggestions') suggestions = data.suggestions;
+            });
         if (!content.trim()) throw new Error('Empty streaming response');
         finalizeStreamingMessage(article, content, state.currentFigure);
         state.conversationHistory.push({ role: 'assistant', content });
-        fetchFigureSuggestions(content);
+        rememberSession('figure', subject, session, state.conversationHistory);
+        if (suggestions?.length) renderFigureSuggestions(suggestions);
+        else fetchFigureSuggestions(content);
     } catch (streamError) {
         console.warn('Streaming unavailable, using standard response:', streamError);
         try {
+            // The server already spent the request's time budget, or is shedding load; retrying would only add to it
+            if (streamError.deadlineExceeded || streamError.status === 503) throw streamError;
             const response = await fetch('/api/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(requestBody)
+                body: JSON.stringify({ ...requestBody, history: requestHistory, history_hash: undefined })
             });
             const data = await response.json();
             if (!response.ok) throw new Error(data.error || 'Request failed');
             finalizeStreamingMessage(article, data.response, state.currentFigure);
             state.conversationHistory.push({ role: 'assistant', content: data.response });
+            rememberSession('figure', subject, data.session, state.conversationHistory);
             fetchFigureSuggestions(data.response);
         } catch (error) {
             article.remove();
@@ -622,33 +635,53 @@ async function sendPartyMessage() {
     setLoading(true, 'party');
 
     const article = createStreamingMessage(elements.partyMessages, 'Salon response');
+    const subject = state.selectedGuests.join(',');
     const requestBody = {
         guests: state.selectedGuests,
         message,
-        history: requestHistory,
-        model: state.selectedModel
+        model: state.selectedModel,
+        ...sessionFields('party', subject, requestHistory)
     };
+    const turns = createPartyTurnRenderer(article);
+    let session = null;
+    let suggestions = null;
 
     try {
-        const content = await streamRequest('/api/dinner-party/chat/stream', requestBody, partial => updateStreamingMessage(article, partial));
+        const content = await streamWithSession('/api/dinner-party/chat/stream', requestBody, requestHistory,
+            partial => { if (!turns.started()) updateStreamingMessage(article, partial); },
+            (type, data) => {
+                if (type === 'session') session = data;
+                else if (type === 'suggestions') suggestions = data.suggestions;
+                else turns.handleEvent(type, data);
+            });
         if (!content.trim()) throw new Error('Empty streaming response');
-        article.remove();
-        parseAndDisplayPartyResponses(content);
-        state.partyConversationHistory.push({ role: 'assistant', content });
-        fetchPartySuggestions(content);
+        let transcript = content;
+        if (turns.started()) {
+            transcript = turns.finish();
+        } else {
+            article.remove();
+            parseAndDisplayPartyResponses(content);
+        }
+        state.partyConversationHistory.push({ role: 'assistant', content: transcript });
+        rememberSession('party', subject, session, state.partyConversationHistory);
+        if (suggestions?.length) renderSuggestionPills(suggestions);
+        else fetchPartySuggestions(transcript);
     } catch (streamError) {
         console.warn('Party stream unavailable, using standard response:', streamError);
+        turns.discard();
         try {
+            if (streamError.deadlineExceeded || streamError.status === 503) throw streamError;
             const response = await fetch('/api/dinner-party/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(requestBody)
+                body: JSON.stringify({ ...requestBody, history: requestHistory, history_hash: undefined })
             });
             const data = await response.json();
             if (!response.ok) throw new Error(data.error || 'Request failed');
             article.remove();
             (data.responses || []).forEach(item => addPartyMessage('figure', item.response, item.figure_id));
             state.partyConversationHistory.push({ role: 'assistant', content: data.raw_response });
+            rememberSession('party', subject, data.session, state.partyConversationHistory);
             fetchPartySuggestions(data.raw_response);
         } catch (error) {
             article.remove();
@@ -660,7 +693,115 @@ async function sendPartyMessage() {
     }
 }
 
-async function streamRequest(url, body, onUpdate) {
+/**
+ * Renders guest_start / content / guest_end stream events as one message per guest.
+ * Several guests may be speaking at once (parallel salon mode), so open turns are
+ * tracked per figure. Rebuilds the "[guest_id]: text" transcript so saved history
+ * keeps the salon format.
+ */
+function createPartyTurnRenderer(placeholder) {
+    const turns = [];
+    const open = new Map();
+
+    const startTurn = figureId => {
+        if (placeholder.isConnected) placeholder.remove();
+        const figure = figureId ? findFigure(figureId) : null;
+        const turn = {
+            figureId,
+            figure,
+            text: '',
+            article: createStreamingMessage(elements.partyMessages, figure?.name || 'Salon response', figure)
+        };
+        turns.push(turn);
+        open.set(figureId, turn);
+        return turn;
+    };
+
+    const endTurn = figureId => {
+        const turn = open.get(figureId);
+        if (!turn) return;
+        if (turn.text.trim()) {
+            finalizeStreamingMessage(turn.article, turn.text.trim(), turn.figure);
+        } else {
+            turn.article.remove();
+        }
+        open.delete(figureId);
+    };
+
+    return {
+        started: () => turns.length > 0,
+        handleEvent(type, data) {
+            const figureId = data.figure_id || null;
+            if (type === 'guest_start') {
+                endTurn(figureId);
+                startTurn(figureId);
+            } else if (type === 'guest_end') {
+                endTurn(figureId);
+            } else if (type === 'guest_error') {
+                endTurn(figureId);
+                const name = findFigure(figureId)?.name || 'A guest';
+                addPartyMessage('system', `${name} could not answer: ${data.message}`);
+            } else if (type === 'content' && data.content) {
+                const turn = open.get(figureId) || startTurn(figureId);
+                turn.text += data.content;
+                updateStreamingMessage(turn.article, turn.text);
+            }
+        },
+        finish() {
+            [...open.keys()].forEach(endTurn);
+            return turns
+                .filter(turn => turn.text.trim())
+                .map(turn => (turn.figureId ? `[${turn.figureId}]: ${turn.text.trim()}` : turn.text.trim()))
+                .join('\n\n');
+        },
+        discard() {
+            turns.forEach(turn => turn.article.remove());
+            turns.length = 0;
+            open.clear();
+        }
+    };
+}
+
+/**
+ * Server-side sessions (enabled by SESSION_STORE on the server). Once the server has
+ * confirmed a history, later turns send its session_id and history_hash instead of the
+ * whole history; any local divergence (branch switch, restored session) resends it.
+ */
+const serverSessions = { figure: null, party: null };
+
+function newSessionId() {
+    if (window.crypto?.randomUUID) return window.crypto.randomUUID();
+    return `s${Date.now().toString(36)}${Math.random().toString(36).slice(2, 12)}`;
+}
+
+function sameHistory(a, b) {
+    return a.length === b.length && a.every((msg, i) => msg.role === b[i].role && msg.content === b[i].content);
+}
+
+function sessionFields(kind, subject, history) {
+    const session = serverSessions[kind];
+    if (session && session.subject === subject && sameHistory(session.history, history)) {
+        return { session_id: session.id, history_hash: session.hash };
+    }
+    return { session_id: session?.id || newSessionId(), history };
+}
+
+function rememberSession(kind, subject, info, history) {
+    if (!info?.history_hash) return;
+    serverSessions[kind] = { id: info.session_id, subject, hash: info.history_hash, history: history.slice() };
+}
+
+async function streamWithSession(url, body, history, onUpdate, onEvent = null) {
+    try {
+        return await streamRequest(url, body, onUpdate, onEvent);
+    } catch (error) {
+        if (error.status !== 409 || body.history) throw error;
+        Object.assign(body, { history, history_hash: undefined });
+        return streamRequest(url, body, onUpdate, onEvent);
+    }
+}
+
+async function streamRequest(url, body, onUpdate, onEvent = null) {
     const response = await fetch(url, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
@@ -669,20 +810,30 @@ async function streamRequest(url, body, onUpdate) {
     if (!response.ok || !response.body) {
         let message = `Request failed (${response.status})`;
         try { message = (await response.json()).error || message; } catch (_) { /* no JSON body */ }
-        throw new Error(message);
+        throw Object.assign(new Error(message), { status: response.status });
     }
 
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
     let buffer = '';
     let content = '';
+    let eventType = 'message';
 
     const processLine = line => {
+        if (!line) {
+            eventType = 'message';
+            return;
+        }
+        if (line.startsWith('event:')) {
+            eventType = line.slice(6).trim() || 'message';
+            return;
+        }
         if (!line.startsWith('data:')) return;
         const payload = line.slice(5).trim();
         if (!payload || payload === '[DONE]') return;
         const data = JSON.parse(payload);
-        if (data.error) throw new Error(data.error);
+        if (data.error) throw Object.assign(new Error(data.error), { deadlineExceeded: Boolean(data.deadline_exceeded) });
+        if (onEvent) onEvent(eventType, data);
         if (data.content) {
             content += data.content;
             onUpdate(content);
@@ -770,28 +921,31 @@ async function fetchFigureSuggestions(lastResponse) {
             })
         });
         const data = await response.json();
-        if (!Array.isArray(data.suggestions) || !data.suggestions.length) return;
-        const label = elements.starterQuestions.querySelector('.catalog-label');
-        if (label) label.textContent = 'Generated follow-up prompts';
-        elements.questionButtons.innerHTML = '';
-        data.suggestions.slice(0, 3).forEach(question => {
-            const button = document.createElement('button');
-            button.type = 'button';
-            button.className = 'question-btn';
-            button.textContent = question;
-            button.addEventListener('click', () => {
-                elements.messageInput.value = question;
-                updateSendButtonState();
-                elements.messageInput.focus();
-            });
-            elements.questionButtons.appendChild(button);
-        });
-        elements.starterQuestions.classList.remove('hidden');
+        if (Array.isArray(data.suggestions) && data.suggestions.length) renderFigureSuggestions(data.suggestions);
     } catch (error) {
         console.warn('Figure suggestion request failed:', error);
     }
 }
 
+function renderFigureSuggestions(suggestions) {
+    const label = elements.starterQuestions.querySelector('.catalog-label');
+    if (label) label.textContent = 'Generated follow-up prompts';
+    elements.questionButtons.innerHTML = '';
+    suggestions.slice(0, 3).forEach(question => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'question-btn';
+        button.textContent = question;
+        button.addEventListener('click', () => {
+            elements.messageInput.value = question;
+            updateSendButtonState();
+            elements.messageInput.focus();
+        });
+        elements.questionButtons.appendChild(button);
+    });
+    elements.starterQuestions.classList.remove('hidden');
+}
+
 function setLoading(loading, mode) {
     state.isLoading = loading;
     if (mode === 'party') {
@@ -0,0 +1,152 @@
+"""
+Follow-up suggestions for SeanceAI.
+Suggestions only need the opening of a reply, so they are generated
+speculatively while the reply is still streaming: as soon as its first paragraph
+is complete a small model call starts alongside the main stream, and the result
+rides the same SSE response as a suggestions event. The standalone suggestion
+endpoints remain as a cached fallback and key their cache on the same opening
+paragraph.
+"""
+
+import json
+import re
+import threading
+
+FIGURE_FALLBACK_SUGGESTIONS = [
+    "Tell me more about that.",
+    "What was your perspective on that?",
+    "How did that affect you?"
+]
+PARTY_FALLBACK_SUGGESTIONS = ["What else?", "Do you agree?", "Tell us more!"]
+
+# Suggestions are based on a reply's first paragraph, or on this many characters of it
+SUGGESTION_BASIS_CHARS = 600
+# A paragraph break this early (e.g. right after a speaker marker) does not end the basis
+MIN_PARAGRAPH_CHARS = 40
+
+
+def suggestion_basis(reply: str):
+    """
+    Return (basis, complete): the part of a reply suggestions are generated from, and
+    whether it is final. For a partial reply the basis is complete once the first
+    paragraph has ended, and it then equals the basis of the finished reply.
+    """
+    text = reply.lstrip()
+    end = text.find('\n\n', MIN_PARAGRAPH_CHARS)
+    if end != -1 and end <= SUGGESTION_BASIS_CHARS:
+        return text[:end].rstrip(), True
+    if len(text) >= SUGGESTION_BASIS_CHARS:
+        return text[:SUGGESTION_BASIS_CHARS].rstrip(), True
+    return text.rstrip(), False
+
+
+def figure_suggestion_messages(figure_name: str, history: list, last_response: str) -> list:
+    """Prompt for 2-3 follow-up questions to a single figure."""
+    conversation_context = ""
+    for msg in history[-4:]:
+        role = "User" if msg.get("role") == "user" else figure_name
+        conversation_context += f"{role}: {msg.get('content', '')}\n\n"
+    if last_response:
+        conversation_context += f"{figure_name}: {last_response}\n\n"
+
+    recent_context = conversation_context[-500:]
+    suggestion_prompt = f"""Generate 2-3 short follow-up questions (under 50 chars each) for a conversation with {figure_name}.
+
+Last exchange:
+{recent_context}
+
+Return ONLY the questions, one per line, no numbering."""
+
+    return [
+        {"role": "system", "content": "Generate 2-3 short conversation questions. Return only questions, one per line."},
+        {"role": "user", "content": suggestion_prompt}
+    ]
+
+
+def party_suggestion_messages(guest_names: list, last_response: str) -> list:
+    """Prompt for three short follow-up questions to a salon."""
+    prompt = f"""Generate 3 short follow-up questions (under 40 chars each) for a dinner party with {', '.join(guest_names[:3])}.
+
+Last response: "{last_response[:200]}..."
+
+Return ONLY a JSON array: ["Question 1?", "Question 2?", "Question 3?"]"""
+
+    return [
+        {"role": "system", "content": "You generate short, engaging discussion questions. Return only valid JSON array, no other text."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_figure_suggestions(text: str) -> list:
+    """Up to three questions from a one-per-line reply, with numbering and bullets removed."""
+    suggestions = []
+    for line in text.strip().split('\n'):
+        line = line.strip().lstrip('0123456789.-•* ').strip()
+        if line and len(line) > 10:  # Filter out very short lines
+            suggestions.append(line)
+    return suggestions[:3]
+
+
+def parse_party_suggestions(text: str) -> list:
+    """Three questions from a JSON array reply, or an empty list if it cannot be used."""
+    match = re.search(r'\[.*?\]', text, re.DOTALL)
+    if not match:
+        return []
+    try:
+        suggestions = json.loads(match.group())
+    except ValueError:
+        return []
+    if not isinstance(suggestions, list):
+        return []
+    suggestions = [s.strip()[:40] for s in suggestions[:3] if isinstance(s, str) and s.strip()]
+    return suggestions if len(suggestions) >= 3 else []
+
+
+class SpeculativeSuggestions:
+    """
+    One suggestions request racing a streamed reply.
+
+    feed() takes the reply's text as it streams and starts generate(basis) on a
+    background thread once the first paragraph is complete; result() starts it
+    from the finished reply if that never happened, then waits up to timeout.
+    """
+
+    def __init__(self, generate):
+        self.generate = generate
+        self._text = ''
+        self._thread = None
+        self._result = None
+        self._finished = threading.Event()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def feed(self, text: str):
+        if self._thread is not None:
+            return
+        self._text += text
+        basis, complete = suggestion_basis(self._text)
+        if complete:
+            self._start(basis)
+
+    def result(self, timeout: float):
+        if self._thread is None:
+            basis, _ = suggestion_basis(self._text)
+            if not basis:
+                return None
+            self._start(basis)
+        self._finished.wait(timeout)
+        return self._result
+
+    def _start(self, basis: str):
+        self._thread = threading.Thread(target=self._run, args=(basis,), daemon=True)
+        self._thread.start()
+
+    def _run(self, basis: str):
+        try:
+            self._result = self.generate(basis) or None
+        except Exception:
+            self._result = None
+        finally:
+            self._finished.set()
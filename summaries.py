@@ -0,0 +1,136 @@
+"""
+Rolling conversation summaries for SeanceAI.
+Long figure conversations would otherwise re-send every earlier turn. Once a
+conversation is long enough, everything but the most recent messages is folded
+into a summary generated in the background after a reply completes, and cached
+under the hash of the history prefix it replaces. The next turn sends the system
+prompt, that summary and only the recent messages, so prompt size stays roughly
+flat as the conversation grows.
+"""
+
+import hashlib
+import json
+import threading
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI-generated historical persona. Merge the new messages into the existing summary, if any.
+
+Keep: the topics raised, questions the user asked, positions the persona took, facts or context the user supplied, and any commitments or open threads.
+Drop: greetings, repetition and stylistic flourishes.
+
+Write at most 200 words of plain prose in the third person ("The user asked...", "The persona argued..."). Do not add anything that was not said."""
+
+SUMMARY_CONTEXT_TEMPLATE = """{system_prompt}
+
+EARLIER IN THIS CONVERSATION (summary of messages no longer shown):
+{summary}"""
+
+
+def with_summary(system_prompt: str, summary: str) -> str:
+    """Append a conversation summary to a system prompt, leaving the prompt itself as a stable prefix."""
+    if not summary:
+        return system_prompt
+    return SUMMARY_CONTEXT_TEMPLATE.format(system_prompt=system_prompt, summary=summary)
+
+
+def prefix_hashes(history: list) -> list:
+    """
+    Hash every prefix of a history in one pass: result[n] identifies history[:n].
+    Messages are normalized like response_cache.history_hash (role and trimmed content).
+    """
+    digest = hashlib.sha256()
+    hashes = [digest.hexdigest()]
+    for msg in history:
+        normalized = [msg.get("role", "user"), str(msg.get("content", "")).strip()]
+        digest.update(json.dumps(normalized, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+        hashes.append(digest.hexdigest())
+    return hashes
+
+
+class ConversationSummarizer:
+    """
+    Looks up and refreshes rolling summaries of conversation prefixes.
+
+    store is a get/set cache (a ResponseCache) and summarize(previous_summary,
+    messages) returns the merged summary text, or None on failure. The newest
+    keep_recent messages are always sent verbatim, and nothing is summarized until
+    at least min_prefix older messages exist.
+    """
+
+    def __init__(self, store, summarize, keep_recent: int = 6, min_prefix: int = 4, lookback: int = 4):
+        self.store = store
+        self.summarize = summarize
+        self.keep_recent = keep_recent
+        self.min_prefix = min_prefix
+        self.lookback = lookback
+        self.generated = 0
+        self.failed = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _key(self, subject: str, prefix_hash: str) -> str:
+        return f"summary:{subject}:{prefix_hash}"
+
+    def _best(self, subject: str, hashes: list, limit: int):
+        """Longest summarized prefix no longer than limit, checking the few most recent turn boundaries."""
+        for length in range(limit, max(self.min_prefix, limit - 2 * self.lookback) - 1, -2):
+            summary = self.store.get(self._key(subject, hashes[length]))
+            if summary is not None:
+                return summary, length
+        return None, 0
+
+    def lookup(self, subject: str, history: list):
+        """
+        Return (summary, recent_history) for a turn: the cached summary of the longest
+        known prefix and the messages after it, or (None, history) if there is none yet.
+        """
+        limit = len(history) - self.keep_recent
+        if limit < self.min_prefix:
+            return None, history
+        summary, length = self._best(subject, prefix_hashes(history), limit)
+        return summary, history[length:]
+
+    def refresh(self, subject: str, history: list):
+        """
+        Start summarizing the prefix the next turn will look up, given the history
+        including the exchange that just completed. Builds on the most recent cached
+        summary so only new messages are sent. Returns the worker thread, or None if
+        there is nothing to do.
+        """
+        target = len(history) - self.keep_recent
+        if target < self.min_prefix:
+            return None
+        hashes = prefix_hashes(history)
+        key = self._key(subject, hashes[target])
+        with self._lock:
+            if key in self._in_flight or self.store.get(key) is not None:
+                return None
+            self._in_flight.add(key)
+        previous, length = self._best(subject, hashes, target - 2)
+        worker = threading.Thread(
+            target=self._generate, args=(key, previous, history[length:target]), daemon=True
+        )
+        worker.start()
+        return worker
+
+    def _generate(self, key: str, previous: str, messages: list):
+        try:
+            summary = self.summarize(previous, messages)
+            if summary:
+                self.store.set(key, summary)
+                self.generated += 1
+            else:
+                self.failed += 1
+        except Exception:
+            self.failed += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def stats(self) -> dict:
+        return {
+            "generated": self.generated,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+            "keep_recent": self.keep_recent,
+        }
@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import app as seance
+from admission import AdmissionController, Rejected, RouteClass
+
+
+def controller(worker_limit=10, chat_limit=1, chat_queue=1, queue_timeout=0.2):
+    return AdmissionController(
+        [RouteClass("chat", chat_limit, chat_queue), RouteClass("suggestions", 10, low_priority=True)],
+        worker_limit=worker_limit, queue_timeout=queue_timeout, shed_at=0.5, retry_after=3
+    )
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def test_queued_request_takes_the_next_free_slot(self):
+        admission = controller()
+        held = admission.acquire("chat")
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(admission.acquire("chat")))
+        waiter.start()
+        time.sleep(0.02)
+
+        with self.assertRaises(Rejected) as rejected:
+            admission.acquire("chat")
+        self.assertEqual((rejected.exception.reason, rejected.exception.retry_after), ("queue_full", 3))
+        held.release()
+        held.release()
+        waiter.join()
+        self.assertEqual(len(acquired), 1)
+        self.assertEqual(admission.snapshot()["in_flight"], 1)
+
+    def test_queue_wait_is_bounded(self):
+        admission = controller(queue_timeout=0.02)
+        admission.acquire("chat")
+        started = time.monotonic()
+        with self.assertRaises(Rejected) as rejected:
+            admission.acquire("chat")
+        self.assertEqual(rejected.exception.reason, "queue_timeout")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_suggestions_are_shed_before_chat(self):
+        admission = controller(worker_limit=4, chat_limit=4)
+        admission.acquire("suggestions")
+        admission.acquire("chat")
+        with self.assertRaises(Rejected) as rejected:
+            admission.acquire("suggestions")
+        self.assertEqual(rejected.exception.reason, "shed")
+        admission.acquire("chat")
+        self.assertEqual(admission.snapshot()["classes"]["suggestions"]["rejected"], {"shed": 1})
+
+
+class AdmissionRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        self.admission = controller(chat_queue=0)
+        patcher = mock.patch.object(seance, "admission", self.admission)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stream(self):
+        return self.client.post("/api/chat/stream", json={
+            "figure_id": "ada", "message": "Busy?", "history": [{"role": "user", "content": "Hi"}]
+        })
+
+    def test_full_route_class_answers_503_with_retry_after(self):
+        held = self.admission.acquire("chat")
+        response = self._stream()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "3")
+        self.assertTrue(response.get_json()["overloaded"])
+        self.assertIn('seance_admission_rejected_total{route_class="chat",reason="limit"} 1',
+                      self.client.get("/metrics").get_data(as_text=True))
+        held.release()
+
+    def test_stream_holds_its_slot_until_written(self):
+        def live(messages, model, max_tokens=800, deadline=None):
+            yield {"content": "A reply."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            response = self._stream()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.admission.in_flight, 1)
+            response.get_data()
+            response.close()
+        self.assertEqual(self.admission.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import gzip
 import re
 import unittest
 from pathlib import Path
@@ -8,7 +9,9 @@ from figures import (
     FEATURED_FIGURE_IDS,
     get_all_figures,
     get_dinner_party_prompt,
+    get_figure,
     get_system_prompt,
+    prompt_cache_stats,
 )
 
 
@@ -28,6 +31,16 @@ class CatalogTests(unittest.TestCase):
             self.assertEqual(figure["primary_sources"], [])
             self.assertEqual(figure["secondary_sources"], [])
 
+    def test_changes_to_a_returned_record_do_not_leak(self):
+        figure = get_figure("einstein")
+        figure["name"] = "Someone Else"
+        figure["starter_questions"].append("An extra question?")
+        get_all_figures()[0]["primary_sources"].append("A source")
+
+        self.assertEqual(get_figure("einstein")["name"], "Albert Einstein")
+        self.assertNotIn("An extra question?", get_figure("einstein")["starter_questions"])
+        self.assertEqual(get_all_figures()[0]["primary_sources"], [])
+
     def test_exactly_three_valid_curated_salons(self):
         self.assertEqual(len(CURATED_COMBOS), 3)
         for salon in CURATED_COMBOS.values():
@@ -45,6 +58,20 @@ class CatalogTests(unittest.TestCase):
         self.assertIn("Knowledge boundary", party_prompt)
         self.assertIn("must explicitly say it lies beyond their lifetime", party_prompt)
 
+    def test_salon_prompts_are_compiled_once_per_guest_lineup(self):
+        before = prompt_cache_stats()
+        first = get_dinner_party_prompt(["ada", "tesla", "gandhi"])
+        second = get_dinner_party_prompt(["ada", "tesla", "gandhi"])
+        reordered = get_dinner_party_prompt(["gandhi", "tesla", "ada"])
+        after = prompt_cache_stats()
+
+        self.assertIs(first, second)
+        self.assertNotEqual(first, reordered)
+        self.assertEqual(after["figure_prompts"], 57)
+        self.assertGreaterEqual(after["salon_hits"] - before["salon_hits"], 1)
+        self.assertIs(get_system_prompt("ada"), get_system_prompt("ada"))
+        self.assertIn("44 BCE", get_system_prompt("caesar"))
+
 
 class RouteTests(unittest.TestCase):
     def setUp(self):
@@ -71,6 +98,23 @@ class RouteTests(unittest.TestCase):
         self.assertNotIn("personality", payload)
         self.assertNotIn("beliefs", payload)
 
+    def test_catalog_routes_revalidate_with_etags(self):
+        for path in ["/api/figures", "/api/figures/curie", "/api/models", "/api/dinner-party/combos"]:
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                self.assertTrue(first.headers["ETag"])
+                repeat = self.client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.get_data(), b"")
+
+    def test_catalog_is_served_gzipped_when_accepted(self):
+        plain = self.client.get("/api/figures")
+        zipped = self.client.get("/api/figures", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(zipped.headers["Content-Encoding"], "gzip")
+        self.assertNotEqual(zipped.headers["ETag"], plain.headers["ETag"])
+        self.assertEqual(gzip.decompress(zipped.get_data()), plain.get_data())
+        self.assertEqual(len(plain.get_json()["figures"]), 57)
+
     def test_chat_validation_does_not_call_provider(self):
         self.assertEqual(self.client.post("/api/chat", json={}).status_code, 400)
         self.assertEqual(self.client.post("/api/chat", json={"figure_id": "missing", "message": "Hello"}).status_code, 404)
@@ -0,0 +1,130 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+from hedging import HedgeMetrics, TTFTStats
+from mock_openrouter import create_app
+from model_health import ModelHealth
+
+TIMED_OUT = {"status_code": None, "is_rate_limit": False, "message": "Request timed out"}
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_errors_open_the_circuit_and_probes_close_it(self):
+        breaker = CircuitBreaker("m", window=4, min_calls=4, open_seconds=0.05, probes=2)
+        for failed in (False, True, False, True):
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual([t["to"] for t in breaker.transitions], [OPEN, HALF_OPEN, CLOSED])
+        self.assertEqual(breaker.short_circuited, 2)
+
+    def test_slow_calls_trip_and_a_failed_probe_reopens(self):
+        breaker = CircuitBreaker("m", window=3, min_calls=3, slow_rate=0.6, open_seconds=0.01)
+        for slow in (True, False, True):
+            breaker.record_success(slow=slow)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertIn("slow-call rate", breaker.transitions[-1]["reason"])
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+
+class CircuitRoutingTests(unittest.TestCase):
+    def setUp(self):
+        self.breakers = CircuitBreakers(on_transition=seance._circuit_transition,
+                                        window=2, min_calls=2, open_seconds=60)
+        for name, value in (("OPENROUTER_API_KEY", "test-key"), ("model_health", ModelHealth()),
+                            ("circuit_breakers", self.breakers)):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_open_model_is_skipped_straight_to_the_fallback(self):
+        reply = mock.Mock()
+        reply.json.return_value = {"choices": [{"message": {"content": "Fallback reply."}}]}
+
+        def api_request(messages, model, **kwargs):
+            return (None, TIMED_OUT) if model == "slow/model" else (reply, None)
+
+        request = mock.Mock(side_effect=api_request)
+        with mock.patch.object(seance, "_make_api_request", request), seance.app.test_request_context():
+            for _ in range(3):
+                self.assertEqual(seance.call_llm([], "slow/model"), ("Fallback reply.", False))
+
+        self.assertEqual([call.args[1] for call in request.call_args_list].count("slow/model"), 2)
+        self.assertEqual(self.breakers.state("slow/model"), OPEN)
+        client = seance.app.test_client()
+        health = client.get("/api/health").get_json()["circuit_breakers"]["models"]["slow/model"]
+        self.assertEqual((health["state"], health["short_circuited"]), (OPEN, 1))
+        metrics = client.get("/metrics").get_data(as_text=True)
+        self.assertIn('seance_circuit_breaker_state{model="slow/model",state="open"} 1', metrics)
+        self.assertIn('seance_circuit_transitions_total{model="slow/model",from_state="closed",to_state="open"}',
+                      metrics)
+
+    def test_every_circuit_open_fails_fast(self):
+        for model in ("slow/model", seance.FALLBACK_MODELS[0]):
+            self.breakers.record_failure(model)
+            self.breakers.record_failure(model)
+        with mock.patch.object(seance, "_make_api_request") as request, seance.app.test_request_context():
+            events = list(seance.stream_llm_events([], "slow/model"))
+        request.assert_not_called()
+        self.assertEqual(events, [{"error": seance.CIRCUIT_OPEN_ERROR}])
+
+    def test_suggestion_errors_and_empty_streams_count_as_failures(self):
+        with mock.patch.object(seance.upstream, "post", side_effect=seance.requests.Timeout("read timed out")), \
+                seance.app.test_request_context():
+            for _ in range(2):
+                self.assertEqual(seance.call_llm_suggestions([], "slow/model"), ("", True))
+        self.assertEqual(self.breakers.state("slow/model"), OPEN)
+
+        empty = mock.Mock()
+        empty.iter_content.return_value = iter([b": keep-alive\n\n"])
+        with mock.patch.object(seance, "_make_api_request", return_value=(empty, None)), \
+                seance.app.test_request_context():
+            events = list(seance.stream_llm_events([], "quiet/model", fallback=False))
+        self.assertNotIn("content", events[-1])
+        self.assertEqual(self.breakers.state("quiet/model"), OPEN)
+
+    def test_losing_a_hedge_race_is_not_a_failure(self):
+        fast = {"tokens_per_second": 10000, "ttft_ms": 0, "reply_tokens": 5}
+        mock_app = create_app({"seed": 1, "default": fast, "models": {"slow/model": {"ttft_ms": 500}}})
+        server = make_server("127.0.0.1", 0, mock_app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+        breakers, metrics = CircuitBreakers(window=1, min_calls=1), HedgeMetrics()
+        hedging = {"OPENROUTER_URL": url, "STREAM_HEDGING": True, "HEDGE_DEFAULT_MS": 100, "HEDGE_MIN_MS": 100,
+                   "ttft_stats": TTFTStats(), "hedge_metrics": metrics, "circuit_breakers": breakers}
+
+        with mock.patch.multiple(seance, **hedging), seance.app.test_request_context():
+            events = list(seance._live_stream_events([{"role": "user", "content": "Speak."}], "slow/model",
+                                                     route="api_chat_stream"))
+            time.sleep(0.8)  # let the cancelled primary's reply arrive and its read fail
+
+        self.assertEqual(events[-1]["model"], seance.FALLBACK_MODELS[0])
+        self.assertEqual(metrics.hedge_wins, 1)
+        self.assertEqual(breakers.state("slow/model"), CLOSED)
+        self.assertEqual(seance.model_health.success_rate("slow/model"), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from deadline import Deadline
+from mock_openrouter import create_app
+from model_health import ModelHealth
+
+RATE_LIMITED = {"status_code": 429, "is_rate_limit": True, "message": "Rate limited"}
+
+
+class DeadlineTests(unittest.TestCase):
+    def test_timeouts_and_sleeps_fit_within_the_deadline(self):
+        deadline = Deadline(5)
+        self.assertLessEqual(deadline.timeout(30), 5)
+        self.assertEqual(deadline.timeout(2), 2)
+        self.assertFalse(deadline.sleep(4.5))
+        self.assertTrue(deadline.can_attempt())
+        self.assertFalse(Deadline(0.5).can_attempt())
+        self.assertTrue(Deadline(0).expired())
+
+
+class DeadlineRetryTests(unittest.TestCase):
+    def setUp(self):
+        for name, value in (("OPENROUTER_API_KEY", "test-key"), ("model_health", ModelHealth())):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_backoff_is_skipped_when_no_retry_could_follow_it(self):
+        request = mock.Mock(return_value=(None, RATE_LIMITED))
+        started = time.monotonic()
+        with mock.patch.object(seance, "_make_api_request", request):
+            text, is_error = seance.call_llm([], "anthropic/claude-sonnet-4", deadline=Deadline(3))
+
+        self.assertTrue(is_error)
+        self.assertIn("3s limit after 2 attempts", text)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([call.args[1] for call in request.call_args_list],
+                         ["anthropic/claude-sonnet-4", "openai/gpt-4o-mini"])
+        self.assertTrue(all(call.kwargs["timeout"] <= 3 for call in request.call_args_list))
+
+    def test_stream_reports_an_exhausted_deadline(self):
+        request = mock.Mock(return_value=(None, RATE_LIMITED))
+        with mock.patch.object(seance, "_make_api_request", request):
+            events = list(seance.stream_llm_events([], "openai/gpt-4o-mini", deadline=Deadline(2)))
+
+        self.assertEqual(request.call_count, 1)
+        self.assertTrue(events[0]["deadline_exceeded"])
+        self.assertIn("2s limit after 1 attempt.", events[0]["error"])
+
+    def test_cancelled_racer_makes_no_further_attempts(self):
+        cancelled = threading.Event()
+
+        def rate_limited(*args, **kwargs):
+            cancelled.set()  # the other racer won while this one waited for its reply
+            return None, RATE_LIMITED
+
+        request = mock.Mock(side_effect=rate_limited)
+        with mock.patch.object(seance, "_make_api_request", request), \
+                mock.patch.object(seance.Deadline, "sleep") as sleep:
+            events = list(seance.stream_llm_events([], "openai/gpt-4o-mini", fallback=False, cancelled=cancelled))
+
+        self.assertEqual(events, [])
+        self.assertEqual(request.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_started_stream_may_pause_past_the_deadline(self):
+        slow = {"tokens_per_second": 1 / 1.3, "ttft_ms": 0, "reply_tokens": 2}
+        server = make_server("127.0.0.1", 0, create_app({"seed": 1, "default": slow}), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+
+        with mock.patch.object(seance, "OPENROUTER_URL", url), seance.app.test_request_context():
+            events = list(seance.stream_llm_events([], "slow/model", deadline=Deadline(1.1), fallback=False))
+
+        self.assertEqual(len([event for event in events if "content" in event]), 2)
+        self.assertTrue(events[-1]["done"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import threading
+import unittest
+from unittest import mock
+
+import app as seance
+from hedging import HedgeMetrics, TTFTStats, hedged_events
+
+
+class FakeResponse:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeUpstream:
+    """Per-model streams that wait `delay` seconds for their first token unless closed."""
+
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = failing
+        self.responses = {}
+
+    def stream_events(self, model, on_response, cancelled):
+        response = FakeResponse()
+        self.responses[model] = response
+        on_response(response)
+        if model in self.failing:
+            yield {"error": "Rate limited"}
+            return
+        if response.closed.wait(self.delays[model]):
+            yield {"error": "Connection closed"}
+            return
+        yield {"content": f"Reply from {model}."}
+        yield {"done": True}
+
+
+class TTFTStatsTests(unittest.TestCase):
+    def test_threshold_uses_the_percentile_once_there_are_enough_samples(self):
+        stats = TTFTStats(min_samples=10)
+        self.assertEqual(stats.hedge_after("slow", 95, default=3.0), 3.0)
+        for tenth in range(1, 21):
+            stats.record("slow", tenth / 10)
+        self.assertEqual(stats.percentile("slow", 95), 1.9)
+        self.assertEqual(stats.hedge_after("slow", 50, default=3.0, floor=1.5), 1.5)
+        self.assertEqual(stats.snapshot()["slow"], {"samples": 20, "p50_ms": 1000, "p90_ms": 1800, "p99_ms": 2000})
+
+
+class HedgedEventsTests(unittest.TestCase):
+    def _run(self, upstream, hedge_after=0.05):
+        metrics, stats = HedgeMetrics(), TTFTStats()
+        events = list(hedged_events(
+            "primary", "backup", upstream.stream_events, hedge_after,
+            metrics=metrics, stats=stats, cost=lambda model: 0.25
+        ))
+        return events, metrics.snapshot(), stats
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        upstream = FakeUpstream({"primary": 5, "backup": 0.01})
+        events, metrics, stats = self._run(upstream)
+
+        self.assertEqual(events, [{"content": "Reply from backup."}, {"done": True}])
+        self.assertTrue(upstream.responses["primary"].closed.is_set())
+        self.assertEqual((metrics["hedged"], metrics["hedge_wins"], metrics["cancelled"]), (1, 1, 1))
+        self.assertEqual(metrics["added_cost_usd"], 0.25)
+        self.assertGreaterEqual(stats.snapshot()["primary"]["p50_ms"], 50)
+
+    def test_fast_primary_is_never_hedged(self):
+        upstream = FakeUpstream({"primary": 0, "backup": 0})
+        events, metrics, _ = self._run(upstream, hedge_after=1)
+
+        self.assertEqual(events[0], {"content": "Reply from primary."})
+        self.assertNotIn("backup", upstream.responses)
+        self.assertEqual((metrics["requests"], metrics["hedged"], metrics["hedge_rate"]), (1, 0, 0.0))
+
+    def test_failed_primary_fails_over_at_once(self):
+        upstream = FakeUpstream({"backup": 0}, failing={"primary"})
+        events, metrics, _ = self._run(upstream, hedge_after=5)
+
+        self.assertEqual(events[0], {"content": "Reply from backup."})
+        self.assertEqual((metrics["hedged"], metrics["failovers"], metrics["cancelled"]), (0, 1, 0))
+
+    def test_last_failure_is_relayed_when_no_model_replies(self):
+        upstream = FakeUpstream({}, failing={"primary", "backup"})
+        events, _, _ = self._run(upstream)
+        self.assertEqual(events, [{"error": "Rate limited"}])
+
+
+class HedgeTargetTests(unittest.TestCase):
+    def _live(self, model, fallbacks=("openai/gpt-4o-mini", "other/model")):
+        stream = mock.Mock(return_value=iter([{"done": True}]))
+        hedged = mock.Mock(return_value=iter([{"done": True}]))
+        with mock.patch.multiple(seance, STREAM_HEDGING=True, FALLBACK_MODELS=list(fallbacks),
+                                 stream_llm_events=stream, hedged_events=hedged), seance.app.test_request_context():
+            list(seance._live_stream_events([], model, route="api_chat_stream"))
+        return stream, hedged
+
+    def test_default_model_is_hedged_against_a_different_model(self):
+        _, hedged = self._live(None)
+        self.assertEqual(hedged.call_args.args[:2], (seance.DEFAULT_MODEL, "other/model"))
+        _, hedged = self._live("google/gemini-2.0-flash-exp:free")
+        self.assertEqual(hedged.call_args.args[1], "openai/gpt-4o-mini")
+
+    def test_primary_without_another_fallback_is_not_hedged(self):
+        stream, hedged = self._live(None, fallbacks=[seance.DEFAULT_MODEL])
+        hedged.assert_not_called()
+        stream.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from loadgen import parse_mix, render_table, run_load, summarize
+
+
+def sample(route, ttft=None, error=None, duration=1.0):
+    return {"route": route, "status": 200, "error": error, "ttfb": 0.05, "ttft": ttft,
+            "duration": duration, "tokens": 40, "tokens_per_second": 40.0 if ttft else None}
+
+
+class ReportTests(unittest.TestCase):
+    def test_percentiles_and_error_classes_per_route(self):
+        samples = [sample("/api/chat/stream", ttft=t / 10) for t in range(1, 11)]
+        samples.append(sample("/api/chat/stream", error="http_503"))
+        report = summarize(samples, elapsed=2.0, users=3)
+
+        route = report["routes"]["/api/chat/stream"]
+        self.assertEqual((route["requests"], route["errors"], route["requests_per_second"]), (11, 1, 5.5))
+        self.assertEqual(route["ttft_ms"], {"p50": 500.0, "p95": 1000.0, "p99": 1000.0})
+        self.assertEqual(route["error_classes"], {"http_503": 1})
+        table = render_table(report)
+        self.assertIn("500/1000/1000", table)
+        self.assertIn("/api/chat/stream: http_503 x1", table)
+
+    def test_mix_rejects_unknown_scenarios(self):
+        self.assertEqual(parse_mix("catalog=2,figure-session"), {"catalog": 2.0, "figure-session": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("checkout=1")
+
+
+class RunLoadTests(unittest.TestCase):
+    def test_scenarios_drive_every_route_against_a_live_server(self):
+        def live(messages, model, max_tokens=800, deadline=None):
+            yield {"content": "A measured reply."}
+            yield {"done": True, "usage": {"completion_tokens": 4}}
+
+        server = make_server("127.0.0.1", 0, seance.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        with mock.patch.object(seance, "stream_llm_events", live), \
+                mock.patch.object(seance, "call_llm_suggestions", mock.Mock(return_value=("", True))), \
+                mock.patch.object(seance, "SPECULATIVE_SUGGESTIONS", False):
+            report = run_load(f"http://127.0.0.1:{server.server_port}", users=4, iterations=2, seed=1)
+
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["routes"]["/api/chat/stream"]["requests"], 0)
+        self.assertIsNotNone(report["routes"]["/api/chat/stream"]["ttft_ms"]["p50"])
+        self.assertIn("/api/suggestions", report["routes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
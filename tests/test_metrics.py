@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import app as seance
+from metrics import MetricsRegistry, merge_snapshots, render_text
+
+DEAD_PID = 2 ** 22 + 1  # above the default pid_max, so never a running process
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_histograms_render_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("ttft_seconds", "TTFT.", ("model",), buckets=(0.5, 1))
+        retries = registry.counter("retries_total", "Retries.", ("model",))
+        for value in (0.2, 0.5, 0.7, 3):
+            latency.observe(value, "m")
+        retries.inc("m")
+        retries.inc("m", amount=2)
+
+        text = registry.render()
+        self.assertIn('ttft_seconds_bucket{model="m",le="0.5"} 2', text)
+        self.assertIn('ttft_seconds_bucket{model="m",le="1"} 3', text)
+        self.assertIn('ttft_seconds_bucket{model="m",le="+Inf"} 4', text)
+        self.assertIn('ttft_seconds_sum{model="m"} 4.4', text)
+        self.assertIn('ttft_seconds_count{model="m"} 4', text)
+        self.assertIn('retries_total{model="m"} 3', text)
+        self.assertIn("# TYPE ttft_seconds histogram", text)
+
+    def test_worker_files_are_merged_and_dead_workers_keep_only_totals(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests.").inc()
+        registry.gauge("open_streams", "Open.").inc()
+        registry.histogram("ttft_seconds", "TTFT.", buckets=(1,)).observe(0.5)
+        live = registry.snapshot()
+        dead = {**live, "pid": DEAD_PID}
+
+        text = render_text(merge_snapshots([live, dead]))
+        self.assertIn("requests_total 2", text)
+        self.assertIn("open_streams 1", text)
+        self.assertIn('ttft_seconds_bucket{le="1"} 2', text)
+
+    def test_scrape_flushes_into_the_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = MetricsRegistry(directory)
+            registry.counter("requests_total", "Requests.").inc()
+            self.assertIn("requests_total 1", registry.render())
+            self.assertEqual(os.listdir(directory), [f"worker-{os.getpid()}.json"])
+
+
+class MetricsRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+
+    def test_streams_are_timed_per_route_and_model(self):
+        def live(messages, model, max_tokens=800, deadline=None):
+            yield {"content": "A reply."}
+            yield {"done": True, "model": "metrics/test-model", "usage": {"completion_tokens": 3}}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "Metrics?", "history": [{"role": "user", "content": "Hi"}]
+            }).get_data()
+        text = self.client.get("/metrics").get_data(as_text=True)
+
+        labels = 'route="api_chat_stream",model="metrics/test-model"'
+        self.assertIn(f"seance_stream_ttft_seconds_count{{{labels}}} 1", text)
+        self.assertIn(f"seance_stream_tokens_per_second_count{{{labels}}} 1", text)
+        self.assertIn('seance_sse_open_streams{route="api_chat_stream"} 0', text)
+        self.assertIn('seance_cache_lookups_total{cache="response",result="hit"}', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
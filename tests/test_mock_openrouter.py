@@ -0,0 +1,80 @@
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from mock_openrouter import create_app
+from model_health import ModelHealth
+from sse import UpstreamStreamParser
+
+FAST = {"tokens_per_second": 10000, "ttft_ms": 0, "reply_tokens": 20}
+
+
+def scenario(**models):
+    return {"seed": 3, "default": FAST, "models": models}
+
+
+class MockOpenRouterTests(unittest.TestCase):
+    def _post(self, client, model="mock/a", **body):
+        return client.post("/api/v1/chat/completions", json={
+            "model": model, "messages": [{"role": "user", "content": "Speak."}], **body
+        })
+
+    def test_replies_are_deterministic_for_a_seed(self):
+        first = self._post(create_app(scenario()).test_client()).get_json()
+        second = self._post(create_app(scenario()).test_client()).get_json()
+        self.assertEqual(first["choices"][0]["message"]["content"], second["choices"][0]["message"]["content"])
+        self.assertEqual(first["usage"]["completion_tokens"], 20)
+
+    def test_rate_limit_bursts_carry_retry_after(self):
+        client = create_app(scenario(**{"mock/a": {"rate_limit": {"after": 1, "burst": 2, "retry_after": 4}}})).test_client()
+        responses = [self._post(client) for _ in range(4)]
+        self.assertEqual([r.status_code for r in responses], [200, 429, 429, 200])
+        self.assertEqual(responses[1].headers["Retry-After"], "4")
+        stats = client.get("/mock/stats").get_json()["models"]["mock/a"]
+        self.assertEqual((stats["requests"], stats["rate_limited"]), (4, 2))
+
+    def test_malformed_chunks_are_skipped_by_the_stream_parser(self):
+        client = create_app(scenario(**{"mock/a": {"malformed_rate": 1.0}})).test_client()
+        parser = UpstreamStreamParser()
+        text = "".join(parser.feed(self._post(client, stream=True).get_data()))
+        self.assertTrue(parser.done)
+        self.assertEqual(len(text.split()), 20)
+        self.assertGreaterEqual(parser.skipped, 20)
+
+
+class MockUpstreamIntegrationTests(unittest.TestCase):
+    """The app's retry and fallback chain against a live mock server."""
+
+    def _serve(self, mock_scenario):
+        server = make_server("127.0.0.1", 0, create_app(mock_scenario), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+        for name, value in (("OPENROUTER_URL", url), ("OPENROUTER_API_KEY", "mock"), ("RETRY_DELAYS", [0]),
+                            ("model_health", ModelHealth())):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_rate_limited_primary_falls_back(self):
+        self._serve(scenario(**{"mock/primary": {"rate_limit": {"after": 0, "burst": 1}}}))
+        with seance.app.test_request_context():
+            events = list(seance.stream_llm_events([{"role": "user", "content": "Speak."}], "mock/primary"))
+        self.assertEqual(events[-1]["model"], seance.FALLBACK_MODELS[0])
+        self.assertEqual(len("".join(e.get("content", "") for e in events).split()), 20)
+
+    def test_mid_stream_disconnect_surfaces_an_error(self):
+        self._serve(scenario(**{"mock/primary": {"disconnect_rate": 1.0}}))
+        with seance.app.test_request_context():
+            events = list(seance.stream_llm_events(
+                [{"role": "user", "content": "Speak."}], "mock/primary", fallback=False
+            ))
+        self.assertTrue(events[0].get("content"))
+        self.assertNotIn("done", events[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
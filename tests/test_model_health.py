@@ -0,0 +1,93 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from email.utils import formatdate
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from mock_openrouter import create_app
+from model_health import ModelHealth, parse_retry_after
+
+
+class ModelHealthTests(unittest.TestCase):
+    def test_retry_after_accepts_seconds_and_http_dates(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_cooldowns_back_off_without_retry_after(self):
+        health = ModelHealth(default_cooldown=10, max_cooldown=25)
+        self.assertEqual([health.record_rate_limit("m") for _ in range(3)], [10, 20, 25])
+        health.record_success("m", latency=0.4)
+        self.assertEqual(health.cooldown_remaining("m"), 0)
+        self.assertEqual(health.record_rate_limit("m"), 10)
+
+    def test_workers_share_cooldowns_through_the_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "health.sqlite3")
+            first, second = ModelHealth(path, refresh_interval=0), ModelHealth(path, refresh_interval=0)
+
+            first.record_rate_limit("busy/model", retry_after=30)
+            self.assertAlmostEqual(second.cooldown_remaining("busy/model"), 30, delta=2)
+            self.assertEqual(second.order(["busy/model", "calm/model"]), ["calm/model", "busy/model"])
+
+            second.record_success("busy/model", latency=0.5)
+            self.assertEqual(first.cooldown_remaining("busy/model"), 0)
+            self.assertEqual(first.snapshot()["models"]["busy/model"]["samples"], 2)
+
+    def test_only_cooldown_changes_are_written_through(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "health.sqlite3")
+            worker = ModelHealth(path, refresh_interval=0, flush_interval=60)
+            other = ModelHealth(path, refresh_interval=0)
+            with mock.patch.object(worker, "_write_through", wraps=worker._write_through) as write_through:
+                worker.record_success("calm/model", latency=0.2)
+                worker.record_failure("calm/model")
+                worker.record_rate_limit("calm/model", retry_after=30)
+                worker.record_rate_limit("calm/model", retry_after=30)
+                worker.record_success("calm/model", latency=0.2)
+            self.assertEqual(write_through.call_count, 3)
+            self.assertEqual(other.snapshot()["models"]["calm/model"]["samples"], 5)
+
+            worker.record_failure("calm/model")
+            self.assertEqual(other.snapshot()["models"]["calm/model"]["samples"], 5)
+            worker.flush()
+            self.assertEqual(other.snapshot()["models"]["calm/model"]["samples"], 6)
+
+
+class CooldownRoutingTests(unittest.TestCase):
+    def setUp(self):
+        fast = {"tokens_per_second": 10000, "ttft_ms": 0, "reply_tokens": 5}
+        self.mock_app = create_app({"seed": 1, "default": fast, "models": {
+            "busy/model": {"rate_limit": {"after": 0, "burst": 1, "retry_after": 30}}
+        }})
+        server = make_server("127.0.0.1", 0, self.mock_app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+        for name, value in (("OPENROUTER_URL", url), ("OPENROUTER_API_KEY", "mock"), ("model_health", ModelHealth())):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cooling_model_is_skipped_until_its_retry_after(self):
+        messages = [{"role": "user", "content": "Speak."}]
+        with seance.app.test_request_context():
+            for _ in range(3):
+                text, is_error = seance.call_llm(messages, "busy/model")
+                self.assertFalse(is_error)
+            self.assertEqual(seance.call_llm_suggestions(messages, "busy/model"), ("", True))
+
+        stats = self.mock_app.config["MOCK_UPSTREAM"].stats
+        self.assertEqual(stats["busy/model"]["requests"], 1)
+        self.assertEqual(stats[seance.FALLBACK_MODELS[0]]["completed"], 3)
+        self.assertEqual(seance.model_health.snapshot()["skipped_cooling_models"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from unittest import mock
+
+import app as seance
+import pregenerate
+from figures import CURATED_COMBOS, get_dinner_party_prompt
+from openings import OpeningStore, plan_openings
+from response_cache import ResponseCache
+
+
+class PregenerationTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _run(self, *args, reply=("[caesar]: Order first.", False)):
+        calls = mock.Mock(return_value=reply)
+        with mock.patch.object(pregenerate, "call_llm", calls), contextlib.redirect_stdout(io.StringIO()):
+            exit_code = pregenerate.main(["--out", self.directory.name, "--kind", "salon", *args])
+        return exit_code, calls
+
+    def test_plan_covers_every_salon_and_figure_starter(self):
+        entries = plan_openings()
+        salon_entries = [entry for entry in entries if entry["kind"] == "dinner-party"]
+        self.assertEqual(len(salon_entries), sum(len(c["starter_questions"]) for c in CURATED_COMBOS.values()))
+        self.assertEqual(len({entry["subject"] for entry in entries if entry["kind"] == "chat"}), 57)
+
+    def test_job_is_resumable_and_skips_unchanged_prompts(self):
+        exit_code, first = self._run()
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(first.call_count, 9)
+
+        _, second = self._run()
+        self.assertEqual(second.call_count, 0)
+
+    def test_failed_entries_are_reported_and_not_stored(self):
+        exit_code, _ = self._run(reply=("The model provider timed out. Please try again in a moment.", True))
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(OpeningStore(self.directory.name).load(), 0)
+
+    def test_stream_route_serves_a_curated_opening_from_the_store(self):
+        self._run()
+        store = OpeningStore(self.directory.name)
+        self.assertEqual(store.load(), 9)
+
+        combo = CURATED_COMBOS["right-to-rule"]
+        messages = [
+            {"role": "system", "content": get_dinner_party_prompt(combo["guests"])},
+            {"role": "user", "content": combo["starter_questions"][0]},
+        ]
+        self.assertEqual(store.lookup(seance.DEFAULT_MODEL, messages), "[caesar]: Order first.")
+        self.assertIsNone(store.lookup("openai/gpt-4o", messages))
+
+        live = mock.Mock(side_effect=AssertionError("provider should not be called"))
+        client = seance.app.test_client()
+        with mock.patch.object(seance, "opening_store", store), mock.patch.object(seance, "stream_llm_events", live):
+            response = client.post("/api/dinner-party/chat/stream", json={
+                "guests": combo["guests"], "message": combo["starter_questions"][0], "history": []
+            })
+        self.assertEqual(response.headers["X-Cache"], "PREGENERATED")
+        self.assertIn("Order first.", response.get_data(as_text=True))
+
+        live = mock.Mock(side_effect=lambda messages, model, max_tokens=800, deadline=None: iter([
+            {"content": "One guest at a time."}, {"done": True}
+        ]))
+        with mock.patch.object(seance, "opening_store", store), mock.patch.object(seance, "stream_llm_events", live), \
+                mock.patch.object(seance, "response_cache", ResponseCache()):
+            response = client.post("/api/dinner-party/chat/stream", json={
+                "guests": combo["guests"], "message": combo["starter_questions"][0], "history": [],
+                "mode": "sequential"
+            })
+            text = response.get_data(as_text=True)
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(live.call_count, len(combo["guests"]))
+        self.assertNotIn("Order first.", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import app as seance
+from response_cache import ResponseCache, make_cache_key
+
+
+def _stream_contents(response):
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.get_data(as_text=True).splitlines()
+        if line.startswith("data: ")
+    ]
+    return "".join(event.get("content", "") for event in events), events
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_keys_normalize_message_whitespace_and_case(self):
+        key = make_cache_key("dinner-party", ["ada", "tesla"], "openai/gpt-4o-mini", [], "Who decides?")
+        self.assertEqual(key, make_cache_key("dinner-party", ("ada", "tesla"), "openai/gpt-4o-mini", [], "  who   DECIDES? "))
+        self.assertNotEqual(key, make_cache_key("dinner-party", ["tesla", "ada"], "openai/gpt-4o-mini", [], "Who decides?"))
+        self.assertNotEqual(key, make_cache_key("dinner-party", ["ada", "tesla"], "openai/gpt-4o", [], "Who decides?"))
+
+    def test_memory_tier_evicts_least_recently_used_and_expires(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.set("a", "first")
+        cache.set("b", "second")
+        cache.get("a")
+        cache.set("c", "third")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "first")
+
+        expiring = ResponseCache(max_entries=2, ttl=0.01)
+        expiring.set("a", "first")
+        time.sleep(0.02)
+        self.assertIsNone(expiring.get("a"))
+
+    def test_sqlite_tier_is_shared_between_cache_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "responses.sqlite3")
+            writer = ResponseCache(db_path=db_path)
+            reader = ResponseCache(db_path=db_path)
+            writer.set("key", "cached reply")
+            self.assertEqual(reader.get("key"), "cached reply")
+            self.assertEqual(reader.stats()["disk_hits"], 1)
+
+
+class CachedRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        self.cache = ResponseCache()
+        patcher = mock.patch.object(seance, "response_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_salon_opening_is_replayed_from_cache(self):
+        live = mock.Mock(side_effect=lambda messages, model, max_tokens=800, deadline=None: iter([
+            {"content": "[ada]: Capability "}, {"content": "is not progress."}, {"done": True}
+        ]))
+        body = {"guests": ["ada", "tesla", "gandhi"], "message": "Does greater capability amount to progress?", "history": []}
+        with mock.patch.object(seance, "stream_llm_events", live):
+            first = self.client.post("/api/dinner-party/chat/stream", json=body)
+            first_text, _ = _stream_contents(first)
+            second = self.client.post("/api/dinner-party/chat/stream", json=body)
+            second_text, second_events = _stream_contents(second)
+
+        self.assertEqual(live.call_count, 1)
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second_text, first_text)
+        self.assertEqual(second_events[-1], {"done": True})
+
+    def test_salon_modes_do_not_share_cached_replies(self):
+        live = mock.Mock(side_effect=lambda messages, model, max_tokens=800, deadline=None: iter([
+            {"content": "[ada]: One reply for all."}, {"done": True}
+        ]))
+        body = {"guests": ["ada", "tesla"], "message": "Which mode answered?", "history": []}
+        with mock.patch.object(seance, "stream_llm_events", live):
+            single = self.client.post("/api/dinner-party/chat/stream", json=body)
+            single.get_data()
+            parallel = self.client.post("/api/dinner-party/chat/stream", json={**body, "mode": "parallel"})
+            parallel.get_data()
+
+        self.assertEqual(single.headers["X-Cache"], "MISS")
+        self.assertEqual(parallel.headers["X-Cache"], "MISS")
+        self.assertEqual(live.call_count, 3)
+
+    def test_later_turns_and_failed_streams_are_not_cached(self):
+        failing = mock.Mock(side_effect=lambda messages, model, max_tokens=800, deadline=None: iter([{"error": "Connection disrupted. Please try again."}]))
+        with mock.patch.object(seance, "stream_llm_events", failing):
+            self.client.post("/api/chat/stream", json={"figure_id": "ada", "message": "Hello"})
+            later = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "Hello",
+                "history": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Good day."}]
+            })
+        self.assertEqual(self.cache.stats()["stores"], 0)
+        self.assertNotIn("X-Cache", later.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import unittest
+from unittest import mock
+
+import app as seance
+from circuit_breaker import CircuitBreakers
+from hedging import TTFTStats
+from model_health import ModelHealth
+from router import ModelRouter
+
+MODELS = [
+    {"id": "free/slow", "tier": "swift", "prompt_price": 0.0, "completion_price": 0.0},
+    {"id": "free/quick", "tier": "swift", "prompt_price": 0.0, "completion_price": 0.0},
+    {"id": "paid/quick", "tier": "balanced", "prompt_price": 0.15, "completion_price": 0.60},
+    {"id": "paid/steady", "tier": "balanced", "prompt_price": 0.27, "completion_price": 1.10},
+]
+
+
+class ModelRouterTests(unittest.TestCase):
+    def setUp(self):
+        self.ttft = TTFTStats(min_samples=1)
+        for model, seconds in (("free/slow", 4.0), ("free/quick", 0.8), ("paid/quick", 0.4), ("paid/steady", 0.6)):
+            self.ttft.record(model, seconds)
+        self.health = ModelHealth()
+        self.router = ModelRouter(MODELS, self.ttft, self.health, CircuitBreakers(), p95_target=2.0, explore_rate=0)
+
+    def test_only_tiers_and_auto_are_routed(self):
+        self.assertIsNone(self.router.route("paid/quick"))
+        self.assertIsNone(self.router.route(None))
+        self.assertIsNone(self.router.route("auto:slowest"))
+        self.assertEqual(self.router.parse("swift"), ("swift", "fastest"))
+        self.assertEqual(self.router.parse("auto"), ("auto", "cheapest"))
+
+    def test_fastest_healthy_in_tier(self):
+        decision = self.router.route("balanced")
+        self.assertEqual(decision.model, "paid/quick")
+        self.health.record_rate_limit("paid/quick", retry_after=30)
+        decision = self.router.route("balanced")
+        self.assertEqual(decision.model, "paid/steady")
+        excluded = {c["model"]: c["excluded"] for c in decision.candidates}
+        self.assertEqual(excluded["paid/quick"], "cooling down after 429")
+
+    def test_cheapest_meeting_the_p95_target(self):
+        decision = self.router.route("auto")
+        self.assertEqual(decision.model, "free/quick")
+        self.assertIn("p95 TTFT 800ms within 2000ms", decision.reason)
+        self.assertEqual(self.router.route("swift:cheapest").model, "free/quick")
+        self.ttft.record("free/quick", 3.0)
+        self.assertEqual(self.router.route("auto").model, "paid/quick")
+        self.assertIn("no healthy model within", self.router.route("swift:cheapest").reason)
+
+    def test_exploration_stays_within_the_policy(self):
+        models = MODELS + [{"id": "pricey/quick", "tier": "advanced", "prompt_price": 15.0, "completion_price": 75.0}]
+        self.ttft.record("pricey/quick", 0.3)
+        router = ModelRouter(models, self.ttft, self.health, CircuitBreakers(), p95_target=2.0, explore_rate=1)
+        for _ in range(20):
+            decision = router.route("auto:cheapest")
+            self.assertEqual(decision.model, "free/quick")  # the only other free model misses the target
+        router.p95_target = 5.0
+        self.assertEqual({router.route("auto:cheapest").model for _ in range(20)}, {"free/slow"})
+        router.p95_target = 2.0
+        decision = router.route("balanced:fastest")
+        self.assertEqual(decision.model, "paid/steady")
+        self.assertTrue(decision.reason.startswith("exploration: paid/steady instead of fastest pick paid/quick"))
+
+
+class RoutedRequestTests(unittest.TestCase):
+    def test_routed_stream_names_its_model_in_a_debug_header(self):
+        models = []
+
+        def live(messages, model, max_tokens=800, deadline=None):
+            models.append(model)
+            yield {"content": "Routed reply."}
+            yield {"done": True, "model": model}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            response = seance.app.test_client().post("/api/chat/stream", headers={"X-Route-Debug": "1"}, json={
+                "figure_id": "ada", "message": "Which model?", "model": "balanced:fastest",
+                "history": [{"role": "user", "content": "Hi"}]
+            })
+            response.get_data()
+
+        chosen = response.headers["X-Model-Route"].split(";")[0]
+        self.assertEqual(seance.MODEL_TABLE[chosen]["tier"], "balanced")
+        self.assertIn("requested=balanced:fastest; policy=fastest", response.headers["X-Model-Route"])
+        candidates = json.loads(response.headers["X-Model-Route-Candidates"])
+        self.assertEqual({c["model"] for c in candidates},
+                         {m["id"] for m in seance.AVAILABLE_MODELS if m["tier"] == "balanced"})
+        self.assertIn(models, ([], [chosen]))
+
+    def test_rejected_requests_are_not_routed(self):
+        router = ModelRouter(seance.AVAILABLE_MODELS, TTFTStats(), ModelHealth(), CircuitBreakers(), explore_rate=0)
+        with mock.patch.object(seance, "model_router", router):
+            response = seance.app.test_client().post("/api/chat", json={"figure_id": "nobody", "message": "Hello?",
+                                                                        "model": "swift"})
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("X-Model-Route", response.headers)
+        self.assertEqual(router.decisions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+import app as seance
+from response_cache import ResponseCache
+from salon_modes import fan_out_events, turn_taking_events
+
+GUESTS = ["ada", "tesla", "gandhi"]
+
+
+def _guest_of(messages):
+    return messages[-1]["content"].rsplit("(", 1)[1].split(")")[0]
+
+
+def _slow_guest_stream(delay=0.15):
+    def stream(messages):
+        guest_id = _guest_of(messages)
+        time.sleep(delay)
+        yield {"content": f"{guest_id} speaks."}
+        yield {"done": True}
+    return stream
+
+
+def _messages_for(guest_id):
+    return [{"role": "user", "content": f"Question\n\n[Salon turn: reply now only as X ({guest_id}).]"}]
+
+
+class FanOutTests(unittest.TestCase):
+    def test_guests_stream_concurrently_and_are_tagged(self):
+        started = time.monotonic()
+        events = list(fan_out_events(GUESTS, _messages_for, _slow_guest_stream()))
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.15 * len(GUESTS))
+        contents = {e["figure_id"]: e["content"] for e in events if e.get("event") == "content"}
+        self.assertEqual(contents, {guest_id: f"{guest_id} speaks." for guest_id in GUESTS})
+        self.assertEqual(sum(1 for e in events if e.get("event") == "guest_end"), 3)
+        self.assertTrue(events[-1]["done"])
+
+    def test_failed_guest_is_reported_without_aborting_the_turn(self):
+        def stream(messages):
+            if _guest_of(messages) == "tesla":
+                yield {"error": "The model provider timed out. Please try again."}
+                return
+            yield {"content": "Still here."}
+
+        events = list(fan_out_events(GUESTS, _messages_for, stream))
+        self.assertIn({"event": "guest_error", "figure_id": "tesla",
+                       "message": "The model provider timed out. Please try again."}, events)
+        self.assertTrue(events[-1]["done"])
+
+    def test_turn_fails_when_no_guest_produces_text(self):
+        events = list(fan_out_events(GUESTS, _messages_for, lambda messages: iter([{"error": "Connection disrupted."}])))
+        self.assertEqual({e["figure_id"] for e in events[:-1] if e["event"] == "guest_error"}, set(GUESTS))
+        self.assertEqual(events[-1], {"error": "Connection disrupted."})
+
+
+class TurnTakingTests(unittest.TestCase):
+    def test_each_guest_is_dispatched_after_the_previous_one_with_its_text(self):
+        seen = []
+
+        def build(guest_id, prior_turns):
+            seen.append((guest_id, prior_turns))
+            return _messages_for(guest_id)
+
+        events = list(turn_taking_events(GUESTS, build, _slow_guest_stream(0)))
+        self.assertEqual(seen, [
+            ("ada", []),
+            ("tesla", [("ada", "ada speaks.")]),
+            ("gandhi", [("ada", "ada speaks."), ("tesla", "tesla speaks.")]),
+        ])
+        self.assertEqual(
+            [(e["event"], e["figure_id"]) for e in events[:-1] if e["event"] != "content"],
+            [("guest_start", "ada"), ("guest_end", "ada"), ("guest_start", "tesla"),
+             ("guest_end", "tesla"), ("guest_start", "gandhi"), ("guest_end", "gandhi")],
+        )
+        ends = [e for e in events if e.get("event") == "guest_end"]
+        self.assertEqual(ends, sorted(ends, key=lambda e: e["dispatched_ms"]))
+        self.assertTrue(events[-1]["done"])
+
+    def test_failed_guest_is_skipped_and_later_guests_still_speak(self):
+        def stream(messages):
+            if _guest_of(messages) == "ada":
+                return iter([{"error": "Connection disrupted."}])
+            return iter([{"content": "Go on."}, {"done": True}])
+
+        events = list(turn_taking_events(GUESTS, lambda guest_id, prior: _messages_for(guest_id), stream))
+        self.assertEqual(events[0], {"event": "guest_error", "figure_id": "ada", "message": "Connection disrupted."})
+        self.assertEqual([e["figure_id"] for e in events if e.get("event") == "guest_start"], ["tesla", "gandhi"])
+
+
+class SalonModeRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        patcher = mock.patch.object(seance, "response_cache", ResponseCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parallel_mode_sends_one_budgeted_request_per_guest(self):
+        calls = []
+
+        def live(messages, model, max_tokens=800, deadline=None):
+            calls.append((messages, max_tokens))
+            yield {"content": "A reply."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            response = self.client.post("/api/dinner-party/chat/stream", json={
+                "guests": GUESTS, "message": "Who decides?", "mode": "parallel"
+            })
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual({max_tokens for _, max_tokens in calls}, {seance.SALON_GUEST_MAX_TOKENS})
+        self.assertEqual(len({messages[0]["content"] for messages, _ in calls}), 1)
+        lines = body.splitlines()
+        starts = [json.loads(lines[i + 1][6:])["figure_id"] for i, line in enumerate(lines) if line == "event: guest_start"]
+        self.assertEqual(sorted(starts), sorted(GUESTS))
+
+    def test_sequential_mode_carries_earlier_guests_into_later_requests(self):
+        calls = []
+
+        def live(messages, model, max_tokens=800, deadline=None):
+            calls.append(messages)
+            yield {"content": f"Reply {len(calls)}."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            response = self.client.post("/api/dinner-party/chat/stream", json={
+                "guests": GUESTS, "message": "Who decides?", "mode": "sequential"
+            })
+            response.get_data()
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[2][-2], {"role": "assistant", "content": "[ada]: Reply 1.\n\n[tesla]: Reply 2."})
+        self.assertIn("(gandhi)", calls[2][-1]["content"])
+        self.assertEqual(calls[1][:2], calls[2][:2])
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.post("/api/dinner-party/chat/stream", json={
+            "guests": GUESTS, "message": "Who decides?", "mode": "chorus"
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_string_mode_is_rejected(self):
+        for mode in (["parallel"], {"mode": "parallel"}, 3):
+            with self.subTest(mode=mode):
+                response = self.client.post("/api/dinner-party/chat/stream", json={
+                    "guests": GUESTS, "message": "Who decides?", "mode": mode
+                })
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+from app import parse_dinner_party_response
+from salon_parser import GuestStreamParser, parse_guest_stream, parse_salon_response
+
+GUESTS = ["ada", "tesla", "gandhi"]
+REPLY = (
+    "[ada]: Capability is not, by itself, progress.\n"
+    "The Engine originates nothing.\n\n"
+    "[TESLA]: I must disagree [ada]: power shapes the age.\n\n"
+    "  [gandhi]:\nMachinery must serve the village."
+)
+
+
+def _collect(chunks, guest_ids=GUESTS):
+    parser = GuestStreamParser(guest_ids)
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    return events
+
+
+def _by_guest(events):
+    turns = []
+    for event in events:
+        if event["event"] == "guest_start":
+            turns.append([event["figure_id"], ""])
+        elif event["event"] == "content":
+            turns[-1][1] += event["content"]
+    return [(figure_id, text.strip()) for figure_id, text in turns]
+
+
+class GuestStreamParserTests(unittest.TestCase):
+    def test_markers_split_reply_into_guest_turns(self):
+        events = _collect([REPLY])
+        self.assertEqual(_by_guest(events), [
+            ("ada", "Capability is not, by itself, progress.\nThe Engine originates nothing."),
+            ("tesla", "I must disagree [ada]: power shapes the age."),
+            ("gandhi", "Machinery must serve the village."),
+        ])
+        self.assertEqual(
+            [(e["event"], e["figure_id"]) for e in events if e["event"] != "content"],
+            [("guest_start", "ada"), ("guest_end", "ada"), ("guest_start", "tesla"),
+             ("guest_end", "tesla"), ("guest_start", "gandhi"), ("guest_end", "gandhi")],
+        )
+
+    def test_result_is_independent_of_chunk_boundaries(self):
+        expected = _by_guest(_collect([REPLY]))
+        for size in (1, 2, 3, 5, 8):
+            with self.subTest(size=size):
+                chunks = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+                self.assertEqual(_by_guest(_collect(chunks)), expected)
+        for split in range(len(REPLY)):
+            self.assertEqual(_by_guest(_collect([REPLY[:split], REPLY[split:]])), expected)
+
+    def test_text_is_emitted_before_the_turn_completes(self):
+        parser = GuestStreamParser(GUESTS)
+        self.assertEqual(parser.feed("[ada"), [])
+        events = parser.feed("]: The Engine")
+        self.assertEqual(events[0], {"event": "guest_start", "figure_id": "ada"})
+        self.assertEqual(events[1], {"event": "content", "content": "The Engine", "figure_id": "ada"})
+        self.assertEqual(parser.feed(" weaves"), [{"event": "content", "content": " weaves", "figure_id": "ada"}])
+
+    def test_preamble_and_unknown_markers_stay_unattributed(self):
+        events = _collect(["Host, a note.\n[napoleon]: not invited\n"])
+        self.assertEqual({e["figure_id"] for e in events}, {None})
+        self.assertEqual("".join(e["content"] for e in events), "Host, a note.\n[napoleon]: not invited\n")
+
+    def test_stream_wrapper_flushes_before_done(self):
+        events = list(parse_guest_stream(iter([{"content": "[ada]: Yes"}, {"done": True}]), GUESTS))
+        self.assertEqual(events[-2], {"event": "guest_end", "figure_id": "ada"})
+        self.assertEqual(events[-1], {"done": True})
+
+
+class ParseSalonResponseTests(unittest.TestCase):
+    def test_recognises_id_name_and_bold_marker_spellings(self):
+        reply = (
+            "Opening remarks are dropped.\n"
+            "[ada]: First.\n"
+            "TESLA: Second,\ncontinued.\n"
+            "**Mahatma Gandhi:** Third.\n"
+            "  **Ada**: Fourth.\n"
+            "Nikola Tesla: Fifth."
+        )
+        self.assertEqual(parse_salon_response(reply, GUESTS), [
+            {"figure_id": "ada", "response": "First."},
+            {"figure_id": "tesla", "response": "Second,\ncontinued."},
+            {"figure_id": "gandhi", "response": "Third."},
+            {"figure_id": "ada", "response": "Fourth."},
+            {"figure_id": "tesla", "response": "Fifth."},
+        ])
+
+    def test_marker_requires_a_colon_at_line_start(self):
+        reply = "[ada]: Tesla argued otherwise.\nTesla's view was narrower."
+        self.assertEqual(parse_salon_response(reply, GUESTS), [
+            {"figure_id": "ada", "response": "Tesla argued otherwise.\nTesla's view was narrower."},
+        ])
+
+    def test_unmarked_reply_is_attributed_to_first_guest(self):
+        self.assertEqual(parse_dinner_party_response("  No markers here. ", GUESTS), [
+            {"figure_id": "ada", "response": "No markers here."},
+        ])
+        self.assertEqual(parse_dinner_party_response("", GUESTS), [])
+
+    def test_streaming_and_batch_parsers_agree(self):
+        self.assertEqual(
+            _by_guest(_collect([REPLY[i:i + 7] for i in range(0, len(REPLY), 7)])),
+            [(item["figure_id"], item["response"]) for item in parse_salon_response(REPLY, GUESTS)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import app as seance
+from response_cache import ResponseCache, history_hash
+from sessions import MemorySessionStore, SessionStore, SQLiteSessionStore, open_session_store
+
+SESSION_ID = "test-session-0001"
+HISTORY = [{"role": "user", "content": "Hello."}, {"role": "assistant", "content": "Greetings."}]
+
+
+class SessionStoreTests(unittest.TestCase):
+    def _check_compare_and_swap(self, store):
+        digest = store.save(SESSION_ID, HISTORY, subject="figure:ada")
+        self.assertEqual(store.load(SESSION_ID), (HISTORY, digest, "figure:ada"))
+
+        longer = HISTORY + [{"role": "user", "content": "Again."}]
+        self.assertIsNone(store.save(SESSION_ID, longer, expected_hash=digest, subject="figure:tesla"))
+        new_digest = store.save(SESSION_ID, longer, expected_hash=digest, subject="figure:ada")
+        self.assertEqual(new_digest, history_hash(longer))
+        self.assertIsNone(store.save(SESSION_ID, HISTORY, expected_hash=digest, subject="figure:ada"))
+        self.assertIsNone(store.save("unknown-session", HISTORY, expected_hash=digest, subject="figure:ada"))
+        self.assertEqual(store.load(SESSION_ID), (longer, new_digest, "figure:ada"))
+
+    def test_memory_store(self):
+        self._check_compare_and_swap(MemorySessionStore())
+
+    def test_sqlite_store_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sessions.sqlite3")
+            self._check_compare_and_swap(open_session_store(f"sqlite://{path}"))
+            self.assertEqual(SQLiteSessionStore(path).load(SESSION_ID)[0][-1]["content"], "Again.")
+
+    def test_backends_must_implement_load_and_save(self):
+        class LoadOnly(SessionStore):
+            def load(self, session_id):
+                return None
+
+        with self.assertRaises(TypeError):
+            LoadOnly()
+
+    def test_empty_setting_disables_sessions(self):
+        self.assertIsNone(open_session_store(""))
+        self.assertIsInstance(open_session_store("memory"), MemorySessionStore)
+
+
+class SessionRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        for name, value in (("session_store", MemorySessionStore()), ("response_cache", ResponseCache())):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.sent = []
+
+    def _live(self, messages, model, max_tokens=800, deadline=None):
+        self.sent.append(messages)
+        yield {"content": "A reply."}
+        yield {"done": True}
+
+    def _stream(self, **body):
+        with mock.patch.object(seance, "stream_llm_events", self._live):
+            response = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "Next?", "session_id": SESSION_ID, **body
+            })
+            text = response.get_data(as_text=True)
+        lines = text.splitlines()
+        sessions = [json.loads(lines[i + 1][6:]) for i, line in enumerate(lines) if line == "event: session"]
+        return response, sessions
+
+    def test_client_sends_only_the_new_message_once_seeded(self):
+        _, sessions = self._stream(history=HISTORY)
+        expected = HISTORY + [{"role": "user", "content": "Next?"}, {"role": "assistant", "content": "A reply."}]
+        self.assertEqual(sessions, [{"session_id": SESSION_ID, "history_hash": history_hash(expected)}])
+
+        response, _ = self._stream(history_hash=sessions[0]["history_hash"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sent[-1][1:-1], expected)
+
+    def test_stale_or_unknown_session_is_a_conflict(self):
+        response, _ = self._stream(history_hash="0" * 64)
+        self.assertEqual(response.status_code, 409)
+
+        self._stream(history=HISTORY)
+        response, _ = self._stream(history_hash=history_hash(HISTORY))
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("history_hash", response.get_json())
+        self.assertEqual(len(self.sent), 1)
+
+    def test_session_of_another_figure_is_a_conflict(self):
+        _, sessions = self._stream(history=HISTORY)
+        with mock.patch.object(seance, "stream_llm_events", self._live):
+            response = self.client.post("/api/chat/stream", json={
+                "figure_id": "tesla", "message": "Next?", "session_id": SESSION_ID,
+                "history_hash": sessions[0]["history_hash"]
+            })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(self.sent), 1)
+
+    def test_locked_store_still_finishes_the_stream(self):
+        _, sessions = self._stream(history=HISTORY)
+        locked = mock.Mock(side_effect=sqlite3.OperationalError("database is locked"))
+        with mock.patch.object(seance.session_store, "save", locked), self.assertLogs(seance.app.logger, "WARNING"):
+            response, sessions = self._stream(history_hash=sessions[0]["history_hash"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sessions, [])
+        self.assertIn('"done": true', response.get_data(as_text=True))
+
+    def test_non_streaming_salon_route_returns_the_session(self):
+        with mock.patch.object(seance, "call_llm", mock.Mock(return_value=("[ada]: Yes.\n\n[tesla]: No.", False))):
+            data = self.client.post("/api/dinner-party/chat", json={
+                "guests": ["ada", "tesla"], "message": "Agree?", "history": [], "session_id": SESSION_ID
+            }).get_json()
+        self.assertEqual(data["session"]["session_id"], SESSION_ID)
+        self.assertEqual(seance.session_store.load(SESSION_ID)[1], data["session"]["history_hash"])
+
+    def test_sessions_are_ignored_when_the_store_is_off(self):
+        with mock.patch.object(seance, "session_store", None):
+            response, sessions = self._stream(history=HISTORY)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sessions, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import unittest
+
+import app  # noqa: F401 - applies gevent monkey patching as in production
+from sse import FramingMetrics, UpstreamStreamParser, coalesce_frames, encode_event
+
+RECORDED_STREAM = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "openrouter_salon_stream.sse"
+)
+
+
+def _paced(events, delay):
+    for event in events:
+        time.sleep(delay)
+        yield event
+
+
+class CoalesceFramesTests(unittest.TestCase):
+    def test_template_frames_match_the_generic_encoder(self):
+        events = [
+            {"content": 'Quote "this" é'},
+            {"event": "guest_start", "figure_id": "ada"},
+            {"event": "content", "content": "Engine\n", "figure_id": "ada"},
+            {"event": "content", "content": "Preamble", "figure_id": None},
+            {"done": True},
+        ]
+        frames = list(coalesce_frames(iter(events), window_ms=0))
+        self.assertEqual(frames, [encode_event(event) for event in events])
+
+    def test_deltas_within_the_window_share_a_frame(self):
+        tokens = [{"content": token} for token in ["The", " Engine", " weaves", " algebraic", " patterns"]]
+        metrics = FramingMetrics()
+        frames = list(coalesce_frames(iter(tokens + [{"done": True}]), window_ms=50, metrics=metrics))
+
+        self.assertEqual(frames, [
+            encode_event({"content": "The"}),
+            encode_event({"content": " Engine weaves algebraic patterns"}),
+            encode_event({"done": True}),
+        ])
+        self.assertEqual(metrics.snapshot()["events"], 6)
+        self.assertEqual(metrics.snapshot()["frames"], 3)
+        self.assertEqual(metrics.bytes, sum(len(frame) for frame in frames))
+
+    def test_pending_text_is_flushed_when_the_window_expires(self):
+        source = iter([{"content": "a"}, {"content": "b"}, {"content": "c"}, {"content": "d"}])
+        frames = list(coalesce_frames(_paced(source, 0.06), window_ms=20))
+        self.assertEqual(len(frames), 4)
+
+    def test_size_budget_and_guest_changes_split_frames(self):
+        events = [{"content": "x" * 10} for _ in range(5)]
+        self.assertEqual(len(list(coalesce_frames(iter(events), window_ms=1000, max_chars=20))), 3)
+
+        typed = [
+            {"event": "content", "content": "One", "figure_id": "ada"},
+            {"event": "content", "content": " two", "figure_id": "ada"},
+            {"event": "content", "content": " three", "figure_id": "ada"},
+            {"event": "content", "content": "Four", "figure_id": "tesla"},
+        ]
+        frames = list(coalesce_frames(iter(typed), window_ms=1000))
+        self.assertEqual(frames[1:], [
+            encode_event({"event": "content", "content": " two three", "figure_id": "ada"}),
+            encode_event({"event": "content", "content": "Four", "figure_id": "tesla"}),
+        ])
+
+    def test_closing_the_stream_closes_the_source(self):
+        closed = []
+
+        def source():
+            try:
+                while True:
+                    yield {"content": "tick"}
+                    time.sleep(0.01)
+            finally:
+                closed.append(True)
+
+        frames = coalesce_frames(source(), window_ms=20)
+        next(frames)
+        frames.close()
+        time.sleep(0.05)
+        self.assertEqual(closed, [True])
+
+
+class UpstreamStreamParserTests(unittest.TestCase):
+    def setUp(self):
+        with open(RECORDED_STREAM, "rb") as f:
+            self.body = f.read()
+        self.expected = "".join(
+            json.loads(line[6:])["choices"][0]["delta"]["content"]
+            for line in self.body.decode().splitlines()
+            if line.startswith("data: {") and json.loads(line[6:])["choices"]
+        )
+
+    def _parse(self, body, size):
+        parser = UpstreamStreamParser()
+        texts = []
+        for start in range(0, len(body), size):
+            texts.extend(parser.feed(body[start:start + size]))
+        return parser, texts
+
+    def test_recorded_stream_parses_identically_at_any_chunk_size(self):
+        for size in (1, 7, 512, 16384, len(self.body)):
+            with self.subTest(size=size):
+                parser, texts = self._parse(self.body, size)
+                self.assertEqual("".join(texts), self.expected)
+                self.assertTrue(parser.done)
+                self.assertEqual(parser.usage["prompt_tokens"], 1712)
+                self.assertGreaterEqual(parser.skipped, 2)
+
+    def test_escaped_and_unusual_frames(self):
+        body = (
+            b": OPENROUTER PROCESSING\r\n\r\n"
+            b'data: {"choices":[{"delta":{"content":"Say \\"content\\":\\"x\\"\\n\\u00e9"}}]}\r\n\r\n'
+            b'data:{"choices":[{"delta":{"content": "spaced"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":null}}]}\n\n'
+            b'data: {"error":{"message":"upstream hiccup"}}\n\n'
+            b"data: [DONE]\n\n"
+            b'data: {"choices":[{"delta":{"content":"after done"}}]}\n\n'
+        )
+        parser, texts = self._parse(body, 5)
+        self.assertEqual(texts, ['Say "content":"x"\n\u00e9', "spaced"])
+        self.assertTrue(parser.done)
+        self.assertIsNone(parser.usage)
+
+
+if __name__ == "__main__":
+    unittest.main()
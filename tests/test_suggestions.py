@@ -0,0 +1,126 @@
+import json
+import unittest
+from unittest import mock
+
+import app as seance
+from response_cache import ResponseCache
+from suggestions import SpeculativeSuggestions, parse_party_suggestions, suggestion_basis
+
+OPENING = "The Analytical Engine weaves algebraic patterns just as the Jacquard loom weaves flowers."
+REPLY = OPENING + "\n\nIt might act upon other things besides number."
+
+
+class SuggestionBasisTests(unittest.TestCase):
+    def test_basis_is_complete_once_the_first_paragraph_ends(self):
+        self.assertEqual(suggestion_basis(OPENING), (OPENING, False))
+        self.assertEqual(suggestion_basis(OPENING + "\n\nIt"), (OPENING, True))
+        self.assertEqual(suggestion_basis(REPLY)[0], OPENING)
+        self.assertEqual(suggestion_basis("[ada]:\n\n" + OPENING)[1], False)
+        self.assertEqual(suggestion_basis("x" * 700), ("x" * 600, True))
+
+    def test_speculative_generation_starts_at_the_paragraph_break(self):
+        bases = []
+        speculative = SpeculativeSuggestions(lambda basis: bases.append(basis) or ["Why looms?"])
+        speculative.feed(OPENING[:40])
+        self.assertFalse(speculative.started)
+        speculative.feed(OPENING[40:] + "\n\nIt might")
+        self.assertTrue(speculative.started)
+        speculative.feed(" act upon other things.")
+        self.assertEqual(speculative.result(1), ["Why looms?"])
+        self.assertEqual(bases, [OPENING])
+
+    def test_party_parser_rejects_short_or_invalid_lists(self):
+        self.assertEqual(parse_party_suggestions('["A?", "B?", "C?"]'), ["A?", "B?", "C?"])
+        self.assertEqual(parse_party_suggestions('["A?", "B?"]'), [])
+        self.assertEqual(parse_party_suggestions('no list here'), [])
+
+
+class SuggestionRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        for name, value in (("suggestion_cache", ResponseCache()), ("response_cache", ResponseCache())):
+            patcher = mock.patch.object(seance, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def _suggest(self, messages, model=None, deadline=None):
+        self.calls.append(messages)
+        return ("What did Babbage think?\nCould it compose music?", False)
+
+    def _live(self, messages, model, max_tokens=800, deadline=None):
+        yield {"content": OPENING[:50]}
+        yield {"content": OPENING[50:] + "\n\n"}
+        yield {"content": "It might act upon other things besides number."}
+        yield {"done": True}
+
+    def _events(self, text):
+        lines = text.splitlines()
+        return [(line[7:], json.loads(lines[i + 1][6:])) for i, line in enumerate(lines) if line.startswith("event: ")]
+
+    def test_stream_carries_suggestions_before_done(self):
+        with mock.patch.object(seance, "stream_llm_events", self._live), \
+                mock.patch.object(seance, "call_llm_suggestions", self._suggest):
+            text = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "What can the Engine do?", "history": []
+            }).get_data(as_text=True)
+        events = [event for event in self._events(text) if event[0] != "timing"]
+        self.assertEqual(events, [("suggestions", {"suggestions": ["What did Babbage think?", "Could it compose music?"]})])
+        self.assertLess(text.index("event: suggestions"), text.index('"done"'))
+        self.assertIn(OPENING, self.calls[0][1]["content"])
+        self.assertNotIn("besides number", self.calls[0][1]["content"])
+
+        # The fallback endpoint for the same reply is served from the cache
+        history = [{"role": "user", "content": "What can the Engine do?"}, {"role": "assistant", "content": REPLY}]
+        with mock.patch.object(seance, "call_llm_suggestions", self._suggest):
+            data = self.client.post("/api/suggestions", json={
+                "figure_id": "ada", "history": history, "last_response": REPLY
+            }).get_json()
+        self.assertEqual(data["suggestions"], ["What did Babbage think?", "Could it compose music?"])
+        self.assertEqual(len(self.calls), 1)
+
+        # A different conversation that happens to get the same reply is not
+        suggest = mock.Mock(side_effect=self._suggest)
+        with mock.patch.object(seance, "call_llm_suggestions", suggest):
+            self.client.post("/api/suggestions", json={
+                "figure_id": "ada", "history": [{"role": "user", "content": "Describe the loom."}, history[1]],
+                "last_response": REPLY, "model": "openai/gpt-4o-mini"
+            })
+        self.assertEqual(suggest.call_args.args[1], "openai/gpt-4o-mini")
+        self.assertIn("Describe the loom.", self.calls[1][1]["content"])
+
+    def test_salon_suggestions_endpoint_shares_the_streamed_entry(self):
+        def live(messages, model, max_tokens=800, deadline=None):
+            yield {"content": "[ada]: " + OPENING[:50]}
+            yield {"content": OPENING[50:] + "\n\n[tesla]: Machines will think."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live), \
+                mock.patch.object(seance, "call_llm_suggestions", mock.Mock(return_value=('["A?", "B?", "C?"]', False))) \
+                as suggest:
+            self.client.post("/api/dinner-party/chat/stream", json={
+                "guests": ["ada", "tesla"], "message": "Can machines think?", "history": []
+            }).get_data()
+            data = self.client.post("/api/dinner-party/suggestions", json={
+                "guests": ["ada", "tesla"], "last_response": f"[ada]: {OPENING}\n\n[tesla]: Machines will think."
+            }).get_json()
+        self.assertEqual(data["suggestions"], ["A?", "B?", "C?"])
+        self.assertEqual(suggest.call_count, 1)
+
+    def test_failed_generation_leaves_the_stream_unchanged(self):
+        with mock.patch.object(seance, "stream_llm_events", self._live), \
+                mock.patch.object(seance, "call_llm_suggestions", mock.Mock(return_value=("", True))):
+            text = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "What can the Engine do?", "history": []
+            }).get_data(as_text=True)
+            data = self.client.post("/api/dinner-party/suggestions", json={
+                "guests": ["ada", "tesla"], "last_response": REPLY
+            }).get_json()
+        self.assertNotIn("event: suggestions", text)
+        self.assertIn('"done"', text)
+        self.assertEqual(data["suggestions"], seance.PARTY_FALLBACK_SUGGESTIONS)
+
+
+if __name__ == "__main__":
+    unittest.main()
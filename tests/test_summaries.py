@@ -0,0 +1,100 @@
+import time
+import unittest
+from unittest import mock
+
+import app as seance
+from response_cache import ResponseCache, history_hash
+from summaries import ConversationSummarizer, prefix_hashes
+
+
+def _exchange(turn):
+    return [
+        {"role": "user", "content": f"Question {turn}?"},
+        {"role": "assistant", "content": f"Answer {turn}."},
+    ]
+
+
+class SummarizerTests(unittest.TestCase):
+    def test_prefix_hashes_identify_each_prefix(self):
+        history = _exchange(1) + _exchange(2)
+        hashes = prefix_hashes(history)
+        self.assertEqual(len(hashes), 5)
+        self.assertEqual(hashes[2], prefix_hashes(history[:2])[2])
+        self.assertEqual(hashes[2], prefix_hashes([{"role": "user", "content": " Question 1? "}] + history[1:2])[2])
+        self.assertEqual(len(set(hashes)), 5)
+        self.assertNotEqual(hashes[4], history_hash(history))  # a separate key space from the response cache
+
+    def test_prompt_history_stays_flat_as_the_conversation_grows(self):
+        calls = []
+
+        def summarize(previous, messages):
+            calls.append((previous, [m["content"] for m in messages]))
+            return f"{previous or ''} +{len(messages)}".strip()
+
+        summarizer = ConversationSummarizer(ResponseCache(), summarize, keep_recent=6, min_prefix=4)
+        history = []
+        sent = []
+        for turn in range(1, 16):
+            summary, recent = summarizer.lookup("ada", history)
+            sent.append(len(recent))
+            history += _exchange(turn)
+            worker = summarizer.refresh("ada", history)
+            if worker:
+                worker.join()
+
+        self.assertEqual(max(sent), 8)
+        self.assertEqual(sent[-5:], [6] * 5)
+        self.assertEqual(summary, "+4" + " +2" * 9)
+        self.assertEqual(calls[1], ("+4", ["Question 3?", "Answer 3."]))
+
+    def test_failed_summary_leaves_full_history_in_place(self):
+        summarizer = ConversationSummarizer(ResponseCache(), lambda previous, messages: None)
+        history = _exchange(1) + _exchange(2) + _exchange(3) + _exchange(4) + _exchange(5)
+        summarizer.refresh("ada", history).join()
+        self.assertEqual(summarizer.lookup("ada", history + _exchange(6)), (None, history + _exchange(6)))
+        self.assertEqual(summarizer.stats()["failed"], 1)
+
+
+class SummarizedChatRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+        self.summarizer = ConversationSummarizer(
+            ResponseCache(), lambda previous, messages: "The user asked about the Engine.", keep_recent=6
+        )
+        patcher = mock.patch.object(seance, "summarizer", self.summarizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _turn(self, history, message):
+        sent = []
+
+        def live(messages, model, max_tokens=800, deadline=None):
+            sent.append(messages)
+            yield {"content": "A reply."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": message, "history": history
+            }).get_data()
+        return sent[0]
+
+    def test_next_turn_sends_summary_and_recent_messages_only(self):
+        history = [m for turn in range(1, 5) for m in _exchange(turn)]
+        first = self._turn(history, "Question 5?")
+        self.assertEqual(len(first), len(history) + 2)
+
+        deadline = time.monotonic() + 2
+        while self.summarizer.stats()["generated"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        history += [{"role": "user", "content": "Question 5?"}, {"role": "assistant", "content": "A reply."}]
+        second = self._turn(history, "Question 6?")
+        self.assertIn("The user asked about the Engine.", second[0]["content"])
+        self.assertTrue(second[0]["content"].startswith(seance.get_system_prompt("ada")))
+        self.assertEqual(second[1:-1], history[-6:])
+
+
+if __name__ == "__main__":
+    unittest.main()
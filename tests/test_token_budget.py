@@ -0,0 +1,84 @@
+import unittest
+from unittest import mock
+
+import app as seance
+from token_budget import build_trimmed_messages, estimate_message_tokens, estimate_tokens
+
+ESSAY = "The Analytical Engine weaves algebraic patterns. " * 400
+
+
+def _turns(count, text="A short remark."):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{text} ({i})"} for i in range(count)]
+
+
+class TrimmingTests(unittest.TestCase):
+    def test_estimate_scales_with_encoded_length(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd" * 25), 25)
+        self.assertGreater(estimate_tokens("É" * 10), estimate_tokens("E" * 10))
+
+    def test_system_prompt_and_new_message_survive_any_budget(self):
+        trim = build_trimmed_messages("System prompt.", _turns(4), "Newest question?", budget=1)
+        self.assertEqual(trim.messages, [
+            {"role": "system", "content": "System prompt."},
+            {"role": "user", "content": "Newest question?"},
+        ])
+        self.assertEqual(trim.dropped_messages, 4)
+        self.assertEqual(trim.dropped_tokens, sum(estimate_message_tokens(m) for m in _turns(4)))
+
+    def test_history_is_kept_newest_first_as_a_contiguous_tail(self):
+        history = _turns(3) + [{"role": "assistant", "content": ESSAY}] + _turns(4)
+        trim = build_trimmed_messages("System.", history, "Next?", budget=500)
+        self.assertEqual(trim.messages[1:-1], history[-4:])
+        self.assertEqual(trim.dropped_messages, 4)
+        self.assertGreater(trim.dropped_tokens, estimate_tokens(ESSAY))
+        self.assertLessEqual(trim.prompt_tokens, 500)
+
+    def test_short_exchanges_keep_more_than_twenty_messages(self):
+        trim = build_trimmed_messages("System.", _turns(60), "Next?", budget=12000)
+        self.assertEqual(trim.kept_messages, 60)
+        self.assertEqual(trim.dropped_tokens, 0)
+
+
+class RouteBudgetTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+
+    def test_chat_route_drops_history_beyond_the_model_budget_and_reports_it(self):
+        history = [{"role": "user", "content": ESSAY * 10}] + _turns(2)
+        completion = mock.Mock(return_value=("Indeed.", False))
+        with mock.patch.object(seance, "call_llm", completion):
+            response = self.client.post("/api/chat", json={
+                "figure_id": "ada", "message": "And now?", "history": history, "model": "openai/gpt-4o-mini"
+            })
+
+        self.assertEqual(response.status_code, 200)
+        sent = completion.call_args[0][0]
+        self.assertEqual(sent[1:], _turns(2) + [{"role": "user", "content": "And now?"}])
+        self.assertGreater(int(response.headers["X-History-Tokens-Dropped"]), seance.PROMPT_TOKEN_BUDGET)
+        self.assertLessEqual(int(response.headers["X-Prompt-Tokens-Estimate"]), seance.PROMPT_TOKEN_BUDGET)
+
+    def test_malformed_history_is_a_bad_request(self):
+        completion = mock.Mock(return_value=("Indeed.", False))
+        with mock.patch.object(seance, "call_llm", completion):
+            for history in ([{"role": "user", "content": None}], [{"role": "user", "content": 7}],
+                            [{"role": "user", "content": ["a", "b"]}], ["Hello"], {"role": "user"}):
+                with self.subTest(history=history):
+                    response = self.client.post("/api/dinner-party/chat", json={
+                        "guests": ["ada", "tesla"], "message": "And now?", "history": history
+                    })
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("Invalid history", response.get_json()["error"])
+            response = self.client.post("/api/chat", json={"figure_id": "ada", "message": "And now?", "history": None})
+        self.assertEqual(response.status_code, 200)
+        completion.assert_called_once()
+
+    def test_budget_follows_the_model_context_window(self):
+        self.assertEqual(seance._prompt_token_budget("openai/gpt-4o"), seance.PROMPT_TOKEN_BUDGET)
+        with mock.patch.dict(seance.MODEL_TABLE, {"tiny/model": {"context_tokens": 4096}}):
+            self.assertEqual(seance._prompt_token_budget("tiny/model"), 4096 - seance.MAX_RESPONSE_TOKENS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+import app as seance
+from mock_openrouter import create_app
+from model_health import ModelHealth
+from tracing import RequestTrace, mark_stage, start_trace, stop_trace
+
+
+class RequestTraceTests(unittest.TestCase):
+    def test_stages_are_recorded_once_in_order(self):
+        trace = RequestTrace("api_chat")
+        for stage in ("parse", "validate", "parse", "prompt"):
+            trace.mark(stage)
+        self.assertEqual([stage for stage, _ in trace.stages], ["parse", "validate", "prompt"])
+        header = trace.server_timing()
+        self.assertRegex(header, r"^parse;dur=\d+\.\d, validate;dur=\d+\.\d, prompt;dur=\d+\.\d, total;dur=\d+\.\d$")
+
+    def test_marks_only_reach_the_active_trace(self):
+        trace = start_trace("api_chat")
+        mark_stage("validate")
+        stop_trace()
+        mark_stage("prompt")
+        self.assertEqual([stage for stage, _ in trace.stages], ["validate"])
+
+
+class TracedRouteTests(unittest.TestCase):
+    def setUp(self):
+        seance.app.config.update(TESTING=True)
+        self.client = seance.app.test_client()
+
+    def test_non_stream_response_carries_server_timing(self):
+        with mock.patch.object(seance, "call_llm", mock.Mock(return_value=("Indeed.", False))), \
+                mock.patch.object(seance, "TRACE_LOG_SAMPLE_RATE", 1.0), \
+                self.assertLogs(seance.app.logger, level="INFO") as logs:
+            response = self.client.post("/api/chat", json={
+                "figure_id": "ada", "message": "Traced?", "history": [{"role": "user", "content": "Hi"}]
+            })
+
+        stages = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+        self.assertEqual(stages, ["parse", "admission", "validate", "system_prompt", "history", "prompt", "total"])
+        records = [json.loads(line.split(":", 2)[2]) for line in logs.output if '"trace"' in line]
+        self.assertEqual(records[0]["trace"], "api_chat")
+
+    def test_stream_sends_a_timing_event_before_done(self):
+        def live(messages, model, max_tokens=800, deadline=None):
+            yield {"content": "A reply."}
+            yield {"done": True}
+
+        with mock.patch.object(seance, "stream_llm_events", live):
+            response = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "Traced?", "history": [{"role": "user", "content": "Hi"}]
+            })
+            text = response.get_data(as_text=True)
+
+        self.assertTrue(response.headers["Server-Timing"].startswith("parse;dur="))
+        lines = text.splitlines()
+        timing = json.loads(lines[lines.index("event: timing") + 1][6:])
+        self.assertEqual(list(timing["stages"])[-2:], ["first_token", "stream_end"])
+        self.assertLess(text.index("event: timing"), text.index('"done"'))
+
+    def test_coalesced_stream_still_traces_the_upstream_stages(self):
+        mock_app = create_app({"seed": 1, "default": {"tokens_per_second": 10000, "ttft_ms": 0, "reply_tokens": 5}})
+        server = make_server("127.0.0.1", 0, mock_app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+
+        with mock.patch.object(seance, "OPENROUTER_URL", url), \
+                mock.patch.object(seance, "OPENROUTER_API_KEY", "mock"), \
+                mock.patch.object(seance, "model_health", ModelHealth()), \
+                mock.patch.object(seance, "STREAM_COALESCE_MS", 40):
+            response = self.client.post("/api/chat/stream", json={
+                "figure_id": "ada", "message": "Traced upstream?", "history": [{"role": "user", "content": "Hi"}]
+            })
+            lines = response.get_data(as_text=True).splitlines()
+
+        timing = json.loads(lines[lines.index("event: timing") + 1][6:])
+        self.assertIn("upstream_connect", timing["stages"])
+        self.assertIn("first_byte", timing["stages"])
+
+    def test_untraced_routes_have_no_server_timing(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/models").headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
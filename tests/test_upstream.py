@@ -0,0 +1,68 @@
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from upstream import UpstreamClient
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamClientTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/chat/completions"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sequential_requests_reuse_one_keep_alive_connection(self):
+        client = UpstreamClient(pool_size=4, pool_timeout=1)
+        for _ in range(3):
+            response = client.post(self.url, json={"model": "test"}, timeout=5)
+            self.assertEqual(response.json()["choices"][0]["message"]["content"], "ok")
+
+        stats = client.metrics.snapshot()
+        self.assertEqual(stats["connections_created"], 1)
+        self.assertEqual(stats["acquired"], 3)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_warm_up_parks_open_connections_in_the_pool(self):
+        client = UpstreamClient(pool_size=4, pool_timeout=1)
+        self.assertEqual(client.warm_up(self.url, connections=2), 2)
+        self.assertEqual(client.metrics.snapshot()["idle"], 2)
+
+        client.post(self.url, json={"model": "test"}, timeout=5).json()
+        self.assertEqual(client.metrics.snapshot()["connections_created"], 2)
+
+    def test_read_timeout_of_an_open_stream_can_be_raised(self):
+        client = UpstreamClient(pool_size=2, pool_timeout=1)
+        response = client.post(self.url, json={"model": "test"}, timeout=0.5, stream=True)
+        client.set_read_timeout(response, 60)
+        self.assertEqual(response.raw.connection.sock.gettimeout(), 60)
+        client.release(response)
+
+    def test_warm_up_failure_is_not_raised(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            closed_port = probe.getsockname()[1]
+        client = UpstreamClient(pool_size=2, pool_timeout=1)
+        self.assertEqual(client.warm_up(f"http://127.0.0.1:{closed_port}/", connections=1), 0)
@@ -0,0 +1,64 @@
+"""
+Token budgeting for SeanceAI prompts.
+Conversation history is trimmed by an estimated token budget rather than a
+message count, so one pasted essay cannot blow up prompt size while short
+exchanges keep more context. Estimates come from a fast local heuristic (no
+tokenizer download or per-model vocabulary), which is close enough for budgeting.
+"""
+
+from collections import namedtuple
+
+# Role and separator tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TrimResult = namedtuple('TrimResult', 'messages prompt_tokens kept_messages dropped_messages dropped_tokens')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text as one token per four UTF-8 bytes.
+    BPE tokenizers average close to that on English prose, and non-Latin scripts
+    take more bytes per character, which pushes the estimate up as their token
+    counts do.
+    """
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimated tokens for one chat message, including its formatting overhead."""
+    return estimate_tokens(message.get('content') or '') + MESSAGE_OVERHEAD_TOKENS
+
+
+def build_trimmed_messages(system_prompt: str, history: list, user_message: str, budget: int) -> TrimResult:
+    """
+    Assemble [system, *history, user] within an estimated prompt token budget.
+
+    The system prompt and the new user message are always kept, even if they
+    alone exceed the budget. History is kept newest first for as long as it fits;
+    once one message does not fit, it and everything older are dropped, so the
+    kept history is always a contiguous tail of the conversation.
+    """
+    system = {"role": "system", "content": system_prompt}
+    user = {"role": "user", "content": user_message}
+    prompt_tokens = estimate_message_tokens(system) + estimate_message_tokens(user)
+
+    kept = []
+    dropped_tokens = 0
+    for index in range(len(history) - 1, -1, -1):
+        msg = history[index]
+        message = {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+        tokens = estimate_message_tokens(message)
+        if prompt_tokens + tokens > budget:
+            dropped_tokens = tokens + sum(estimate_message_tokens(older) for older in history[:index])
+            break
+        prompt_tokens += tokens
+        kept.append(message)
+    kept.reverse()
+
+    return TrimResult(
+        messages=[system, *kept, user],
+        prompt_tokens=prompt_tokens,
+        kept_messages=len(kept),
+        dropped_messages=len(history) - len(kept),
+        dropped_tokens=dropped_tokens,
+    )
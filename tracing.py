@@ -0,0 +1,75 @@
+"""
+Per-request stage tracing for SeanceAI.
+A chat request is a sequence of stages: JSON parse, validation, prompt build,
+upstream connect, first upstream byte, first token relayed and stream end. Code
+marks the end of each stage as it passes it, and the trace reports how long each
+took, as a Server-Timing header, a trailing timing SSE event, or a log record.
+
+The active trace lives in a context variable, so the upstream code can mark
+stages without the trace being passed through every call, including from the
+streaming generator after the view has returned. Work on other threads (parallel
+salon guests, hedged racers) has no active trace and marks nothing.
+"""
+
+import contextvars
+import time
+
+_current = contextvars.ContextVar('seance_request_trace', default=None)
+
+
+class RequestTrace:
+    """Stage durations for one request, each measured from the end of the stage before it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self._last = self.started_at
+        self.stages = []
+        self._seen = set()
+
+    def mark(self, stage: str):
+        """End stage now. Later marks of the same stage (retries, later tokens) are ignored."""
+        if stage in self._seen:
+            return
+        now = time.perf_counter()
+        self._seen.add(stage)
+        self.stages.append((stage, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per stage plus the total so far."""
+        metrics = [f"{stage};dur={ms:.1f}" for stage, ms in self.stages]
+        metrics.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(metrics)
+
+    def summary(self) -> dict:
+        return {
+            "stages": {stage: round(ms, 1) for stage, ms in self.stages},
+            "total_ms": round(self.total_ms(), 1),
+        }
+
+
+def start_trace(name: str) -> RequestTrace:
+    """Begin tracing a request and make it the active trace for this context."""
+    trace = RequestTrace(name)
+    _current.set(trace)
+    return trace
+
+
+def stop_trace():
+    """Clear the active trace, so an untraced request cannot mark a previous one."""
+    _current.set(None)
+
+
+def current_trace():
+    return _current.get()
+
+
+def mark_stage(stage: str):
+    """End stage on the active trace, if there is one."""
+    trace = _current.get()
+    if trace is not None:
+        trace.mark(stage)
@@ -0,0 +1,211 @@
+"""
+Pooled upstream HTTP client for SeanceAI.
+Each worker process keeps one long-lived requests.Session so chat turns, streams
+and suggestions reuse warm keep-alive connections to OpenRouter instead of paying
+a fresh TCP+TLS handshake on every request.
+"""
+
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+
+class PoolMetrics:
+    """Counters describing connection pool usage for one worker."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.in_use = 0
+        self.acquired = 0
+        self.waited = 0
+        self.exhausted = 0
+        self.created = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._pools = []
+        self._lock = threading.Lock()
+
+    def record_acquire(self, wait_seconds: float):
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            self.wait_seconds_total += wait_seconds
+            if wait_seconds > 0.001:
+                self.waited += 1
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def record_release(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def record_exhausted(self, wait_seconds: float):
+        with self._lock:
+            self.exhausted += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def idle(self) -> int:
+        """Established connections currently parked in the pools."""
+        idle = 0
+        for pool in list(self._pools):
+            queue = getattr(pool.pool, 'queue', None) or []
+            idle += sum(1 for conn in list(queue) if conn is not None)
+        return idle
+
+    def snapshot(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "idle": self.idle(),
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "exhausted": self.exhausted,
+            "connections_created": self.created,
+            "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.acquired, 3) if self.acquired else 0.0,
+        }
+
+
+class _InstrumentedPoolMixin:
+    """Records acquire/release timing and bounds the wait for a free connection."""
+
+    metrics = None
+    acquire_timeout = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics._pools.append(self)
+
+    def _get_conn(self, timeout=None):
+        started = time.monotonic()
+        try:
+            conn = super()._get_conn(timeout=timeout if timeout is not None else self.acquire_timeout)
+        except EmptyPoolError:
+            self.metrics.record_exhausted(time.monotonic() - started)
+            raise
+        self.metrics.record_acquire(time.monotonic() - started)
+        return conn
+
+    def _put_conn(self, conn):
+        self.metrics.record_release()
+        super()._put_conn(conn)
+
+    def _new_conn(self):
+        self.metrics.created += 1
+        return super()._new_conn()
+
+    def close(self):
+        if self in self.metrics._pools:
+            self.metrics._pools.remove(self)
+        super().close()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose urllib3 pools block (bounded) and report PoolMetrics."""
+
+    def __init__(self, metrics: PoolMetrics, acquire_timeout: float, **kwargs):
+        self._metrics = metrics
+        self._acquire_timeout = acquire_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"metrics": self._metrics, "acquire_timeout": self._acquire_timeout}
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("InstrumentedHTTPConnectionPool", (_InstrumentedPoolMixin, HTTPConnectionPool), attrs),
+            "https": type("InstrumentedHTTPSConnectionPool", (_InstrumentedPoolMixin, HTTPSConnectionPool), attrs),
+        }
+
+
+class UpstreamClient:
+    """
+    Long-lived, per-worker HTTP client with a bounded keep-alive connection pool.
+    Safe to share between gevent greenlets: urllib3 pools hand out one connection
+    per caller and block (up to pool_timeout seconds) when all are in use.
+    """
+
+    def __init__(self, pool_size: int = 64, pool_timeout: float = 10.0):
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.metrics = PoolMetrics(pool_size)
+        self.session = requests.Session()
+        # Provider cookies must not leak between users sharing this session
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _PooledAdapter(
+            self.metrics,
+            pool_timeout,
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST through the shared pool; an exhausted pool surfaces as a ConnectionError."""
+        try:
+            return self.session.post(url, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectionError(
+                f"Upstream connection pool exhausted after waiting {self.pool_timeout}s"
+            ) from e
+
+    def set_read_timeout(self, response: requests.Response, seconds: float):
+        """
+        Change the per-read timeout of a streamed response that is still open. urllib3
+        sets the timeout again when the connection is reused, so this lasts only for
+        this response.
+        """
+        sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+        if sock is None:
+            # http.client lets go of the socket when the server will close the connection;
+            # the response body's file object still reads from it
+            body = getattr(getattr(response.raw, "_fp", None), "fp", None)
+            sock = getattr(getattr(body, "raw", None), "_sock", None)
+        if sock is not None:
+            sock.settimeout(seconds)
+
+    def release(self, response: requests.Response, drain: bool = True):
+        """
+        Return a streamed response's connection to the pool.
+        When the stream finished normally the (tiny) remainder is drained so the
+        connection stays reusable; an abandoned stream is closed instead.
+        """
+        try:
+            if drain:
+                for _ in response.iter_content(chunk_size=8192):
+                    pass
+        except Exception:
+            pass
+        finally:
+            response.close()
+
+    def warm_up(self, url: str, connections: int = 2) -> int:
+        """
+        Open TCP+TLS connections to the upstream host ahead of the first request.
+        Returns the number of connections established; failures are not raised.
+        """
+        adapter = self.session.get_adapter(url)
+        pool = adapter.poolmanager.connection_from_url(url)
+        adapter.cert_verify(pool, url, True, None)
+
+        conns = []
+        warmed = 0
+        try:
+            for _ in range(min(connections, self.pool_size)):
+                conn = pool._get_conn()
+                conns.append(conn)
+                conn.connect()
+                warmed += 1
+        except Exception:
+            pass
+        finally:
+            for conn in conns:
+                pool._put_conn(conn)
+        return warmed